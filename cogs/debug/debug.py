@@ -1,11 +1,16 @@
 import discord
 import pathlib
 import json
+import io
+import asyncio
 
 from discord.ext import commands
 from discord import app_commands
 from datetime import datetime, timezone
 from utils.RotiUtilities import cog_command
+from cogs.debug.profiling import SamplingProfiler, MemoryProfiler
+from cogs.generate.AIScheduler import text_scheduler, image_scheduler
+from cogs.generate.ResponseCache import response_cache
 
 # These commands don't have help pages because they are merely debug commands and aren't for normal use.
 @cog_command
@@ -13,6 +18,15 @@ class Debug(commands.Cog):
     def __init__(self, bot : commands.Bot):
         super().__init__()
         self.bot = bot
+        self.cpu_profiler = SamplingProfiler()
+        self.memory_profiler = MemoryProfiler()
+        self._cpu_profile_task : asyncio.Task = None
+
+    async def cog_unload(self):
+        if self._cpu_profile_task:
+            self._cpu_profile_task.cancel()
+        if self.memory_profiler.running:
+            self.memory_profiler.stop()
 
     # Developer-only commands as message commands.
     @commands.is_owner()
@@ -54,6 +68,39 @@ class Debug(commands.Cog):
         result = f"Successfully Reloaded:\n{', '.join(reloaded)}\n\nFailed to reload:\n{', '.join(failed)}"
         await ctx.send(result,ephemeral=True)
 
+    @commands.is_owner()
+    @commands.command(name="ai_queue", help="DEBUG: Shows the AI scheduler queues and counters")
+    async def _ai_queue(self, ctx: commands.Context):
+        lines = []
+        for scheduler in (text_scheduler, image_scheduler):
+            stats = scheduler.snapshot()
+            lines.append(
+                f"**{scheduler.name.title()}**: {stats.running} running, {stats.queued} queued across {stats.guilds_waiting} servers "
+                f"(peak {stats.max_queue_depth})\n{stats.submitted} submitted, {stats.completed} completed, {stats.failed} failed, {stats.timed_out} timed out, {stats.rejected} shed"
+            )
+        lines.append(
+            f"**Response Cache**: {response_cache.hits} hits, {response_cache.coalesced} coalesced, {response_cache.misses} misses"
+        )
+        await ctx.send("\n".join(lines))
+
+    @commands.is_owner()
+    @commands.command(name="music_nodes", help="DEBUG: Shows the health and load of each Lavalink node")
+    async def _music_nodes(self, ctx: commands.Context):
+        music = self.bot.get_cog("Music")
+        if music is None:
+            return await ctx.send("Music is not loaded.")
+
+        lines = []
+        for node in music.node_pool.metrics():
+            status = "healthy" if node.healthy else ("unhealthy" if node.available else "down")
+            latency = f"{node.rest_latency:.0f}ms" if node.rest_latency is not None else "n/a"
+            lines.append(
+                f"**{node.name}** ({status}, score {node.score:.1f}, REST {latency}): {node.players} players, {node.playing} playing, "
+                f"CPU {100 * node.cpu:.0f}%, {node.frames_deficit} deficit / {node.frames_nulled} nulled frames\n"
+                f"{node.disconnects} disconnects, {node.errors} recent track failures, {node.migrated_in} players moved in, {node.migrated_out} moved out"
+            )
+        await ctx.send("\n".join(lines) or "No Lavalink nodes configured.")
+
     @commands.is_owner()
     @commands.command(name="leave", help="DEBUG: Instructs Roti to leave a server")
     async def _leave(self, ctx: commands.Context, guild_id: int):
@@ -118,6 +165,78 @@ class Debug(commands.Cog):
         result = f"```{"\n\n".join(msg[::-1])[:1950]}```"
         await ctx.send(result, ephemeral=True, delete_after=30)
 
+    # Profiling commands, nothing is sampled or traced unless one of these is running.
+    @commands.is_owner()
+    @commands.command(name="profile_cpu", description="DEBUG: Samples CPU usage for N seconds and returns the profile")
+    async def _profile_cpu(self, ctx: commands.Context, seconds : int = 30):
+        seconds = min(300, max(1, seconds))
+        if self.cpu_profiler.running:
+            await ctx.send("A CPU profile is already running, use `$profile_stop` to end it early.", ephemeral=True)
+            return
+
+        self.cpu_profiler.start()
+        self._cpu_profile_task = asyncio.create_task(self._finish_cpu_profile(ctx, seconds))
+        await ctx.send(f"Sampling CPU for {seconds}s...", ephemeral=True)
+
+    async def _finish_cpu_profile(self, ctx: commands.Context, seconds : int):
+        try:
+            await asyncio.sleep(seconds)
+        except asyncio.CancelledError:
+            pass # Stopped early, still report what was collected.
+
+        profile = self.cpu_profiler.stop()
+        self._cpu_profile_task = None
+        files = [
+            discord.File(io.BytesIO(profile.summary.encode()), filename="cpu_summary.txt"),
+            discord.File(io.BytesIO(profile.collapsed.encode()), filename="cpu_profile.folded")
+        ]
+        await ctx.send(f"CPU profile: {profile.samples} samples over {profile.duration:.1f}s (every {1000 * profile.interval:.0f}ms).", files=files)
+
+    @commands.is_owner()
+    @commands.command(name="profile_stop", description="DEBUG: Stops a running CPU profile early")
+    async def _profile_stop(self, ctx: commands.Context):
+        if not self._cpu_profile_task:
+            await ctx.send("No CPU profile is running.", ephemeral=True)
+            return
+        self._cpu_profile_task.cancel()
+
+    @commands.is_owner()
+    @commands.command(name="mem_start", description="DEBUG: Starts tracing memory allocations with tracemalloc")
+    async def _mem_start(self, ctx: commands.Context, frames : int = 1):
+        if self.memory_profiler.running:
+            await ctx.send("tracemalloc is already tracing.", ephemeral=True)
+            return
+        self.memory_profiler.start(min(25, max(1, frames)))
+        await ctx.send("Started tracing memory allocations. Use `$mem_snapshot` and `$mem_top`, then `$mem_stop` when done.", ephemeral=True)
+
+    @commands.is_owner()
+    @commands.command(name="mem_snapshot", description="DEBUG: Takes a memory snapshot and diffs it against the previous one")
+    async def _mem_snapshot(self, ctx: commands.Context):
+        if not self.memory_profiler.running:
+            await ctx.send("tracemalloc isn't tracing, use `$mem_start` first.", ephemeral=True)
+            return
+        report, is_diff = await asyncio.to_thread(self.memory_profiler.snapshot_diff)
+        filename = "memory_diff.txt" if is_diff else "memory_baseline.txt"
+        await ctx.send(file=discord.File(io.BytesIO(report.encode()), filename=filename))
+
+    @commands.is_owner()
+    @commands.command(name="mem_top", description="DEBUG: Shows traced allocations grouped by cog module")
+    async def _mem_top(self, ctx: commands.Context, n : int = 25):
+        if not self.memory_profiler.running:
+            await ctx.send("tracemalloc isn't tracing, use `$mem_start` first.", ephemeral=True)
+            return
+        report = await asyncio.to_thread(self.memory_profiler.top_by_module, min(100, max(1, n)))
+        await ctx.send(file=discord.File(io.BytesIO(report.encode()), filename="memory_by_module.txt"))
+
+    @commands.is_owner()
+    @commands.command(name="mem_stop", description="DEBUG: Stops tracing memory allocations")
+    async def _mem_stop(self, ctx: commands.Context):
+        if not self.memory_profiler.running:
+            await ctx.send("tracemalloc isn't tracing.", ephemeral=True)
+            return
+        self.memory_profiler.stop()
+        await ctx.send("Stopped tracing memory allocations.", ephemeral=True)
+
     # Misc Debug Commands - Anyone can use.
     @app_commands.command(name="ping", description="DEBUG: Gets the latency of the bot")
     async def _ping(self, interaction: discord.Interaction):
@@ -0,0 +1,195 @@
+import os
+import sys
+import time
+import threading
+import tracemalloc
+
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+"""
+On-demand CPU and memory profiling used by the owner-only commands in the Debug cog.
+Nothing here runs until a command starts it: the CPU sampler thread only exists while a profile is active,
+and tracemalloc is only tracing between `mem_start` and `mem_stop`, so the overhead is zero while profiling is off.
+"""
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _short_path(filename : str) -> str:
+    """Shortens a filename to be relative to Roti's root or the site-packages directory it lives in."""
+    if filename.startswith(_ROOT):
+        return os.path.relpath(filename, _ROOT)
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    return os.path.basename(filename)
+
+def module_group(filename : str) -> str:
+    """
+    Groups a source file into the part of Roti (or the library) it belongs to, e.g. "cogs/music", "database", "discord".
+    """
+    path = _short_path(filename)
+    parts = path.split(os.sep)
+    if filename.startswith(_ROOT):
+        if parts[0] == "cogs" and len(parts) > 2:
+            return f"cogs/{parts[1]}"
+        return parts[0] if len(parts) > 1 else path
+    if "site-packages" in filename:
+        return parts[0].removesuffix(".py")
+    return "stdlib"
+
+@dataclass(slots=True, frozen=True, kw_only=True)
+class CPUProfile:
+    duration : float
+    samples : int
+    interval : float
+    collapsed : str # Brendan Gregg folded stack format, one "frame;frame;frame count" per line.
+    summary : str
+
+class SamplingProfiler:
+    """
+    Statistical CPU profiler that samples the event loop thread's stack from a background thread.
+    The output is in folded stack format, which can be fed directly to flamegraph tools (e.g. speedscope).
+    """
+    def __init__(self):
+        self._thread : Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._samples : Counter[str] = Counter()
+        self._target_thread : Optional[int] = None
+        self._interval : float = 0.005
+        self._started_at : float = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, interval : float = 0.005) -> None:
+        """
+        Starts sampling the calling thread (the event loop thread when called from a command).
+        """
+        if self.running:
+            raise RuntimeError("A CPU profile is already running.")
+
+        self._samples = Counter()
+        self._interval = interval
+        self._target_thread = threading.get_ident()
+        self._stop_event.clear()
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="roti-cpu-profiler", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self._interval):
+            frame = sys._current_frames().get(self._target_thread)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self._samples[";".join(reversed(stack))] += 1
+
+    def stop(self) -> CPUProfile:
+        if not self.running:
+            raise RuntimeError("No CPU profile is running.")
+
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        duration = time.perf_counter() - self._started_at
+
+        samples = sum(self._samples.values())
+        collapsed = "\n".join(f"{stack} {count}" for stack, count in self._samples.most_common())
+        return CPUProfile(
+            duration=duration,
+            samples=samples,
+            interval=self._interval,
+            collapsed=collapsed,
+            summary=self._summarize(samples)
+        )
+
+    def _summarize(self, total : int, limit : int = 25) -> str:
+        own : Counter[str] = Counter()
+        inclusive : Counter[str] = Counter()
+        for stack, count in self._samples.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+
+        def _table(title : str, counter : Counter[str]) -> List[str]:
+            lines = [title]
+            for frame, count in counter.most_common(limit):
+                lines.append(f"{100 * count / max(total, 1):6.2f}% {count:>7} {frame}")
+            return lines
+
+        lines = _table("Self samples (where the loop thread actually was):", own)
+        lines.append("")
+        lines.extend(_table("Inclusive samples (including callees):", inclusive))
+        return "\n".join(lines)
+
+class MemoryProfiler:
+    """
+    Thin wrapper around tracemalloc for snapshotting, diffing and grouping allocations by Roti module.
+    """
+    def __init__(self):
+        self._previous : Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def running(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames : int = 1) -> None:
+        if self.running:
+            raise RuntimeError("tracemalloc is already tracing.")
+        tracemalloc.start(frames)
+        self._previous = None
+
+    def stop(self) -> None:
+        self._previous = None
+        tracemalloc.stop()
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        if not self.running:
+            raise RuntimeError("tracemalloc is not tracing, start it first.")
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def snapshot_diff(self, limit : int = 50) -> Tuple[str, bool]:
+        """
+        Takes a snapshot and diffs it against the previous one. Returns the report and whether a diff was possible.
+        The first snapshot after starting only establishes the baseline.
+        """
+        snapshot = self._snapshot()
+        previous, self._previous = self._previous, snapshot
+        current, peak = tracemalloc.get_traced_memory()
+
+        header = [f"Traced: {current / 1024 / 1024:.2f} MiB (peak {peak / 1024 / 1024:.2f} MiB)"]
+        if previous is None:
+            stats = snapshot.statistics("lineno")[:limit]
+            header.append("Baseline snapshot taken, showing largest allocation sites:")
+            return "\n".join(header + [str(stat) for stat in stats]), False
+
+        stats = snapshot.compare_to(previous, "lineno")[:limit]
+        header.append("Difference since the previous snapshot:")
+        return "\n".join(header + [str(stat) for stat in stats]), True
+
+    def top_by_module(self, limit : int = 25) -> str:
+        """
+        Sums the current traced allocations by the Roti module (or library) they were allocated from.
+        """
+        groups : Dict[str, List[int]] = {}
+        for stat in self._snapshot().statistics("filename"):
+            group = module_group(stat.traceback[0].filename)
+            size, count = groups.get(group, [0, 0])
+            groups[group] = [size + stat.size, count + stat.count]
+
+        total = sum(size for size, _ in groups.values())
+        lines = [f"{'Module':<32} {'Size':>12} {'Blocks':>10} {'Share':>7}"]
+        for group, (size, count) in sorted(groups.items(), key=lambda item: item[1][0], reverse=True)[:limit]:
+            lines.append(f"{group:<32} {size / 1024:>9.1f} KiB {count:>10} {100 * size / max(total, 1):>6.2f}%")
+        return "\n".join(lines)
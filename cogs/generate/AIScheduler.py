@@ -0,0 +1,284 @@
+import time
+import asyncio
+import logging
+import contextvars
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+from cogs.statistics.statistics_helpers import register_statistic, record_statistic
+
+"""
+Fair scheduling for calls to Pollinations through RotiBrain.
+
+Every guild gets its own token bucket, so a noisy server only ever waits on itself. Guilds with queued jobs
+are served round-robin under a global concurrency cap, and jobs are shed once a guild's queue (or the
+global queue) is full instead of piling up without limit.
+
+Usage:
+    response = await text_scheduler.run(guild_id, lambda: brain.generate_text(prompt))
+"""
+
+_MAX_IDLE_BUCKETS = 512
+
+class SchedulerRejected(Exception):
+    """Raised when a job is shed because the queue is full."""
+    def __init__(self, reason : str):
+        super().__init__(reason)
+        self.reason = reason
+
+class _TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate : float, capacity : float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def time_until_available(self) -> float:
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+class AIJob:
+    __slots__ = ("guild_id", "user_id", "factory", "future", "enqueued_at", "started_at", "task", "context")
+
+    def __init__(self, guild_id : int, factory : Callable[[], Awaitable[Any]], user_id : Optional[int] = None):
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.factory = factory
+        self.future : asyncio.Future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+        self.started_at : Optional[float] = None
+        self.task : Optional[asyncio.Task] = None
+        # The submitter's context, so tracing spans in `factory` join its trace wherever the job is started from.
+        self.context : contextvars.Context = contextvars.copy_context()
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+@dataclass(slots=True, frozen=True, kw_only=True)
+class SchedulerStats:
+    queued : int
+    running : int
+    guilds_waiting : int
+    submitted : int
+    completed : int
+    failed : int
+    timed_out : int
+    rejected : int
+    max_queue_depth : int
+
+class AIScheduler:
+    def __init__(self, name : str, *, max_concurrency : int, rate : float, burst : int, max_queue_per_guild : int, max_queue : int,
+                 max_jobs_per_user : Optional[int] = None, job_timeout : Optional[float] = None):
+        """
+        `rate` is how many jobs per second each guild may start on average, with up to `burst` started back to back.
+        `max_jobs_per_user` caps queued plus running jobs per user for jobs submitted with a user ID,
+        and running jobs are cancelled after `job_timeout` seconds.
+        """
+        self.name = name
+        self.logger = logging.getLogger(__name__)
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.burst = burst
+        self.max_queue_per_guild = max_queue_per_guild
+        self.max_queue = max_queue
+        self.max_jobs_per_user = max_jobs_per_user
+        self.job_timeout = job_timeout
+
+        self._buckets : Dict[int, _TokenBucket] = {}
+        self._queues : Dict[int, Deque[AIJob]] = {}
+        self._rotation : Deque[int] = deque() # Guilds with queued jobs, in round-robin order.
+        self._queued : int = 0
+        self._running : int = 0
+        self._user_jobs : Dict[int, int] = {}
+        self._wakeup : Optional[asyncio.TimerHandle] = None
+
+        self._submitted = self._completed = self._failed = self._timed_out = self._rejected = self._max_queue_depth = 0
+        self._wait_statistic = f"ai_queue_wait_{name}"
+        register_statistic(self._wait_statistic, display_name=f"AI Queue Wait ({name.title()})", category="Generate")
+        self._run_statistic = f"ai_run_time_{name}"
+        register_statistic(self._run_statistic, display_name=f"AI Run Time ({name.title()})", category="Generate")
+
+    async def run(self, guild_id : int, factory : Callable[[], Awaitable[Any]], user_id : Optional[int] = None) -> Any:
+        """
+        Queues `factory` for the guild and returns its result once it has been scheduled and has finished.
+        Raises SchedulerRejected if the job was shed. Cancelling the caller cancels the job.
+        """
+        job = self.submit(guild_id, factory, user_id)
+        try:
+            return await asyncio.shield(job.future)
+        except asyncio.CancelledError:
+            self.cancel(job)
+            raise
+
+    def submit(self, guild_id : int, factory : Callable[[], Awaitable[Any]], user_id : Optional[int] = None) -> AIJob:
+        if user_id is not None and self.max_jobs_per_user is not None and self._user_jobs.get(user_id, 0) >= self.max_jobs_per_user:
+            self._rejected += 1
+            raise SchedulerRejected("You already have a request in progress, wait for it to finish first!")
+
+        queue = self._queues.setdefault(guild_id, deque())
+        if len(queue) >= self.max_queue_per_guild or self._queued >= self.max_queue:
+            self._rejected += 1
+            if not queue:
+                del self._queues[guild_id]
+            raise SchedulerRejected("Roti is a bit busy right now, try again in a moment!")
+
+        if len(self._buckets) > _MAX_IDLE_BUCKETS:
+            self._prune_buckets()
+
+        job = AIJob(guild_id, factory, user_id)
+        if user_id is not None:
+            self._user_jobs[user_id] = self._user_jobs.get(user_id, 0) + 1
+        if not queue:
+            self._rotation.append(guild_id)
+        queue.append(job)
+        self._queued += 1
+        self._submitted += 1
+        self._max_queue_depth = max(self._max_queue_depth, self._queued)
+        self._dispatch()
+        return job
+
+    def position(self, job : AIJob) -> Optional[int]:
+        """
+        Returns the job's 1-based position in its guild's queue, or None if it isn't queued anymore.
+        """
+        queue = self._queues.get(job.guild_id)
+        if queue is None or job not in queue:
+            return None
+        return queue.index(job) + 1
+
+    def cancel(self, job : AIJob) -> bool:
+        """
+        Cancels a queued or running job. Returns False if it had already finished.
+        """
+        queue = self._queues.get(job.guild_id)
+        if queue is not None and job in queue:
+            queue.remove(job)
+            self._queued -= 1
+            if not queue:
+                self._forget_guild(job.guild_id)
+            self._release_user(job)
+            job.future.cancel()
+            return True
+        if job.task is not None and not job.task.done():
+            job.task.cancel()
+            return True
+        return False
+
+    def _release_user(self, job : AIJob) -> None:
+        if job.user_id is None:
+            return
+        remaining = self._user_jobs.get(job.user_id, 1) - 1
+        if remaining > 0:
+            self._user_jobs[job.user_id] = remaining
+        else:
+            self._user_jobs.pop(job.user_id, None)
+
+    def _forget_guild(self, guild_id : int) -> None:
+        del self._queues[guild_id]
+        self._rotation.remove(guild_id)
+
+    def _dispatch(self) -> None:
+        """
+        Starts as many queued jobs as the concurrency cap and the guilds' token buckets allow.
+        If guilds are waiting only on their buckets, schedules another dispatch for when the next token is available.
+        """
+        while self._running < self.max_concurrency and self._rotation:
+            next_ready : Optional[float] = None
+            for _ in range(len(self._rotation)):
+                guild_id = self._rotation[0]
+                self._rotation.rotate(-1) # Whether it runs now or not, the guild goes to the back of the line.
+                bucket = self._buckets.setdefault(guild_id, _TokenBucket(self.rate, self.burst))
+                if bucket.try_acquire():
+                    self._start(self._queues[guild_id].popleft())
+                    if not self._queues[guild_id]:
+                        self._forget_guild(guild_id)
+                    break
+                wait = bucket.time_until_available()
+                next_ready = wait if next_ready is None else min(next_ready, wait)
+            else:
+                self._schedule_wakeup(next_ready)
+                return
+
+    def _schedule_wakeup(self, delay : float) -> None:
+        loop = asyncio.get_running_loop()
+        if self._wakeup is not None and self._wakeup.when() <= loop.time() + delay:
+            return
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+        self._wakeup = loop.call_later(delay, self._on_wakeup)
+
+    def _on_wakeup(self) -> None:
+        self._wakeup = None
+        self._dispatch()
+
+    def _start(self, job : AIJob) -> None:
+        self._queued -= 1
+        self._running += 1
+        job.started_at = time.monotonic()
+        record_statistic(self._wait_statistic, job.started_at - job.enqueued_at)
+        job.task = asyncio.create_task(self._execute(job), context=job.context)
+
+    async def _execute(self, job : AIJob) -> None:
+        try:
+            result = await asyncio.wait_for(job.factory(), self.job_timeout)
+        except asyncio.CancelledError:
+            job.future.cancel()
+        except asyncio.TimeoutError as e:
+            self._timed_out += 1
+            self.logger.warning("%s job for %s timed out after %.0fs", self.name.title(), job.guild_id, self.job_timeout)
+            if not job.future.done():
+                job.future.set_exception(e)
+        except Exception as e:
+            self._failed += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            self._completed += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            record_statistic(self._run_statistic, time.monotonic() - job.started_at)
+            self._running -= 1
+            self._release_user(job)
+            self._dispatch()
+
+    def _prune_buckets(self) -> None:
+        """
+        Drops the buckets of idle guilds that have refilled completely, they'd be recreated identically on their next job.
+        """
+        for guild_id in [guild_id for guild_id, bucket in self._buckets.items() if guild_id not in self._queues and bucket.time_until_available() == 0 and bucket.tokens >= bucket.capacity]:
+            del self._buckets[guild_id]
+
+    def snapshot(self) -> SchedulerStats:
+        return SchedulerStats(
+            queued=self._queued,
+            running=self._running,
+            guilds_waiting=len(self._rotation),
+            submitted=self._submitted,
+            completed=self._completed,
+            failed=self._failed,
+            timed_out=self._timed_out,
+            rejected=self._rejected,
+            max_queue_depth=self._max_queue_depth
+        )
+
+# One scheduler per Pollinations endpoint, shared by every cog.
+# The text rate keeps the old 5 second talkback cooldown, but per guild instead of global.
+text_scheduler = AIScheduler("text", max_concurrency=4, rate=1 / 5, burst=2, max_queue_per_guild=3, max_queue=50)
+image_scheduler = AIScheduler("image", max_concurrency=2, rate=1 / 15, burst=2, max_queue_per_guild=3, max_queue=20, max_jobs_per_user=1, job_timeout=90)
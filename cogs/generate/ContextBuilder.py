@@ -0,0 +1,95 @@
+import re
+
+from typing import Dict, List, Protocol, Sequence
+
+"""
+Builds the chat messages sent to Pollinations for AI talkbacks within a token budget.
+
+Tokens are estimated (about 4 characters per token plus a small per-message overhead) rather than counted,
+which is close enough for budgeting and costs nothing. Starting from the newest message, recent turns are
+kept nearly verbatim and older turns are cut down to their leading sentences, until the budget runs out.
+Repeated content and bare attachment placeholders are dropped first since they tell the model nothing.
+"""
+
+ATTACHMENT_PLACEHOLDER = "[Attachment/Embed]"
+DEFAULT_CONTEXT_BUDGET = 3000 # Tokens, including the behavior prompt.
+
+_CHARS_PER_TOKEN = 4
+_MESSAGE_OVERHEAD = 4 # Role and formatting tokens per message.
+_RECENT_TURNS = 6 # The newest turns, which get the larger per-turn allowance.
+_OLDER_TURN_TOKENS = 60
+_TRUNCATED = " [...]"
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_WHITESPACE = re.compile(r"\s+")
+
+class ContextEntry(Protocol):
+    author : str
+    role : str
+    content : str
+
+def estimate_tokens(text : str) -> int:
+    return -(-len(text) // _CHARS_PER_TOKEN) + _MESSAGE_OVERHEAD
+
+def shorten(text : str, max_tokens : int) -> str:
+    """
+    Extractive summary of `text`: its leading sentences that fit in `max_tokens`,
+    or a cut at a word boundary if even the first sentence doesn't fit.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    max_chars = max(0, (max_tokens - _MESSAGE_OVERHEAD) * _CHARS_PER_TOKEN - len(_TRUNCATED))
+    summary = ""
+    for sentence in _SENTENCE_END.split(text):
+        candidate = f"{summary} {sentence}" if summary else sentence
+        if len(candidate) > max_chars:
+            break
+        summary = candidate
+
+    if not summary:
+        summary = text[:max_chars].rsplit(" ", 1)[0] if " " in text[:max_chars] else text[:max_chars]
+    return summary + _TRUNCATED
+
+def _format(entry : ContextEntry, content : str) -> Dict[str, str]:
+    if entry.role == "assistant":
+        # If Roti sent the message, assign it the "assistant" role
+        return {"role": "assistant", "content": content}
+    # If a user sent it, assign "user" role and prepend their real username
+    return {"role": "user", "content": f"{entry.author} said: {content}"}
+
+def build_chat_context(history : Sequence[ContextEntry], budget : int, reserved : int = 0) -> List[Dict[str, str]]:
+    """
+    Turns a channel's history (oldest first) into chat messages that fit in `budget` tokens,
+    `reserved` of which are already taken (e.g. by the behavior prompt).
+    The newest message is always included, shortened if it alone would blow the budget.
+    """
+    available = max(budget - reserved, 0)
+    recent_turn_tokens = max(available // 4, _OLDER_TURN_TOKENS)
+
+    selected : List[Dict[str, str]] = []
+    seen = set()
+    for index, entry in enumerate(reversed(history)):
+        if entry.content == ATTACHMENT_PLACEHOLDER:
+            continue
+
+        # Keep only the newest copy of repeated content (spam, copypastas, repeated questions).
+        key = (entry.role, _WHITESPACE.sub(" ", entry.content).strip().casefold())
+        if key in seen:
+            continue
+        seen.add(key)
+
+        cap = recent_turn_tokens if index < _RECENT_TURNS else _OLDER_TURN_TOKENS
+        message = _format(entry, shorten(entry.content, cap))
+        cost = estimate_tokens(message["content"])
+        if cost > available:
+            if selected:
+                break
+            message = _format(entry, shorten(entry.content, available)) # Always answer the newest message.
+            cost = available
+
+        selected.append(message)
+        available -= cost
+
+    selected.reverse()
+    return selected
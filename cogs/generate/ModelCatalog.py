@@ -0,0 +1,187 @@
+import os
+import time
+import json
+import asyncio
+import logging
+import pathlib
+import aiohttp
+
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+from utils.Singleton import Singleton
+from database.bot_state import RotiState
+from cogs.generate.ContextBuilder import DEFAULT_CONTEXT_BUDGET
+
+"""
+Process-wide catalog of the Pollinations text and image models.
+
+The catalog is loaded from a local cache file on first use and refreshed in the background from the API
+once it is older than MODEL_CATALOG_TTL (default 6 hours). Stale models are served while a refresh is
+in flight, so nothing on the command path ever waits on the models endpoints after the first load.
+"""
+
+_CACHE_PATH = pathlib.Path(os.getenv("MODEL_CATALOG_PATH", "cache/model_catalog.json"))
+_TTL : float = float(os.getenv("MODEL_CATALOG_TTL", str(6 * 60 * 60)))
+_RETRY_AFTER : float = 60 # Don't hammer the API if it's down, retry failed refreshes at most once a minute.
+_FETCH_TIMEOUT = aiohttp.ClientTimeout(total=10, sock_connect=5)
+
+def _parse_budgets(value : str) -> Dict[str, int]:
+    """Parses AI_CONTEXT_BUDGETS, e.g. "openai=4000,gemini-fast=6000"."""
+    budgets = {}
+    for pair in filter(None, value.split(",")):
+        name, _, tokens = pair.partition("=")
+        if tokens.strip().isdigit():
+            budgets[name.strip()] = int(tokens)
+    return budgets
+
+# Per-model context budgets in tokens, models not listed get AI_CONTEXT_BUDGET.
+_DEFAULT_BUDGET : int = int(os.getenv("AI_CONTEXT_BUDGET", str(DEFAULT_CONTEXT_BUDGET)))
+_BUDGETS : Dict[str, int] = _parse_budgets(os.getenv("AI_CONTEXT_BUDGETS", ""))
+
+@dataclass(frozen=True)
+class TextModel:
+    name : str
+    description : str
+    context_budget : int = _DEFAULT_BUDGET
+
+    @classmethod
+    def create(cls, name : str, description : str) -> "TextModel":
+        return cls(name=name, description=description, context_budget=_BUDGETS.get(name, _DEFAULT_BUDGET))
+
+@dataclass(frozen=True)
+class ImageModel:
+    name : str
+
+class ModelCatalog(metaclass=Singleton):
+    def __init__(self, session : aiohttp.ClientSession):
+        self.logger = logging.getLogger(__name__)
+        self.session = session
+        self.base_url : str = RotiState().credentials.pollinations_url
+        self._text_models : Dict[str, TextModel] = {}
+        self._image_models : List[ImageModel] = []
+        self._fetched_at : float = 0.0
+        self._last_attempt : float = 0.0
+        self._refresh_task : Optional[asyncio.Task] = None
+        self._load_from_disk()
+        self._maybe_refresh()
+
+    @property
+    def text_models(self) -> Dict[str, TextModel]:
+        self._maybe_refresh()
+        return self._text_models
+
+    @property
+    def image_models(self) -> List[ImageModel]:
+        self._maybe_refresh()
+        return self._image_models
+
+    @property
+    def stale(self) -> bool:
+        return time.time() - self._fetched_at >= _TTL
+
+    async def ready(self) -> None:
+        """
+        Waits for the first load if there are no models at all yet, e.g. a cold start without a cache file.
+        Returns immediately otherwise, even if the catalog is stale.
+        """
+        if self._text_models or self._image_models:
+            return
+        self._maybe_refresh(force=True)
+        if self._refresh_task is not None:
+            await asyncio.shield(self._refresh_task)
+
+    def _maybe_refresh(self, force : bool = False) -> None:
+        if not (force or self.stale) or (self._refresh_task is not None and not self._refresh_task.done()):
+            return
+        if time.monotonic() - self._last_attempt < _RETRY_AFTER and self._last_attempt:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return # Not in the event loop yet, the next access will schedule it.
+
+        self._last_attempt = time.monotonic()
+        self._refresh_task = loop.create_task(self.refresh())
+
+    async def refresh(self) -> None:
+        """
+        Fetches both model lists and persists them. On failure the current models are kept.
+        """
+        headers = {"Authorization": f"Bearer {RotiState().credentials.pollinations_key}"}
+        text_payload, image_payload = await asyncio.gather(
+            self._fetch(f"{self.base_url}/text/models", headers),
+            self._fetch(f"{self.base_url}/image/models", headers)
+        )
+
+        if text_payload is not None:
+            self._text_models = self._parse_text_models(text_payload)
+        if image_payload is not None:
+            self._image_models = self._parse_image_models(image_payload)
+        if text_payload is None or image_payload is None:
+            return # Retried after _RETRY_AFTER on the next access.
+
+        self._fetched_at = time.time()
+        await asyncio.to_thread(self._save_to_disk)
+        self.logger.info("Model catalog refreshed: %i text models, %i image models", len(self._text_models), len(self._image_models))
+
+    async def _fetch(self, url : str, headers : Dict[str, str]) -> Optional[list]:
+        try:
+            async with self.session.get(url, headers=headers, timeout=_FETCH_TIMEOUT) as response:
+                if response.status != 200:
+                    self.logger.critical("Could not retrieve models from %s! Response code: %s", url, response.status)
+                    return None
+                return await response.json(content_type=None)
+        except Exception as e:
+            self.logger.critical("Could not retrieve models from %s! Error: %s", url, e)
+            return None
+
+    @staticmethod
+    def _parse_text_models(payload : list) -> Dict[str, TextModel]:
+        models = dict()
+        for model in payload:
+            # Only include models that are NOT marked as paid_only
+            if not model.get("paid_only", False):
+                models[model["name"]] = TextModel.create(
+                    name=model["name"],
+                    description=model.get('description', model["name"]),
+                )
+        return models
+
+    @staticmethod
+    def _parse_image_models(payload : list) -> List[ImageModel]:
+        models : List[ImageModel] = []
+        for model in payload:
+            # Only include models that are NOT marked as paid_only and output images (not video)
+            output_modalities = model.get("output_modalities", [])
+            if not model.get("paid_only", False) and output_modalities and "video" not in output_modalities:
+                models.append(ImageModel(
+                    name=model.get("name", model) if isinstance(model, dict) else model
+                ))
+        return models
+
+    def _load_from_disk(self) -> None:
+        try:
+            with open(_CACHE_PATH) as f:
+                cached = json.load(f)
+            self._text_models = {model["name"]: TextModel.create(model["name"], model["description"]) for model in cached["text"]}
+            self._image_models = [ImageModel(**model) for model in cached["image"]]
+            self._fetched_at = cached["fetched_at"]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.logger.warning("Ignoring unreadable model catalog cache %s: %s", _CACHE_PATH, e)
+
+    def _save_to_disk(self) -> None:
+        try:
+            _CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            temp = _CACHE_PATH.with_suffix(".tmp")
+            with open(temp, "w") as f:
+                json.dump({
+                    "fetched_at": self._fetched_at,
+                    # Budgets are configuration, not catalog data, so they're applied on load instead of cached.
+                    "text": [{"name": model.name, "description": model.description} for model in self._text_models.values()],
+                    "image": [asdict(model) for model in self._image_models]
+                }, f)
+            os.replace(temp, _CACHE_PATH)
+        except OSError as e:
+            self.logger.error("Failed to write model catalog cache %s: %s", _CACHE_PATH, e)
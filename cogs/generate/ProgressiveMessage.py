@@ -0,0 +1,60 @@
+import time
+import logging
+import discord
+
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from cogs.generate.RotiBrain import MAX_RESPONSE_LENGTH
+
+"""
+Renders a streamed AI response into a single Discord message.
+The message is sent as soon as the first token arrives and then edited at most once per interval,
+which keeps well under Discord's per-channel edit rate limit no matter how fast tokens come in.
+"""
+
+_logger = logging.getLogger(__name__)
+
+class ProgressiveMessage:
+    def __init__(self, send : Callable[[str], Awaitable[discord.Message]], interval : float = 1.2, cursor : str = " ▌"):
+        """
+        `send` is called once with the first chunk of text and must return the message to keep editing,
+        e.g. `channel.send` or `interaction.followup.send(..., wait=True)`.
+        """
+        self._send = send
+        self.interval = interval
+        self.cursor = cursor
+        self.message : Optional[discord.Message] = None
+        self.text : str = ""
+
+    def _render(self, text : str) -> str:
+        return text[:MAX_RESPONSE_LENGTH - len(self.cursor)] + self.cursor
+
+    async def consume(self, stream : AsyncIterator[str]) -> Optional[discord.Message]:
+        """
+        Consumes a stream of accumulated text (as yielded by RotiBrain's stream methods) and
+        returns the finished message, or None if the stream produced nothing or the message was deleted.
+        """
+        last_edit = 0.0
+
+        async for text in stream:
+            self.text = text
+            if self.message is None:
+                self.message = await self._send(self._render(text))
+                last_edit = time.monotonic()
+            elif time.monotonic() - last_edit >= self.interval:
+                try:
+                    await self.message.edit(content=self._render(text))
+                except discord.HTTPException as e:
+                    # A missed intermediate edit is harmless, the final edit catches up.
+                    _logger.debug("Skipped progressive edit: %s", e)
+                last_edit = time.monotonic()
+
+        if self.message is not None:
+            # Always finish with the exact text and without the cursor.
+            try:
+                await self.message.edit(content=self.text)
+            except discord.NotFound:
+                _logger.info("Progressive message was deleted before it finished.")
+                self.message = None
+            except discord.HTTPException as e:
+                _logger.warning("Failed to finish progressive message: %s", e)
+        return self.message
@@ -0,0 +1,144 @@
+import os
+import time
+import json
+import asyncio
+import hashlib
+import logging
+import pathlib
+
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+"""
+Content-addressed cache for AI completions that are (close to) deterministic.
+
+Only requests at or below AI_CACHE_MAX_TEMPERATURE (default 0.2) are cached, keyed on the model, temperature and
+whitespace-normalized messages. Entries expire after AI_CACHE_TTL seconds (default 6 hours) and the least recently
+used ones are evicted past AI_CACHE_ENTRIES (default 1024). Identical requests made while one is already in flight
+share its result instead of making their own upstream call.
+
+Setting AI_CACHE_PATH persists the cache to that file on shutdown and reloads it on startup.
+"""
+
+_MAX_TEMPERATURE : float = float(os.getenv("AI_CACHE_MAX_TEMPERATURE", "0.2"))
+_TTL : float = float(os.getenv("AI_CACHE_TTL", str(6 * 60 * 60)))
+_MAX_ENTRIES : int = int(os.getenv("AI_CACHE_ENTRIES", "1024"))
+_PATH : Optional[str] = os.getenv("AI_CACHE_PATH")
+
+class ResponseCache:
+    def __init__(self, max_entries : int = _MAX_ENTRIES, ttl : float = _TTL, max_temperature : float = _MAX_TEMPERATURE, path : Optional[str] = _PATH):
+        self.logger = logging.getLogger(__name__)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_temperature = max_temperature
+        self.path = pathlib.Path(path) if path else None
+        self._entries : OrderedDict[str, Tuple[float, str]] = OrderedDict() # key -> (expiry as unix time, response)
+        self._in_flight : Dict[str, asyncio.Future] = {}
+        self.hits = self.misses = self.coalesced = 0
+        self._load()
+
+    def cacheable(self, temperature : float) -> bool:
+        return temperature <= self.max_temperature
+
+    @staticmethod
+    def key(messages : List[Dict[str, str]], model : str, temperature : float) -> str:
+        normalized = [(m["role"], " ".join(m["content"].split())) for m in messages]
+        return hashlib.sha256(json.dumps([model, float(round(temperature, 2)), normalized]).encode()).hexdigest()
+
+    def get(self, key : str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return response
+
+    def put(self, key : str, response : str) -> None:
+        self._entries[key] = (time.time() + self.ttl, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def in_flight(self, key : str) -> Optional[asyncio.Future]:
+        return self._in_flight.get(key)
+
+    def begin(self, key : str) -> asyncio.Future:
+        """
+        Marks `key` as in flight, identical requests can await the returned future until `finish` is called.
+        """
+        future = self._in_flight[key] = asyncio.get_running_loop().create_future()
+        return future
+
+    def finish(self, key : str, response : Optional[str]) -> None:
+        """
+        Resolves the in-flight request for `key`, caching the response unless the request failed.
+        """
+        if response:
+            self.put(key, response)
+        future = self._in_flight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(response)
+
+    def lookup(self, key : str) -> Tuple[Optional[str], Optional[asyncio.Future]]:
+        """
+        Looks `key` up and counts the outcome. Returns (response, None) on a hit and (None, future) when an identical
+        request is already in flight. On a miss returns (None, None) with `key` now in flight, the caller must `finish` it.
+        """
+        if (cached := self.get(key)) is not None:
+            self.hits += 1
+            return cached, None
+        if (pending := self.in_flight(key)) is not None:
+            self.coalesced += 1
+            return None, pending
+
+        self.misses += 1
+        self.begin(key)
+        return None, None
+
+    async def get_or_create(self, key : str, factory : Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        cached, pending = self.lookup(key)
+        if cached is not None:
+            return cached
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        response = None
+        try:
+            response = await factory()
+        finally:
+            self.finish(key, response)
+        return response
+
+    def _load(self) -> None:
+        if self.path is None:
+            return
+        try:
+            with open(self.path) as f:
+                now = time.time()
+                for key, (expires_at, response) in json.load(f).items():
+                    if expires_at > now:
+                        self._entries[key] = (expires_at, response)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError) as e:
+            self.logger.warning("Ignoring unreadable response cache %s: %s", self.path, e)
+
+    def _save(self, entries : Dict[str, Tuple[float, str]]) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp = self.path.with_suffix(".tmp")
+            with open(temp, "w") as f:
+                json.dump(entries, f)
+            os.replace(temp, self.path)
+        except OSError as e:
+            self.logger.error("Failed to write response cache %s: %s", self.path, e)
+
+    async def save(self) -> None:
+        """Persists the cache if AI_CACHE_PATH is set."""
+        if self.path is not None:
+            await asyncio.to_thread(self._save, dict(self._entries))
+
+response_cache = ResponseCache()
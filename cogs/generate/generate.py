@@ -5,6 +5,9 @@ import json
 import asyncio
 
 from cogs.generate.RotiBrain import RotiBrain
+from cogs.generate.ProgressiveMessage import ProgressiveMessage
+from cogs.generate.AIScheduler import AIJob, text_scheduler, image_scheduler, SchedulerRejected
+from cogs.generate.ResponseCache import response_cache
 from discord.ext import commands
 from discord import app_commands
 
@@ -14,14 +17,21 @@ from database.data import RotiDatabase, GenerateSettings
 
 embed = discord.Embed(color=0xecc98e)
 
+_JOB_STATUS_INTERVAL = 3 # Seconds between queue position updates.
+_QUEUE_TIMEOUT = 120 # Seconds an image request may wait in the queue before it's dropped.
+_FAILURE_SHOWN = object() # Returned by _wait_for_image when the status message already explains the failure.
+
 @cog_command
 class Generate(commands.GroupCog, group_name = "generate"):
     def __init__(self, bot : commands.Bot):
         super().__init__()
         self.bot = bot
-        self.brain = RotiBrain()
+        self.brain = RotiBrain(bot.session)
         self.db = RotiDatabase()
 
+    async def cog_unload(self):
+        await response_cache.save()
+
     @app_commands.command(name="waifu", description="Have a randomly generated waifu appear. They do not exist sadly.")
     async def _gen_waifu(self, interaction : discord.Interaction):
         await interaction.response.defer()
@@ -39,13 +49,25 @@ class Generate(commands.GroupCog, group_name = "generate"):
     @app_commands.describe(prompt="The image prompt given to the AI", model="Image Model to use")
     async def _gen_image(self, interaction: discord.Interaction, prompt : str, model : Optional[str]):
         await interaction.response.defer(ephemeral=True)
-        await interaction.followup.send(content="Generating image...this may take a bit...", ephemeral=True)
-         # Lets us have multiple people querying the bot at a time.
-        buffer = await asyncio.to_thread(self.brain.generate_image, prompt, model)
+        try:
+            job = image_scheduler.submit(
+                interaction.guild_id or interaction.user.id,
+                lambda: self.brain.generate_image(prompt, model),
+                user_id=interaction.user.id
+            )
+        except SchedulerRejected as e:
+            await interaction.followup.send(content=e.reason, ephemeral=True)
+            return
+
+        view = ImageJobView(job)
+        status = await interaction.followup.send(content=_job_status(job), view=view, ephemeral=True, wait=True)
+        image = await self._wait_for_image(job, status, view)
+        if view.cancelled or image is _FAILURE_SHOWN:
+            return
 
-        if buffer:
-            file_name = f"{time.time_ns()}-{interaction.guild_id}.png"
-            file = discord.File(buffer, filename=file_name)
+        if image:
+            file_name = f"{time.time_ns()}-{interaction.guild_id}.{image.extension}"
+            file = discord.File(image.buffer, filename=file_name)
 
             # Set the embed image URL to use the file name
             result = embed.copy()
@@ -57,23 +79,71 @@ class Generate(commands.GroupCog, group_name = "generate"):
         
         await interaction.followup.send(content="Unable to generate image", ephemeral=True)
 
+    async def _wait_for_image(self, job : AIJob, status : discord.WebhookMessage, view : "ImageJobView"):
+        """
+        Waits for an image job, keeping the ephemeral status message's queue position up to date.
+        Jobs still queued after _QUEUE_TIMEOUT are dropped, running ones are bounded by the scheduler's job timeout.
+        Returns the image, None if there is none, or _FAILURE_SHOWN if the status message already says why.
+        """
+        shown = _job_status(job)
+        while not job.future.done():
+            await asyncio.wait((job.future,), timeout=_JOB_STATUS_INTERVAL)
+            if job.future.done():
+                break
+
+            if not job.running and time.monotonic() - job.enqueued_at > _QUEUE_TIMEOUT:
+                image_scheduler.cancel(job)
+                view.stop()
+                await status.edit(content="Roti was too busy to get to your image, try again later!", view=None)
+                return _FAILURE_SHOWN
+
+            current = _job_status(job)
+            if current != shown:
+                shown = current
+                await status.edit(content=current)
+
+        view.stop()
+        if job.future.cancelled():
+            return None # The cancel button already updated the status message.
+        if (error := job.future.exception()) is not None:
+            if isinstance(error, asyncio.TimeoutError):
+                await status.edit(content="Image generation took too long, try again later!", view=None)
+            else:
+                await status.edit(content="Unable to generate image, try again later!", view=None)
+            return _FAILURE_SHOWN
+
+        image = job.future.result()
+        if not image:
+            await status.edit(content="Unable to generate image, try again later!", view=None)
+            return _FAILURE_SHOWN
+
+        await status.edit(content="Done!", view=None)
+        return image
+
     @app_commands.command(name="text", description="Have Roti respond to what you say!")
     @app_commands.describe(prompt="The text prompt you want to give to Roti without any prior context.", model="Text Model to use")
     async def _gen_text(self, interaction : discord.Interaction, prompt : str, model : Optional[str]):
         await interaction.response.defer()
+        gen_settings = await self.db.select(GenerateSettings, server_id=interaction.guild_id)
         
-        # Use the model parameter if provided, otherwise defaults to gemini-fast in RotiBrain
-        response : Optional[str] = await asyncio.to_thread(
-            self.brain.generate_text, 
+        # Use the model parameter if provided, otherwise the server's default model and temperature.
+        # The response is streamed into the follow-up so the first tokens show up right away.
+        stream = self.brain.stream_text(
             prompt=prompt, 
-            model=model
+            model=model or gen_settings.default_model,
+            temperature=gen_settings.temperature
         )
+        try:
+            message = await text_scheduler.run(
+                interaction.guild_id or interaction.user.id,
+                lambda: ProgressiveMessage(lambda text: interaction.followup.send(text, wait=True)).consume(stream)
+            )
+        except SchedulerRejected as e:
+            await interaction.followup.send(e.reason, ephemeral=True)
+            return
         
-        if not response:
+        if not message:
             await interaction.followup.send("An error has occurred, try again later.", ephemeral=True)
-            return
-            
-        await interaction.followup.send(response)
 
     @_gen_image.autocomplete(name="model")
     async def _gen_image_autocomplete(self, interaction : discord.Interaction, current : str) -> List[app_commands.Choice]:
@@ -97,5 +167,23 @@ class Generate(commands.GroupCog, group_name = "generate"):
 
         return text_model_options
 
+def _job_status(job : AIJob) -> str:
+    position = image_scheduler.position(job)
+    if position is not None:
+        return f"Your image is #{position} in line, hang tight..."
+    return "Generating image...this may take a bit..."
+
+class ImageJobView(discord.ui.View):
+    def __init__(self, job : AIJob):
+        super().__init__(timeout=None) # Stopped once the job finishes.
+        self.job = job
+        self.cancelled = False
+
+    @discord.ui.button(label='Cancel', style=discord.ButtonStyle.red)
+    async def _cancel(self, interaction : discord.Interaction, button : discord.ui.Button):
+        self.cancelled = image_scheduler.cancel(self.job)
+        self.stop()
+        await interaction.response.edit_message(content="Cancelled." if self.cancelled else "Too late, it's already done!", view=None)
+
 async def setup(bot: commands.Bot):
     await bot.add_cog(Generate(bot))
\ No newline at end of file
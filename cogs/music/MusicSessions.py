@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import discord
+import lavalink
+
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple, Type
+from database.data import RotiDatabase, MusicSessionsTable
+from cogs.music.RotiPlayer import RotiPlayer
+
+"""
+Snapshots of every active music session, so a restart or deploy doesn't wipe everyone's queue.
+
+Sessions are written to the music_sessions table when they change (and at least every SNAPSHOT_INTERVAL while
+playing, to keep the position fresh) and once more on shutdown. On startup, sessions newer than _MAX_AGE rejoin
+their voice channel, if anyone is still in it, and resume near the saved position.
+"""
+
+SNAPSHOT_INTERVAL = 60
+_MAX_AGE = 30 * 60 # Seconds, older sessions are dropped rather than resumed
+_RESTORABLE_FILTERS : Dict[str, Type[lavalink.Filter]] = {"timescale": lavalink.filters.Timescale}
+
+class MusicSessions:
+    def __init__(self, client : lavalink.Client):
+        self.logger = logging.getLogger(__name__)
+        self.db = RotiDatabase()
+        self.client = client
+        self._saved : Dict[int, Tuple] = {} # guild id -> signature of the last snapshot written
+
+    @staticmethod
+    def snapshot(player : RotiPlayer) -> Optional[MusicSessionsTable]:
+        """
+        The session to persist for a player, or None if there's nothing worth resuming.
+        """
+        if not player.is_connected or player.current is None or not player.current.track:
+            return None
+
+        tracks = [track for track in [player.current, *player.queue] if track.track]
+        return MusicSessionsTable(
+            server_id=player.guild_id,
+            voice_channel_id=int(player.channel_id),
+            text_channel_id=player.fetch('channel') or 0,
+            tracks=[track.track for track in tracks],
+            requesters=[track.requester for track in tracks],
+            position=int(player.position),
+            loop=player.loop,
+            paused=player.paused,
+            volume=player.volume,
+            filters={name: _filter.values for name, _filter in player.filters.items() if name in _RESTORABLE_FILTERS},
+            updated_at=datetime.now(timezone.utc).isoformat()
+        )
+
+    @staticmethod
+    def _signature(player : RotiPlayer, session : MusicSessionsTable) -> Tuple:
+        # The position only counts once it has moved a full interval, so an unchanged paused session isn't rewritten.
+        return (
+            session.voice_channel_id, player.current.identifier, player.queue.version, session.loop, session.paused,
+            session.volume, repr(session.filters), session.position // (SNAPSHOT_INTERVAL * 1000)
+        )
+
+    def save(self, player : RotiPlayer, force : bool = False) -> Optional[asyncio.Task]:
+        """
+        Writes the player's session if it changed since the last snapshot, or drops it once playback has ended.
+        """
+        session = self.snapshot(player)
+        if session is None:
+            if self._saved.pop(player.guild_id, None) is not None:
+                return asyncio.create_task(self.db.delete(MusicSessionsTable, server_id=player.guild_id))
+            return None
+
+        signature = self._signature(player, session)
+        if not force and self._saved.get(player.guild_id) == signature:
+            return None
+        self._saved[player.guild_id] = signature
+        return self.db.upsert(session)
+
+    def save_all(self, force : bool = False) -> List[asyncio.Task]:
+        tasks = [self.save(player, force) for player in list(self.client.player_manager.players.values())]
+        return [task for task in tasks if task is not None]
+
+    async def forget(self, guild_id : int) -> None:
+        """
+        Drops a guild's session, e.g. when Roti is told to leave or everyone else does.
+        """
+        self._saved.pop(guild_id, None)
+        await self.db.delete(MusicSessionsTable, server_id=guild_id)
+
+    async def restore(self, bot : discord.Client, voice_client : Type[discord.VoiceProtocol]) -> int:
+        """
+        Resumes every saved session that's still fresh, returning how many were resumed.
+        """
+        restored = 0
+        for session in await self.db.select_all(MusicSessionsTable):
+            try:
+                restored += await self._restore(bot, session, voice_client)
+            except Exception as e:
+                self.logger.error(f"Failed to restore music session for {session.server_id}: {e}")
+                await self.forget(session.server_id)
+        return restored
+
+    async def _restore(self, bot : discord.Client, session : MusicSessionsTable, voice_client : Type[discord.VoiceProtocol]) -> bool:
+        guild = bot.get_guild(session.server_id)
+        channel = guild.get_channel(session.voice_channel_id) if guild else None
+        age = (datetime.now(timezone.utc) - datetime.fromisoformat(session.updated_at)).total_seconds() if session.updated_at else float("inf")
+
+        existing = self.client.player_manager.get(session.server_id)
+        if existing is not None and existing.is_connected:
+            return False # Already running, e.g. the cog was only reloaded.
+        if channel is None or age > _MAX_AGE or not session.tracks or not any(not m.bot for m in channel.members):
+            await self.forget(session.server_id)
+            return False
+
+        player : RotiPlayer = self.client.player_manager.create(guild.id)
+        tracks = await player.node.decode_tracks(session.tracks)
+        if session.text_channel_id:
+            player.store('channel', session.text_channel_id)
+        await channel.connect(cls=voice_client)
+
+        for track, requester in zip(tracks, session.requesters):
+            player.add(track, requester=requester)
+        player.set_loop(session.loop)
+        player.volume = session.volume
+        for name, values in session.filters.items():
+            player.filters[name] = _RESTORABLE_FILTERS[name](**values)
+
+        current = tracks[0]
+        start_time = min(session.position, max(0, current.duration - 5000)) if current.is_seekable and not current.is_stream else 0
+        await player.play(start_time=start_time, pause=session.paused, **player.playback_options())
+        self.logger.info(f"Resumed music session in {guild.id} with {len(tracks)} tracks at {start_time // 1000}s")
+        return True
@@ -0,0 +1,55 @@
+import asyncio
+import dataclasses
+import logging
+
+from typing import Dict, Optional
+from database.data import RotiDatabase, MusicSettings
+
+"""
+In-memory MusicSettings for every server, so playing music never waits on the database.
+
+All rows are loaded once at startup (`warm`), anything missing is loaded on first use, and changes are
+written through to the database in the background.
+"""
+
+class MusicSettingsCache:
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.db = RotiDatabase()
+        self._settings : Dict[int, MusicSettings] = {}
+        self._loading : Dict[int, asyncio.Task] = {}
+
+    async def warm(self) -> None:
+        for settings in await self.db.select_all(MusicSettings):
+            self._settings.setdefault(settings.server_id, settings)
+        self.logger.info(f"Cached music settings for {len(self._settings)} servers")
+
+    def peek(self, guild_id : int) -> Optional[MusicSettings]:
+        return self._settings.get(guild_id)
+
+    def prefetch(self, guild_id : int) -> None:
+        """
+        Starts loading a server's settings in the background if they aren't cached yet.
+        """
+        if guild_id not in self._settings and guild_id not in self._loading:
+            task = self._loading[guild_id] = asyncio.create_task(self._load(guild_id))
+            task.add_done_callback(lambda _: self._loading.pop(guild_id, None))
+
+    async def get(self, guild_id : int) -> MusicSettings:
+        if (settings := self._settings.get(guild_id)) is not None:
+            return settings
+        self.prefetch(guild_id)
+        return await asyncio.shield(self._loading[guild_id])
+
+    async def _load(self, guild_id : int) -> MusicSettings:
+        settings = await self.db.select(MusicSettings, server_id=guild_id) or MusicSettings(server_id=guild_id)
+        return self._settings.setdefault(guild_id, settings)
+
+    async def update(self, guild_id : int, **changes) -> MusicSettings:
+        """
+        Updates the cached settings and writes the change through to the database.
+        """
+        settings = dataclasses.replace(await self.get(guild_id), **changes)
+        self._settings[guild_id] = settings
+        self.db.update(MusicSettings, server_id=guild_id, **changes)
+        return settings
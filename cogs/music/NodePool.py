@@ -0,0 +1,180 @@
+import time
+import logging
+import lavalink
+
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple, Optional
+
+"""
+Health tracking and load-aware placement across the configured Lavalink nodes.
+
+Nodes come from LAVALINK_NODES, a comma separated list of `name=host:port` (the name and port are optional),
+sharing MUSIC_PASS. Without it, the single LAVALINK_HOST/LAVALINK_PORT node is used as before.
+
+New players go to the healthy node with the lowest score: Lavalink's own penalty (playing players, CPU load,
+nulled and deficit frames from its last stats report) plus players placed since that report, recent track
+failures and a grace period for nodes that just reconnected. The pool also stands in for the node manager's
+find_ideal_node, which Lavalink uses both to place new players and to move players off a node that drops.
+"""
+
+_ERROR_WINDOW = 300 # Seconds track failures count against a node
+_ERROR_PENALTY = 5
+_RECOVERY_WINDOW = 60 # Seconds after a reconnect before a node is trusted with new players again
+_RECOVERY_PENALTY = 100
+_UNHEALTHY_AFTER = 3 # Consecutive failed health checks
+
+class NodeConfig(NamedTuple):
+    name : str
+    host : str
+    port : int
+    region : str = 'us'
+
+def parse_nodes(spec : str, default_host : str, default_port : int) -> List[NodeConfig]:
+    """
+    Parses LAVALINK_NODES, falling back to a single node at the default host and port.
+    """
+    nodes = []
+    for i, entry in enumerate(filter(None, (part.strip() for part in spec.split(','))), start=1):
+        name, _, address = entry.rpartition('=')
+        host, _, port = address.partition(':')
+        nodes.append(NodeConfig(name or f"node-{i}", host, int(port or default_port)))
+    return nodes or [NodeConfig('default-node', default_host, default_port)]
+
+@dataclass(slots=True)
+class NodeHealth:
+    disconnects : int = 0
+    connected_at : float = 0.0
+    failed_checks : int = 0
+    rest_latency : Optional[float] = None # Milliseconds
+    errors : List[float] = field(default_factory=list) # Times of recent track failures
+    migrated_in : int = 0
+    migrated_out : int = 0
+
+class NodeMetrics(NamedTuple):
+    name : str
+    available : bool
+    healthy : bool
+    players : int
+    playing : int
+    cpu : float
+    frames_deficit : int
+    frames_nulled : int
+    score : float
+    rest_latency : Optional[float]
+    disconnects : int
+    errors : int
+    migrated_in : int
+    migrated_out : int
+
+class _PooledNodeManager(lavalink.NodeManager):
+    # NodeManager has __slots__, so placement is overridden in a subclass rather than patched onto the instance.
+    __slots__ = ('pool',)
+
+    def find_ideal_node(self, region : Optional[str] = None, exclude : Optional[List[lavalink.Node]] = None) -> Optional[lavalink.Node]:
+        return self.pool.find_ideal_node(region, exclude)
+
+class NodePool:
+    def __init__(self, client : lavalink.Client):
+        self.logger = logging.getLogger(__name__)
+        self.client = client
+        self._health : Dict[str, NodeHealth] = {}
+
+    def add(self, config : NodeConfig, password : str) -> None:
+        if any(node.name == config.name for node in self.client.node_manager.nodes):
+            return
+        self.client.add_node(config.host, config.port, password, config.region, config.name)
+        self._health[config.name] = NodeHealth()
+
+    def install(self) -> None:
+        """
+        Routes the node manager's find_ideal_node through the pool. Must run before any node is added,
+        nodes keep a reference to the manager they were added to.
+        """
+        manager = self.client.node_manager
+        if not isinstance(manager, _PooledNodeManager):
+            if manager.nodes:
+                raise RuntimeError("NodePool.install() must be called before nodes are added")
+            manager = self.client.node_manager = _PooledNodeManager(self.client, manager.regions, manager._connect_back)
+        manager.pool = self # Reloading the cog keeps the client (and its manager) but creates a new pool
+
+    def health(self, node : lavalink.Node) -> NodeHealth:
+        return self._health.setdefault(node.name, NodeHealth())
+
+    def is_healthy(self, node : lavalink.Node) -> bool:
+        return node.available and self.health(node).failed_checks < _UNHEALTHY_AFTER
+
+    def score(self, node : lavalink.Node) -> float:
+        health = self.health(node)
+        now = time.monotonic()
+        health.errors = [t for t in health.errors if now - t < _ERROR_WINDOW]
+
+        # Stats only arrive about once a minute, count players placed since then ourselves.
+        unreported = max(0, len(node.players) - node.stats.players)
+        score = node.penalty + unreported + _ERROR_PENALTY * len(health.errors)
+        if now - health.connected_at < _RECOVERY_WINDOW and health.disconnects:
+            score += _RECOVERY_PENALTY
+        return score
+
+    def find_ideal_node(self, region : Optional[str] = None, exclude : Optional[List[lavalink.Node]] = None) -> Optional[lavalink.Node]:
+        candidates = [node for node in self.client.node_manager.available_nodes if node not in (exclude or [])]
+        healthy = [node for node in candidates if self.is_healthy(node)] or candidates
+        regional = [node for node in healthy if node.region == region] if region else []
+        nodes = regional or healthy
+        return min(nodes, key=self.score) if nodes else None
+
+    def node_connected(self, node : lavalink.Node) -> None:
+        health = self.health(node)
+        health.connected_at = time.monotonic()
+        health.failed_checks = 0
+
+    def node_disconnected(self, node : lavalink.Node) -> None:
+        self.health(node).disconnects += 1
+
+    def node_changed(self, old_node : Optional[lavalink.Node], new_node : lavalink.Node) -> None:
+        if old_node is not None:
+            self.health(old_node).migrated_out += 1
+        self.health(new_node).migrated_in += 1
+
+    def track_failed(self, node : lavalink.Node) -> None:
+        self.health(node).errors.append(time.monotonic())
+
+    async def check(self) -> None:
+        """
+        Measures every node's REST latency, nodes failing _UNHEALTHY_AFTER checks in a row stop getting new players.
+        """
+        for node in self.client.node_manager.nodes:
+            health = self.health(node)
+            try:
+                latency = await node.get_rest_latency()
+            except Exception as e:
+                latency = -1
+                self.logger.warning("Health check for Lavalink node %s failed: %s", node.name, e)
+
+            if latency < 0:
+                health.failed_checks += 1
+                health.rest_latency = None
+            else:
+                health.failed_checks = 0
+                health.rest_latency = latency
+
+    def metrics(self) -> List[NodeMetrics]:
+        metrics = []
+        for node in self.client.node_manager.nodes:
+            health = self.health(node)
+            metrics.append(NodeMetrics(
+                name=node.name,
+                available=node.available,
+                healthy=self.is_healthy(node),
+                players=len(node.players),
+                playing=node.stats.playing_players,
+                cpu=node.stats.system_load,
+                frames_deficit=node.stats.frames_deficit,
+                frames_nulled=node.stats.frames_nulled,
+                score=self.score(node),
+                rest_latency=health.rest_latency,
+                disconnects=health.disconnects,
+                errors=len(health.errors),
+                migrated_in=health.migrated_in,
+                migrated_out=health.migrated_out
+            ))
+        return metrics
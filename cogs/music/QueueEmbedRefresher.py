@@ -0,0 +1,131 @@
+import time
+import asyncio
+import logging
+import discord
+import lavalink
+
+from dataclasses import dataclass
+from discord.ext import tasks
+from typing import Callable, Dict, Optional
+
+"""
+Keeps every open /music queue embed up to date from a single loop, across all guilds.
+
+Each embed is re-rendered when it's due and only edited if the rendered embed actually changed.
+Embeds that stop changing (e.g. paused) back off up to _MAX_INTERVAL, each message is edited at most once
+per _MIN_INTERVAL (its own webhook route), and all edits share a global budget so a busy bot doesn't
+spend its whole rate limit on queue timers. Track changes refresh a guild's embeds immediately.
+"""
+
+_TICK = 0.5
+_MIN_INTERVAL = 1.0 # Discord allows 5 edits per 5 seconds on a single webhook message.
+_MAX_INTERVAL = 10.0
+_GLOBAL_EDITS_PER_SECOND = 20 # Well under the 50 requests per second global limit, leaving room for everything else.
+_LIFETIME = 14 * 60 # Interaction tokens, and with them the ability to edit the message, expire after 15 minutes.
+_MAX_PER_GUILD = 5
+
+@dataclass(slots=True)
+class _TrackedEmbed:
+    message : discord.WebhookMessage
+    guild_id : int
+    expires_at : float
+    rendered : dict
+    interval : float = _MIN_INTERVAL
+    next_due : float = 0.0
+
+class QueueEmbedRefresher:
+    def __init__(self, render : Callable[[lavalink.DefaultPlayer], discord.Embed], get_player : Callable[[int], Optional[lavalink.DefaultPlayer]]):
+        self.logger = logging.getLogger(__name__)
+        self.render = render
+        self.get_player = get_player
+        self._tracked : Dict[int, _TrackedEmbed] = {} # Keyed by message ID
+        self.edits = self.skipped = 0
+
+    def __len__(self) -> int:
+        return len(self._tracked)
+
+    def track(self, message : discord.WebhookMessage, guild_id : int, embed : discord.Embed) -> None:
+        """
+        Starts refreshing a queue embed that was just sent with `embed`.
+        """
+        now = time.monotonic()
+        guild_entries = sorted((entry for entry in self._tracked.values() if entry.guild_id == guild_id), key=lambda entry: entry.expires_at)
+        for entry in guild_entries[:max(0, len(guild_entries) - _MAX_PER_GUILD + 1)]:
+            self.untrack(entry.message.id)
+
+        self._tracked[message.id] = _TrackedEmbed(
+            message=message,
+            guild_id=guild_id,
+            expires_at=now + _LIFETIME,
+            rendered=embed.to_dict(),
+            next_due=now + _MIN_INTERVAL
+        )
+        if not self._refresh_loop.is_running():
+            self._refresh_loop.start()
+
+    def untrack(self, message_id : int) -> None:
+        self._tracked.pop(message_id, None)
+
+    def untrack_guild(self, guild_id : int) -> None:
+        for message_id in [message_id for message_id, entry in self._tracked.items() if entry.guild_id == guild_id]:
+            del self._tracked[message_id]
+
+    def refresh_guild(self, guild_id : int) -> None:
+        """
+        Makes a guild's embeds due right away, e.g. when the track changes.
+        """
+        for entry in self._tracked.values():
+            if entry.guild_id == guild_id:
+                entry.next_due = 0.0
+
+    def stop(self) -> None:
+        self._refresh_loop.cancel()
+        self._tracked.clear()
+
+    @tasks.loop(seconds=_TICK)
+    async def _refresh_loop(self):
+        now = time.monotonic()
+        for message_id in [message_id for message_id, entry in self._tracked.items() if entry.expires_at <= now]:
+            del self._tracked[message_id]
+
+        if not self._tracked:
+            self._refresh_loop.stop()
+            return
+
+        # Spread the global budget: with more embeds open, each one refreshes less often.
+        base_interval = max(_MIN_INTERVAL, len(self._tracked) / _GLOBAL_EDITS_PER_SECOND)
+        due = sorted((entry for entry in self._tracked.values() if entry.next_due <= now), key=lambda entry: entry.next_due)
+        due = due[:max(1, int(_GLOBAL_EDITS_PER_SECOND * _TICK))]
+        if due:
+            await asyncio.gather(*(self._refresh(entry, base_interval) for entry in due))
+
+    async def _refresh(self, entry : _TrackedEmbed, base_interval : float) -> None:
+        player = self.get_player(entry.guild_id)
+        if player is None or not player.is_connected:
+            self.untrack(entry.message.id)
+            return
+
+        embed = self.render(player)
+        rendered = embed.to_dict()
+        if rendered == entry.rendered:
+            # Nothing visible changed (paused, or between track changes), back off.
+            self.skipped += 1
+            entry.interval = min(entry.interval * 2, _MAX_INTERVAL)
+        else:
+            try:
+                await entry.message.edit(embed=embed)
+            except discord.NotFound:
+                self.untrack(entry.message.id) # Deleted, or closed by the user.
+                return
+            except discord.HTTPException as e:
+                self.logger.warning("Failed to refresh queue embed in %s: %s", entry.guild_id, e)
+                entry.interval = _MAX_INTERVAL
+            else:
+                self.edits += 1
+                entry.rendered = rendered
+                entry.interval = base_interval
+
+        if player.current is None:
+            self.untrack(entry.message.id) # The final "nothing is playing" state has been shown.
+            return
+        entry.next_due = time.monotonic() + entry.interval
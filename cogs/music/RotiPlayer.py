@@ -0,0 +1,142 @@
+import lavalink
+
+from time import strftime, gmtime, perf_counter
+from typing import Any, Dict, Iterable, List, Optional, SupportsIndex, Tuple
+from database.data import MusicSettings
+from cogs.statistics.statistics_helpers import register_statistic, record_statistic
+
+"""
+Player and queue model used for every guild's Lavalink player.
+
+TrackQueue keeps the queue's total duration up to date as tracks are added, played, skipped or looped back in,
+so rendering the queue doesn't sum up to MAX_TRACKS durations each time. Every mutation bumps `version`,
+which RotiPlayer uses to cache the rendered top of the queue until it actually changes.
+
+A server's speed, pitch and volume are applied together: speed and pitch share one Timescale filter, and they're sent
+along with the volume in a single player update (or with the track itself, see `playback_options`).
+
+The time between one track ending and the next one starting is recorded as the "track_transition" statistic.
+"""
+
+QUEUE_LENGTH = 10 # Tracks shown in the queue embed
+
+register_statistic("track_transition", display_name="Track Transition Gap", category="Music")
+
+class TrackQueue(list):
+    """
+    A list of tracks that maintains the sum of their durations.
+    Only the mutating list methods lavalink and the music cog use are overridden, everything else behaves like a list.
+    """
+    def __init__(self, tracks : Iterable[lavalink.AudioTrack] = ()):
+        super().__init__(tracks)
+        self.duration : int = sum(track.duration for track in self)
+        self.version : int = 0
+
+    def _changed(self, added : int = 0, removed : int = 0) -> None:
+        self.duration += added - removed
+        self.version += 1
+
+    def append(self, track : lavalink.AudioTrack) -> None:
+        super().append(track)
+        self._changed(added=track.duration)
+
+    def insert(self, index : SupportsIndex, track : lavalink.AudioTrack) -> None:
+        super().insert(index, track)
+        self._changed(added=track.duration)
+
+    def extend(self, tracks : Iterable[lavalink.AudioTrack]) -> None:
+        tracks = list(tracks)
+        super().extend(tracks)
+        self._changed(added=sum(track.duration for track in tracks))
+
+    def __iadd__(self, tracks : Iterable[lavalink.AudioTrack]) -> "TrackQueue":
+        self.extend(tracks)
+        return self
+
+    def pop(self, index : SupportsIndex = -1) -> lavalink.AudioTrack:
+        track = super().pop(index)
+        self._changed(removed=track.duration)
+        return track
+
+    def remove(self, track : lavalink.AudioTrack) -> None:
+        super().remove(track)
+        self._changed(removed=track.duration)
+
+    def clear(self) -> None:
+        super().clear()
+        self.duration = 0
+        self.version += 1
+
+    def __setitem__(self, index, value) -> None:
+        super().__setitem__(index, value)
+        self._recount()
+
+    def __delitem__(self, index) -> None:
+        super().__delitem__(index)
+        self._recount()
+
+    def sort(self, *args, **kwargs) -> None:
+        super().sort(*args, **kwargs)
+        self.version += 1
+
+    def reverse(self) -> None:
+        super().reverse()
+        self.version += 1
+
+    def _recount(self) -> None:
+        # Slice assignment and deletion are rare (shuffling the whole queue), just start over.
+        self.duration = sum(track.duration for track in self)
+        self.version += 1
+
+class RotiPlayer(lavalink.DefaultPlayer):
+    def __init__(self, guild_id : int, node : lavalink.Node):
+        super().__init__(guild_id, node)
+        self.queue : TrackQueue = TrackQueue()
+        self._queue_fields : Optional[Tuple[int, List[Tuple[str, str]]]] = None # (queue version, fields)
+        self._track_ended_at : Optional[float] = None
+
+    async def handle_event(self, event : lavalink.events.Event) -> None:
+        if isinstance(event, lavalink.events.TrackEndEvent):
+            # Only ends that move on to another track count, not stops, replacements or the queue running out.
+            self._track_ended_at = perf_counter() if event.reason.may_start_next() and (self.queue or self.loop) else None
+        elif isinstance(event, lavalink.events.TrackStartEvent) and self._track_ended_at is not None:
+            record_statistic("track_transition", perf_counter() - self._track_ended_at)
+            self._track_ended_at = None
+        await super().handle_event(event)
+
+    def queue_fields(self) -> List[Tuple[str, str]]:
+        """
+        The (name, value) embed fields for the first QUEUE_LENGTH tracks, re-rendered only when the queue changes.
+        """
+        if self._queue_fields is None or self._queue_fields[0] != self.queue.version:
+            fields = [
+                (f"{i}. {track.title} - [{strftime('%H:%M:%S', gmtime(track.duration // 1000))}]", f"Requested by: <@{track.requester}>")
+                for i, track in enumerate(self.queue[:QUEUE_LENGTH], start=1)
+            ]
+            self._queue_fields = (self.queue.version, fields)
+        return self._queue_fields[1]
+
+    def use_settings(self, settings : MusicSettings) -> None:
+        """
+        Sets the volume and filters from a server's settings locally, without updating Lavalink.
+        """
+        self.volume = max(0, min(settings.volume, 1000))
+        if settings.speed == 100 and settings.pitch == 100:
+            self.filters.pop('timescale', None)
+        else:
+            # Lavalink rejects a speed or pitch below 0.1, older settings rows may still hold 0.
+            speed, pitch = max(settings.speed, 10), max(settings.pitch, 10)
+            self.filters['timescale'] = lavalink.filters.Timescale(speed=speed / 100, pitch=pitch / 100)
+
+    def playback_options(self) -> Dict[str, Any]:
+        """
+        The volume and filters to send along with a play() call.
+        """
+        return {"volume": self.volume, "filters": list(self.filters.values())}
+
+    async def apply_settings(self, settings : MusicSettings) -> None:
+        """
+        Applies a server's volume, speed and pitch in one player update.
+        """
+        self.use_settings(settings)
+        await self.node.update_player(guild_id=self.guild_id, **self.playback_options())
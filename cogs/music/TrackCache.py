@@ -0,0 +1,121 @@
+import os
+import time
+import asyncio
+import lavalink
+
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+"""
+LRU cache of Lavalink track lookups, shared by every guild.
+
+Searches are keyed on their case and whitespace-normalized text, URLs on the URL itself. Entries expire after
+MUSIC_SEARCH_CACHE_TTL seconds (default 30 minutes) and the least recently used ones are evicted past
+MUSIC_SEARCH_CACHE_ENTRIES (default 512) entries or MUSIC_SEARCH_CACHE_BYTES (default 32 MiB) of estimated size.
+Identical lookups made while one is in flight share its result. Only lookups that found something are cached.
+
+Lavalink's player.add() writes the requester onto the track itself, so every caller gets its own copy of the tracks.
+"""
+
+_TTL : float = float(os.getenv("MUSIC_SEARCH_CACHE_TTL", str(30 * 60)))
+_MAX_ENTRIES : int = int(os.getenv("MUSIC_SEARCH_CACHE_ENTRIES", "512"))
+_MAX_BYTES : int = int(os.getenv("MUSIC_SEARCH_CACHE_BYTES", str(32 * 1024 * 1024)))
+_TRACK_OVERHEAD = 256 # Rough size of an AudioTrack's fixed fields and info dict, on top of its strings.
+_CACHEABLE = (lavalink.LoadType.TRACK, lavalink.LoadType.SEARCH, lavalink.LoadType.PLAYLIST)
+
+def normalize_query(query : str) -> str:
+    """
+    The identifier Lavalink is asked to load for a /music play query, URLs are kept as-is and anything else is a YouTube search.
+    """
+    query = query.strip()
+    if query.startswith('http'):
+        return query
+    return f"ytsearch:{' '.join(query.casefold().split())}"
+
+def _estimate_size(result : lavalink.LoadResult) -> int:
+    return sum(
+        _TRACK_OVERHEAD + len(track.track or "") + len(track.title) + len(track.author) + len(track.uri) + len(track.artwork_url or "")
+        for track in result.tracks
+    )
+
+def _copy(result : lavalink.LoadResult, limit : Optional[int] = None) -> lavalink.LoadResult:
+    return lavalink.LoadResult(
+        result.load_type,
+        [type(track)(track) for track in result.tracks[:limit]],
+        playlist_info=result.playlist_info,
+        plugin_info=result.plugin_info,
+        error=result.error
+    )
+
+class TrackCache:
+    def __init__(self, max_entries : int = _MAX_ENTRIES, max_bytes : int = _MAX_BYTES, ttl : float = _TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries : OrderedDict[str, Tuple[float, int, lavalink.LoadResult]] = OrderedDict() # key -> (expiry, size, result)
+        self._in_flight : Dict[str, asyncio.Future] = {}
+        self.size = 0
+        self.hits = self.misses = self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key : str, limit : Optional[int] = None) -> Optional[lavalink.LoadResult]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, result = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return _copy(result, limit)
+
+    def put(self, key : str, result : lavalink.LoadResult) -> None:
+        if result is None or result.load_type not in _CACHEABLE or not result.tracks:
+            return
+        size = _estimate_size(result)
+        if size > self.max_bytes:
+            return
+
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, size, _copy(result))
+        self.size += size
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key : str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    async def get_or_load(self, query : str, loader : Callable[[str], Awaitable[lavalink.LoadResult]], limit : Optional[int] = None) -> Tuple[lavalink.LoadResult, bool]:
+        """
+        Returns the result for `query`, with at most `limit` tracks, and whether it came from the cache (or another in-flight lookup).
+        `loader` is called with the normalized identifier on a miss.
+        """
+        key = normalize_query(query)
+        if (cached := self.get(key, limit)) is not None:
+            self.hits += 1
+            return cached, True
+        if (pending := self._in_flight.get(key)) is not None:
+            self.coalesced += 1
+            result = await asyncio.shield(pending)
+            return (_copy(result, limit) if result is not None else None), True
+
+        self.misses += 1
+        future = self._in_flight[key] = asyncio.get_running_loop().create_future()
+        result = None
+        try:
+            result = await loader(key)
+            self.put(key, result)
+        finally:
+            self._in_flight.pop(key, None)
+            if not future.done():
+                future.set_result(result)
+        if result is not None and limit is not None:
+            # A new result rather than slicing in place, requests coalesced onto this one still need every track.
+            result = lavalink.LoadResult(result.load_type, result.tracks[:limit], result.playlist_info, result.plugin_info, result.error)
+        return result, False
+
+track_cache = TrackCache()
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import aiohttp
+import lavalink
+
+from collections import OrderedDict
+from typing import Dict, Optional
+
+"""
+Gets the next queued track ready while the current one is still playing.
+
+Lavalink.py starts the next track itself as soon as the previous one ends, so whatever that track still needs has to
+be done beforehand: deferred tracks (ones without an encoded track yet) are resolved, and the artwork the queue embed
+will show is checked, falling back to YouTube's own thumbnail or none at all instead of a broken image.
+Lavalink resolves the actual stream URL from the encoded track on play, so those are never stale on our side.
+"""
+
+_ARTWORK_TIMEOUT = aiohttp.ClientTimeout(total=5)
+_ARTWORK_CACHE_SIZE = 1024
+
+class TrackPreloader:
+    def __init__(self, client : lavalink.Client, session : aiohttp.ClientSession):
+        self.logger = logging.getLogger(__name__)
+        self.client = client
+        self.session = session
+        self._artwork : OrderedDict[str, Optional[str]] = OrderedDict() # artwork url -> url to use instead
+        self._tasks : Dict[int, asyncio.Task] = {}
+        self._pending : Dict[int, lavalink.AudioTrack] = {} # guild id -> track being preloaded
+        self.preloaded = self.failed = 0
+
+    @staticmethod
+    def next_track(player : lavalink.DefaultPlayer) -> Optional[lavalink.AudioTrack]:
+        # Looping a single track replays the current one, and a shuffled queue could play anything next.
+        if not player.queue or player.loop == player.LOOP_SINGLE or player.shuffle:
+            return None
+        return player.queue[0]
+
+    def schedule(self, player : lavalink.DefaultPlayer) -> None:
+        """
+        Preloads the player's next track in the background, replacing any preload already running for it.
+        """
+        guild_id = player.guild_id
+        track = self.next_track(player)
+        if track is None or self._pending.get(guild_id) is track:
+            return
+        if (task := self._tasks.get(guild_id)) is not None:
+            task.cancel()
+
+        self._pending[guild_id] = track
+        task = self._tasks[guild_id] = asyncio.create_task(self._preload(track))
+        task.add_done_callback(lambda t: self._done(guild_id, t))
+
+    def _done(self, guild_id : int, task : asyncio.Task) -> None:
+        if self._tasks.get(guild_id) is task:
+            del self._tasks[guild_id]
+            del self._pending[guild_id]
+
+    def stop(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+        self._pending.clear()
+
+    async def _preload(self, track : lavalink.AudioTrack) -> None:
+        try:
+            if track.track is None and isinstance(track, lavalink.DeferredAudioTrack):
+                track.track = await track.load(self.client)
+            track.artwork_url = await self.artwork(track)
+            self.preloaded += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += 1
+            self.logger.warning(f"Failed to preload {track.title}: {e}")
+
+    async def artwork(self, track : lavalink.AudioTrack) -> Optional[str]:
+        """
+        A thumbnail URL for the track that's known to load, if there is one.
+        """
+        fallback = f"https://i.ytimg.com/vi/{track.identifier}/mqdefault.jpg" if track.source_name == "youtube" else None
+        url = track.artwork_url
+        if not url or url == fallback:
+            return fallback
+
+        if url not in self._artwork:
+            self._artwork[url] = url if await self._is_image(url) else fallback
+            while len(self._artwork) > _ARTWORK_CACHE_SIZE:
+                self._artwork.popitem(last=False)
+        self._artwork.move_to_end(url)
+        return self._artwork[url]
+
+    async def _is_image(self, url : str) -> bool:
+        try:
+            async with self.session.get(url, timeout=_ARTWORK_TIMEOUT) as response:
+                return response.status == 200 and response.content_type.startswith("image/")
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return False
@@ -0,0 +1,105 @@
+import time
+import asyncio
+import logging
+import discord
+
+from typing import Dict, Optional, Set
+
+"""
+Debounced voice channel statuses ("Playing: ..." at the top of the voice channel).
+
+Channel edits have tight rate limits, and skipping through a queue used to fire one per track. Requests for a channel
+are coalesced for _DEBOUNCE seconds and only the latest desired status is written, at most once per _MIN_INTERVAL.
+The last status written to each channel is remembered until Roti leaves it, so a status that's already showing is
+never rewritten. discord.py waits out and retries 429s itself, so the rate limit branch below only backs off when it
+gives up on a request.
+"""
+
+_DEBOUNCE = 2.0
+_MIN_INTERVAL = 5.0 # Between consecutive writes to the same channel
+_MAX_BACKOFF = 120.0
+_UNKNOWN = object() # Status of a channel we haven't written yet
+
+class VoiceStatusUpdater:
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._channels : Dict[int, discord.VoiceChannel] = {}
+        self._desired : Dict[int, Optional[str]] = {}
+        self._applied : Dict[int, Optional[str]] = {}
+        self._last_write : Dict[int, float] = {} # channel id -> time.monotonic() of the last write
+        self._released : Set[int] = set() # Channels Roti left while a write was still pending
+        self._tasks : Dict[int, asyncio.Task] = {}
+        self.writes = self.skipped = self.rate_limited = 0
+
+    def set(self, channel : Optional[discord.VoiceChannel], status : Optional[str]) -> None:
+        """
+        Requests `status` for the channel (None clears it), applied after the debounce window.
+        """
+        if channel is None or not channel.guild.me.guild_permissions.manage_channels:
+            return
+
+        self._released.discard(channel.id)
+        if channel.id not in self._tasks and self._applied.get(channel.id, _UNKNOWN) == status:
+            self.skipped += 1
+            return
+
+        self._channels[channel.id] = channel
+        self._desired[channel.id] = status
+        if channel.id not in self._tasks:
+            self._tasks[channel.id] = asyncio.create_task(self._flush(channel.id))
+
+    def clear(self, channel : Optional[discord.VoiceChannel]) -> None:
+        self.set(channel, None)
+
+    def forget(self, channel : discord.abc.GuildChannel) -> None:
+        """
+        Drops what's known about a channel Roti left, once any pending write to it has finished.
+        """
+        if channel.id in self._tasks:
+            self._released.add(channel.id)
+        else:
+            self._applied.pop(channel.id, None)
+            self._last_write.pop(channel.id, None)
+
+    def stop(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+
+    async def _flush(self, channel_id : int) -> None:
+        since_write = time.monotonic() - self._last_write.get(channel_id, float("-inf"))
+        delay, backoff = max(_DEBOUNCE, _MIN_INTERVAL - since_write), _MIN_INTERVAL
+        try:
+            while True:
+                await asyncio.sleep(delay)
+                status = self._desired[channel_id]
+                if self._applied.get(channel_id, _UNKNOWN) == status:
+                    self.skipped += 1
+                    return
+
+                try:
+                    await self._channels[channel_id].edit(status=status)
+                except discord.HTTPException as e:
+                    if e.status != 429:
+                        self.logger.error(f"Failed to set voice status: {e}")
+                        return
+                    self.rate_limited += 1
+                    retry_after = float(e.response.headers.get("Retry-After", 0)) if e.response is not None else 0
+                    delay = max(retry_after, backoff)
+                    backoff = min(backoff * 2, _MAX_BACKOFF)
+                    continue
+
+                self.writes += 1
+                self._applied[channel_id] = status
+                self._last_write[channel_id] = time.monotonic()
+                if self._desired[channel_id] == status:
+                    return
+                delay = _MIN_INTERVAL # A newer status came in while writing
+        finally:
+            self._tasks.pop(channel_id, None)
+            self._channels.pop(channel_id, None)
+            self._desired.pop(channel_id, None)
+            if channel_id in self._released:
+                self._released.discard(channel_id)
+                self._applied.pop(channel_id, None)
+                self._last_write.pop(channel_id, None)
@@ -2,7 +2,9 @@ import typing
 import os
 import discord
 import lavalink
+import time
 import random
+import asyncio
 import logging
 
 from discord.ext import commands, tasks
@@ -10,7 +12,19 @@ from discord import app_commands
 from database.data import RotiDatabase, RotiState, MusicSettings
 from time import strftime, gmtime
 from utils.RotiUtilities import cog_command
-from cogs.statistics.statistics_helpers import statistic
+from cogs.statistics.statistics_helpers import statistic, record_cache_lookup
+from utils.Tracing import span
+from cogs.music.QueueEmbedRefresher import QueueEmbedRefresher
+from cogs.music.RotiPlayer import RotiPlayer, QUEUE_LENGTH
+from cogs.music.TrackCache import track_cache
+from cogs.music.NodePool import NodePool, parse_nodes
+from cogs.music.MusicSessions import MusicSessions, SNAPSHOT_INTERVAL
+from cogs.music.MusicSettingsCache import MusicSettingsCache
+from cogs.music.VoiceStatusUpdater import VoiceStatusUpdater
+from cogs.music.TrackPreloader import TrackPreloader
+
+_PLAYLIST_BATCH = 20 # Tracks added to the queue per step when ingesting a playlist
+_PLAYLIST_PROGRESS_INTERVAL = 1.5 # Seconds between progress edits
 
 # --- Voice Client Handshake ---
 class LavalinkVoiceClient(discord.VoiceProtocol):
@@ -41,7 +55,7 @@ class LavalinkVoiceClient(discord.VoiceProtocol):
         player.channel_id = None
         self.cleanup()
 
-def _generate_queue_embed(player: lavalink.DefaultPlayer, interaction: discord.Interaction):
+def _generate_queue_embed(player: RotiPlayer):
     current = player.current
     if not current:
         return discord.Embed(description="Nothing is playing right now.", color=0xecc98e)
@@ -49,8 +63,8 @@ def _generate_queue_embed(player: lavalink.DefaultPlayer, interaction: discord.I
     # 1. Remaining time on current track
     current_remaining = current.duration - player.position
     
-    # 2. Total duration of all songs in the queue
-    queue_duration = sum(t.duration for t in player.queue)
+    # 2. Total duration of all songs in the queue, kept up to date by the queue itself
+    queue_duration = player.queue.duration
     
     # 3. Total time until music stops
     total_remaining_ms = current_remaining + queue_duration
@@ -68,15 +82,9 @@ def _generate_queue_embed(player: lavalink.DefaultPlayer, interaction: discord.I
     )
 
     # --- Queue List Display ---
-    QUEUE_LENGTH = 10
     if player.queue:
-        for i, track in enumerate(player.queue[:QUEUE_LENGTH], start=1):
-            track_dur = strftime('%H:%M:%S', gmtime(track.duration // 1000))
-            embed.add_field(
-                name=f"{i}. {track.title} - [{track_dur}]", 
-                value=f"Requested by: <@{track.requester}>", 
-                inline=False
-            )
+        for name, value in player.queue_fields():
+            embed.add_field(name=name, value=value, inline=False)
         
         # Check if there are hidden songs
         remaining_count = len(player.queue) - QUEUE_LENGTH
@@ -94,10 +102,15 @@ def _generate_queue_embed(player: lavalink.DefaultPlayer, interaction: discord.I
     if current and hasattr(current, 'artwork_url'):
         embed.set_thumbnail(url=current.artwork_url)
     
-    player.store('queue_embed', embed)
-    player.store('queue_interaction', interaction)
     return embed
 
+def _playlist_status(name : str, added : int, total : int, truncated : bool, done : bool) -> str:
+    if not done:
+        return f"Adding playlist **{name}**... ({added}/{total} tracks)"
+    if truncated:
+        return f"Playlist **{name}** is too large! Added the first **{added}** tracks."
+    return f"Added playlist **{name}** ({added} tracks)."
+
 @cog_command
 class Music(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -108,24 +121,92 @@ class Music(commands.Cog):
         self.MAX_TRACKS = 100
         
         if not hasattr(bot, 'lavalink'):
-            bot.lavalink = lavalink.Client(bot.user.id)
+            bot.lavalink = lavalink.Client(bot.user.id, player=RotiPlayer)
             
         self.lavalink = bot.lavalink
-        if not self.lavalink._event_hooks:
-            self.lavalink.add_event_hooks(self)
+        self.lavalink.add_event_hooks(self)
+
+        self.queue_refresher = QueueEmbedRefresher(_generate_queue_embed, self.lavalink.player_manager.get)
+        self.node_pool = NodePool(self.lavalink)
+        self.sessions = MusicSessions(self.lavalink)
+        self.settings = MusicSettingsCache()
+        self.voice_status = VoiceStatusUpdater()
+        self.preloader = TrackPreloader(self.lavalink, self.bot.session)
+        self._restore_task : asyncio.Task = None
+        self._playlist_tasks : typing.Set[asyncio.Task] = set()
         
     async def cog_load(self):
-        host = self.state.credentials.music_ip
+        credentials = self.state.credentials
         port = int(os.getenv('LAVALINK_PORT', '2333'))
-        password = self.state.credentials.music_pass
         
-        if not self.lavalink.node_manager.nodes:
-            self.lavalink.add_node(host, port, password, 'us', 'default-node')
+        self.node_pool.install()
+        for config in parse_nodes(credentials.music_nodes, credentials.music_ip, port):
+            self.node_pool.add(config, credentials.music_pass)
+        self._check_nodes.start()
+        self._snapshot_sessions.start()
+        self._restore_task = asyncio.create_task(self._restore_sessions())
+
+    async def cog_unload(self):
+        self._check_nodes.cancel()
+        self._snapshot_sessions.cancel()
+        self._restore_task.cancel()
+        for task in self._playlist_tasks:
+            task.cancel()
+        self.queue_refresher.stop()
+        self.voice_status.stop()
+        self.preloader.stop()
+        # The client outlives the cog, drop this instance's hooks so a reload doesn't keep calling into it.
+        self.lavalink.remove_event_hooks(hooks=[
+            self.node_connected, self.node_disconnected, self.node_changed,
+            self.track_failed, self.track_start, self.track_end
+        ])
+        # Final snapshot so a restart picks up exactly where playback stopped.
+        await asyncio.gather(*self.sessions.save_all(force=True), return_exceptions=True)
+
+    async def _restore_sessions(self):
+        await self.settings.warm()
+        await self.bot.wait_until_ready()
+        for _ in range(30):
+            if self.lavalink.node_manager.available_nodes:
+                break
+            await asyncio.sleep(1)
+        else:
+            return self.logger.warning("No Lavalink node became available, music sessions were not restored.")
+
+        restored = await self.sessions.restore(self.bot, LavalinkVoiceClient)
+        if restored:
+            self.logger.info(f"Restored {restored} music sessions")
+
+    @tasks.loop(seconds=30)
+    async def _check_nodes(self):
+        await self.node_pool.check()
+
+    @tasks.loop(seconds=SNAPSHOT_INTERVAL)
+    async def _snapshot_sessions(self):
+        self.sessions.save_all()
+
+    @lavalink.listener(lavalink.events.NodeConnectedEvent)
+    async def node_connected(self, event: lavalink.events.NodeConnectedEvent):
+        self.node_pool.node_connected(event.node)
+
+    @lavalink.listener(lavalink.events.NodeDisconnectedEvent)
+    async def node_disconnected(self, event: lavalink.events.NodeDisconnectedEvent):
+        self.logger.warning(f"Lavalink node {event.node.name} disconnected ({event.code}: {event.reason})")
+        self.node_pool.node_disconnected(event.node)
+
+    @lavalink.listener(lavalink.events.NodeChangedEvent)
+    async def node_changed(self, event: lavalink.events.NodeChangedEvent):
+        self.node_pool.node_changed(event.old_node, event.new_node)
+
+    @lavalink.listener(lavalink.events.TrackExceptionEvent, lavalink.events.TrackStuckEvent)
+    async def track_failed(self, event):
+        self.node_pool.track_failed(event.player.node)
 
     @lavalink.listener(lavalink.events.TrackStartEvent)
     async def track_start(self, event: lavalink.events.TrackStartEvent):
         player = event.player
         guild = self.bot.get_guild(player.guild_id)
+        self.preloader.schedule(player)
         
         # 1. Standard "Now Playing" message
         cid = player.fetch('channel')
@@ -135,37 +216,25 @@ class Music(commands.Cog):
                 await channel.send(f"Now playing **{event.track.title}**!", delete_after=20)
 
         # 2. Voice Status Feature
-        if guild.me.guild_permissions.manage_channels:
-            voice_channel = guild.get_channel(int(player.channel_id))
-            if voice_channel:
-                status = f"Playing: {event.track.title}"
-                if len(status) > 32:
-                    status = status[:29] + "..."
-                
-                try:
-                    await voice_channel.edit(status=status)
-                except Exception as e:
-                    self.logger.error(f"Failed to set voice status: {e}")
+        status = f"Playing: {event.track.title}"
+        if len(status) > 32:
+            status = status[:29] + "..."
+        self.voice_status.set(guild.get_channel(int(player.channel_id)), status)
 
     @lavalink.listener(lavalink.events.TrackEndEvent)
     async def track_end(self, event: lavalink.events.TrackEndEvent):
         player = event.player
-        interaction = player.fetch('queue_interaction')
-        if interaction:
-            try:
-                embed = _generate_queue_embed(player, interaction)
-                await interaction.edit_original_response(embed=embed)
-            except:
-                pass
+        self.queue_refresher.refresh_guild(player.guild_id)
                 
-        if not player.queue and not player.is_playing:
+        if not player.queue and not player.is_playing and player.channel_id:
             guild = self.bot.get_guild(player.guild_id)
-            voice_channel = guild.get_channel(int(player.channel_id))
-            if voice_channel and guild.me.guild_permissions.manage_channels:
-                await voice_channel.edit(status=None)
+            self.voice_status.clear(guild.get_channel(int(player.channel_id)))
     
     @commands.Cog.listener()
     async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
+        if member.id == self.bot.user.id and before.channel is not None and before.channel != after.channel:
+            self.voice_status.forget(before.channel)
+
         # We only care if someone leaves a channel
         if before.channel is not None and after.channel is None:
             # Check if the channel they left is the one the bot is in
@@ -176,18 +245,7 @@ class Music(commands.Cog):
             if before.channel.id == int(player.channel_id):
                 # Check if there are any non-bot members left
                 if not any(not m.bot for m in before.channel.members):
-                    # Reset the Voice Status (the feature we just added)
-                    if before.channel.guild.me.guild_permissions.manage_channels:
-                        try:
-                            await before.channel.edit(status=None)
-                        except: pass
-                    
-                    # Clear the player and disconnect
-                    await player.stop()
-                    player.queue.clear()
-                    player.delete('queue_interaction')
-                    player.delete('queue_embed')
-                    await self.bot.get_guild(before.channel.guild.id).change_voice_state(channel=None)
+                    await self._leave(before.channel.guild, player)
                     
                     # Send a notification to the last text channel used
                     cid = player.fetch('channel')
@@ -196,24 +254,6 @@ class Music(commands.Cog):
                         if channel:
                             await channel.send("Leaving voice channel as it is empty. ✌️", delete_after=10)
 
-    @tasks.loop(seconds=1)
-    async def _update_queue_embed_time(self, player: lavalink.DefaultPlayer):
-        try:
-            interaction = player.fetch('queue_interaction')
-            embed = player.fetch('queue_embed')
-            if player and embed and interaction and player.is_playing:
-                pos = strftime("%H:%M:%S", gmtime(player.position // 1000))
-                dur = strftime("%H:%M:%S", gmtime(player.current.duration // 1000))
-
-                status = "playing" if player.loop == 0 else "looping"
-                embed.description = f"Currently {status}: [{player.current.title}]({player.current.uri}) [{pos}/{dur}]"
-                
-                await interaction.edit_original_response(embed=embed)
-            else:
-                self._update_queue_embed_time.stop()
-        except:
-            self._update_queue_embed_time.stop()
-    
     @app_commands.command(name="join", description="Join your current voice channel.")
     async def _join(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
@@ -229,8 +269,14 @@ class Music(commands.Cog):
         await interaction.followup.send(f"Joined **{interaction.user.voice.channel.name}**!")
     
     @statistic(display_name="Music Queries", category="Music")
-    async def _get_tracks(self, player : lavalink.BasePlayer, query : str) -> lavalink.LoadResult:
-        return await player.node.get_tracks(query if query.startswith('http') else f'ytsearch:{query}')
+    async def _get_tracks(self, player : lavalink.BasePlayer, query : str, limit : typing.Optional[int] = None) -> lavalink.LoadResult:
+        async def load(identifier : str) -> lavalink.LoadResult:
+            with span("lavalink.get_tracks", node=player.node.name):
+                return await player.node.get_tracks(identifier)
+
+        result, hit = await track_cache.get_or_load(query, load, limit)
+        record_cache_lookup("_get_tracks", hit)
+        return result
 
     @app_commands.command(name="play", description="Play audio from a URL or query.")
     async def _play(self, interaction: discord.Interaction, *, query: str):
@@ -240,48 +286,85 @@ class Music(commands.Cog):
             return await interaction.followup.send("You need to join a voice channel first!")
 
         player = self.lavalink.player_manager.create(interaction.guild.id)
+        self.settings.prefetch(interaction.guild_id) # Usually cached already, otherwise loads alongside the search
         
         if not player.is_connected:
             player.store('channel', interaction.channel.id)
             await interaction.user.voice.channel.connect(cls=LavalinkVoiceClient)
 
-        results = await self._get_tracks(player, query)
+        space = self.MAX_TRACKS - len(player.queue)
+        if space <= 0:
+            return await interaction.followup.send(f"The queue is currently full at {self.MAX_TRACKS} songs!")
+
+        # Only load what fits in the queue, plus one to tell whether a playlist had to be cut short.
+        results = await self._get_tracks(player, query, limit=space + 1)
         
         if not results or not results.tracks:
             return await interaction.followup.send("No results found.")
-        if len(player.queue) >= self.MAX_TRACKS:
-            return await interaction.followup.send(f"The queue is currently full at {self.MAX_TRACKS} songs!")
 
         if results.load_type == lavalink.LoadType.PLAYLIST:
-            tracks_to_add = results.tracks
-
-            if len(tracks_to_add) + len(player.queue) <= self.MAX_TRACKS:
-                for track in tracks_to_add:
-                    player.add(requester=interaction.user.id, track=track)
-                
-                await interaction.followup.send(
-                    f"Added playlist **{results.playlist_info.name}** "
-                    f"({len(tracks_to_add)} tracks)."
-                )
-            else:
-                remaining_space = self.MAX_TRACKS - len(player.queue)
-
-                for track in tracks_to_add[:remaining_space]:
-                    player.add(requester=interaction.user.id, track=track)
-
-                await interaction.followup.send(
-                    f"Playlist **{results.playlist_info.name}** is too large! "
-                    f"Added the first **{remaining_space}** tracks."
-                )
+            tracks = results.tracks[:space]
+            truncated = len(results.tracks) > space
+            name = results.playlist_info.name
+
+            # Start on the first track right away, the rest is queued in the background.
+            player.add(requester=interaction.user.id, track=tracks[0])
+            await self._start_playback(player, interaction.guild_id)
+
+            if len(tracks) == 1:
+                return await interaction.followup.send(_playlist_status(name, 1, 1, truncated, done=True))
+            message = await interaction.followup.send(_playlist_status(name, 1, len(tracks), truncated, done=False))
+            task = asyncio.create_task(self._enqueue_playlist(player, message, tracks[1:], interaction.user.id, name, truncated))
+            self._playlist_tasks.add(task)
+            task.add_done_callback(self._playlist_tasks.discard)
         else:
             track = results.tracks[0]
             player.add(requester=interaction.user.id, track=track)
             await interaction.followup.send(f"Added **{track.title}** to queue!")
+            await self._start_playback(player, interaction.guild_id)
 
+    async def _start_playback(self, player : RotiPlayer, guild_id : int):
         if not player.is_playing:
-            row = await self.db.select(MusicSettings, server_id=interaction.guild_id)
-            await player.set_volume(row.volume)
-            await player.play()
+            # The server's volume and filters go out with the track in a single update.
+            player.use_settings(await self.settings.get(guild_id))
+            await player.play(**player.playback_options())
+        else:
+            self.preloader.schedule(player) # The new track may be the next one up
+
+    async def _enqueue_playlist(self, player : RotiPlayer, message : discord.WebhookMessage, tracks : typing.List[lavalink.AudioTrack], requester : int, name : str, truncated : bool):
+        """
+        Adds the rest of a playlist in batches, keeping the queue cap (which other /play commands may be filling at the same time)
+        and editing the progress into `message` as it goes.
+        """
+        added, total = 1, len(tracks) + 1
+        last_edit = time.monotonic()
+        for start in range(0, len(tracks), _PLAYLIST_BATCH):
+            if not player.is_connected:
+                break
+
+            batch = tracks[start:start + _PLAYLIST_BATCH]
+            fits = batch[:max(0, self.MAX_TRACKS - len(player.queue))]
+            for track in fits:
+                player.add(requester=requester, track=track)
+            added += len(fits)
+            if len(fits) < len(batch):
+                truncated = True
+                break
+
+            self.queue_refresher.refresh_guild(player.guild_id)
+            if time.monotonic() - last_edit >= _PLAYLIST_PROGRESS_INTERVAL:
+                last_edit = time.monotonic()
+                try:
+                    await message.edit(content=_playlist_status(name, added, total, truncated, done=False))
+                except discord.HTTPException:
+                    pass
+            await asyncio.sleep(0) # Let everything else run between batches
+
+        self.queue_refresher.refresh_guild(player.guild_id)
+        try:
+            await message.edit(content=_playlist_status(name, added, total, truncated, done=True))
+        except discord.HTTPException:
+            pass
     
     @app_commands.command(name="skip", description="Skips the current track playing")
     async def _skip(self, interaction: discord.Interaction):
@@ -296,10 +379,7 @@ class Music(commands.Cog):
 
         # If this is the last song in the queue, clear status.
         if not player.queue:
-            guild = interaction.guild
-            voice_channel = guild.get_channel(int(player.channel_id))
-            if voice_channel and guild.me.guild_permissions.manage_channels:
-                await voice_channel.edit(status=None)
+            self.voice_status.clear(interaction.guild.get_channel(int(player.channel_id)))
 
         await interaction.followup.send(f"Skipped {player.current.title}")
         await player.skip()
@@ -313,18 +393,19 @@ class Music(commands.Cog):
         if not player or not player.is_connected:
             return await interaction.followup.send("I'm not connected!")
 
-        if player:
-            if interaction.guild.me.guild_permissions.manage_channels:
-                vc = interaction.guild.get_channel(int(player.channel_id))
-                if vc:
-                    await vc.edit(status=None)
+        await self._leave(interaction.guild, player)
+        await interaction.followup.send("Disconnected!")
 
+    async def _leave(self, guild : discord.Guild, player : RotiPlayer):
+        """
+        Stops playback, clears the queue, voice status and saved session, and leaves the voice channel.
+        """
+        self.voice_status.clear(guild.get_channel(int(player.channel_id)))
         await player.stop()
         player.queue.clear()
-        player.delete('queue_interaction')
-        player.delete('queue_embed')
-        await self.bot.get_guild(interaction.guild.id).change_voice_state(channel=None)
-        await interaction.followup.send("Disconnected!")
+        self.queue_refresher.untrack_guild(guild.id)
+        await self.sessions.forget(guild.id)
+        await guild.change_voice_state(channel=None)
             
     @app_commands.command(name="queue", description="Displays the queue")
     async def _queue(self, interaction: discord.Interaction):
@@ -332,16 +413,14 @@ class Music(commands.Cog):
         player = self.lavalink.player_manager.get(interaction.guild.id)
         
         if player and (player.queue or player.is_playing):
-            row = await self.db.select(MusicSettings, server_id=interaction.guild_id)
-            view = MusicNav(player, row)
-            embed = _generate_queue_embed(player, interaction)
+            row = await self.settings.get(interaction.guild_id)
+            view = MusicNav(player, row, self)
+            embed = _generate_queue_embed(player)
             
             # Send and store message in view for auto-deletion
             message = await interaction.followup.send(embed=embed, view=view)
             view.message = message 
-
-            if not self._update_queue_embed_time.is_running():
-                self._update_queue_embed_time.start(player)
+            self.queue_refresher.track(message, interaction.guild_id, embed)
         else:
             await interaction.followup.send("The Queue is empty.")
     
@@ -366,46 +445,47 @@ class Music(commands.Cog):
         await interaction.followup.send(modes[new_loop])
     
     @app_commands.command(name="speed", description="Modify playback speed.")
-    async def _speed(self, interaction: discord.Interaction, speed: typing.Optional[app_commands.Range[int, 0, 200]]):
+    async def _speed(self, interaction: discord.Interaction, speed: typing.Optional[app_commands.Range[int, 10, 200]]):
         await interaction.response.defer(ephemeral=True)
         if speed is None:
-            row = self.db.select(MusicSettings, server_id=interaction.guild_id)
+            row = await self.settings.get(interaction.guild_id)
             return await interaction.followup.send(f"Current speed: {row.speed}%")
-        self.db.update(MusicSettings, server_id=interaction.guild_id, speed=speed)
-        player = self.lavalink.player_manager.get(interaction.guild_id)
-        if player: await player.set_filter(lavalink.filters.Timescale(speed=speed/100))
+
+        await self._update_settings(interaction.guild_id, speed=speed)
         await interaction.followup.send(f"Speed set to {speed}%")
 
     @app_commands.command(name="pitch", description="Modify playback pitch.")
-    async def _pitch(self, interaction: discord.Interaction, pitch: typing.Optional[app_commands.Range[int, 0, 200]]):
+    async def _pitch(self, interaction: discord.Interaction, pitch: typing.Optional[app_commands.Range[int, 10, 200]]):
         await interaction.response.defer(ephemeral=True)
         if pitch is None:
-            row = await self.db.select(MusicSettings, server_id=interaction.guild_id)
+            row = await self.settings.get(interaction.guild_id)
             return await interaction.followup.send(f"Current pitch is {row.pitch}%")
 
-        self.db.update(MusicSettings, server_id=interaction.guild_id, pitch=pitch)
-        player = self.lavalink.player_manager.get(interaction.guild_id)
-        if player:
-            await player.set_filter(lavalink.filters.Timescale(pitch=pitch/100))
+        await self._update_settings(interaction.guild_id, pitch=pitch)
         await interaction.followup.send(f"Pitch set to {pitch}%")
 
     @app_commands.command(name="volume", description="Modify the base volume.")
     async def _volume(self, interaction: discord.Interaction, volume: typing.Optional[app_commands.Range[int, 0, 500]]):
         await interaction.response.defer(ephemeral=True)
         if volume is None:
-            row = await self.db.select(MusicSettings, server_id=interaction.guild_id)
+            row = await self.settings.get(interaction.guild_id)
             return await interaction.followup.send(f"Current volume: {row.volume}%")
         
-        self.db.update(MusicSettings, server_id=interaction.guild_id, volume=volume)
-        player = self.lavalink.player_manager.get(interaction.guild_id)
-        if player: await player.set_volume(volume)
+        await self._update_settings(interaction.guild_id, volume=volume)
         await interaction.followup.send(f"Volume set to {volume}%")
 
+    async def _update_settings(self, guild_id : int, **changes):
+        settings = await self.settings.update(guild_id, **changes)
+        player = self.lavalink.player_manager.get(guild_id)
+        if player and player.is_connected:
+            await player.apply_settings(settings)
+
 # --- UI View with Timeout and Pitch ---
 class MusicNav(discord.ui.View):
-    def __init__(self, player: lavalink.DefaultPlayer, row : MusicSettings):
+    def __init__(self, player: RotiPlayer, row : MusicSettings, music : Music):
         super().__init__(timeout=60)
         self.player = player
+        self.music = music
         self.message = None # Will be set in the /queue command
         
         self._volume_label.label = f"{row.volume}%"
@@ -422,7 +502,7 @@ class MusicNav(discord.ui.View):
                 await self.message.delete()
             except:
                 pass
-        self.player.delete('queue_interaction')
+            self.music.queue_refresher.untrack(self.message.id)
         self.stop()
 
     @discord.ui.button(emoji="<:playbtn:994759843749580861>", style=discord.ButtonStyle.secondary)
@@ -448,24 +528,10 @@ class MusicNav(discord.ui.View):
     
     @discord.ui.button(emoji="<:disconnectbtn:996156534927130735>", style=discord.ButtonStyle.secondary)
     async def _disconnect(self, it: discord.Interaction, btn):
-        # 1. Clear player data and stop updates
-        await self.player.stop()
-        self.player.queue.clear()
-        self.player.delete('queue_interaction')
-        self.player.delete('queue_embed')
-        
-        # 2. Reset the Voice Status (top of the VC)
-        if it.guild.me.guild_permissions.manage_channels:
-            vc = it.guild.get_channel(int(self.player.channel_id))
-            if vc:
-                try:
-                    await vc.edit(status=None)
-                except: pass
-
-        # 3. Disconnect from Voice
-        await it.guild.change_voice_state(channel=None)
+        # 1. Stop playback, clear the queue and voice status, and disconnect
+        await self.music._leave(it.guild, self.player)
 
-        # 5. Cleanup the UI
+        # 2. Cleanup the UI
         try:
             await it.message.delete()
         except:
@@ -487,6 +553,7 @@ class MusicNav(discord.ui.View):
     @discord.ui.button(label="Close", style=discord.ButtonStyle.danger)
     async def _close(self, it: discord.Interaction, btn):
         await it.message.delete()
+        self.music.queue_refresher.untrack(it.message.id)
         self.stop()
 
 async def setup(bot: commands.Bot):
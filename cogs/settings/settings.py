@@ -13,7 +13,7 @@ class Settings(commands.GroupCog, group_name="settings"):
         super().__init__()
         self.bot = bot
         self.db = RotiDatabase()
-        self.brain = RotiBrain()
+        self.brain = RotiBrain(bot.session)
 
     talkback_group = app_commands.Group(name="talkback", description="Change the settings regarding the /talkback command.")
 
@@ -87,13 +87,12 @@ class Settings(commands.GroupCog, group_name="settings"):
             await interaction.followup.send(f"Current default model is: **{current.default_model}**")
             return
 
-        # Validation
-        from cogs.generate.RotiBrain import RotiBrain
-        brain = RotiBrain()
+        # Validation, only waits if the model catalog has never been loaded.
+        await self.brain.catalog.ready()
         
-        if model_name not in brain.text_models:
+        if model_name not in self.brain.text_models:
             # Create a nice list of available models for the error message
-            available = ", ".join([f"`{name}`" for name in list(brain.text_models.keys())[:5]])
+            available = ", ".join([f"`{name}`" for name in list(self.brain.text_models.keys())[:5]])
             await interaction.followup.send(
                 f"❌ Invalid model name: `{model_name}`\n"
                 f"Available models include: {available}, and more.\n"
@@ -1,19 +1,82 @@
 import discord
 import itertools
+import logging
 
-from typing import Dict
-from discord.ext import commands
+from typing import Dict, List
+from discord.ext import commands, tasks
 from discord import app_commands
 from database.data import RotiDatabase
 from utils.RotiUtilities import cog_command
-from cogs.statistics.statistics_helpers import FunctionStatistics, RotiUsage, RotiPopulation, get_population, get_perf_statistics, get_usage_statistics
+from cogs.statistics.telemetry import UsageEntry, get_telemetry, record_usage
+from cogs.statistics.statistics_helpers import FunctionStatistics, RotiUsage, RotiPopulation, get_population, get_population_counter, get_perf_statistics, get_usage_statistics
 
 @cog_command
 class Statistics(commands.GroupCog, group_name="statistics"):
     def __init__(self, bot : commands.Bot):
         super().__init__()
         self.bot = bot
+        self.logger = logging.getLogger(__name__)
         self.db = RotiDatabase()
+        self.population = get_population_counter()
+        self.telemetry = get_telemetry()
+
+    async def cog_load(self):
+        self._reconcile_population.start()
+        self._flush_telemetry.start()
+
+    async def cog_unload(self):
+        self._reconcile_population.cancel()
+        self._flush_telemetry.cancel()
+        await self.telemetry.flush(self.db)
+
+    @tasks.loop(minutes=1)
+    async def _flush_telemetry(self):
+        """
+        Writes the in-memory usage buckets to the database in batches.
+        """
+        await self.telemetry.flush(self.db)
+
+    @tasks.loop(minutes=30)
+    async def _reconcile_population(self):
+        """
+        Periodically corrects the incremental population counters against the gateway cache.
+        """
+        seeded = self.population.seeded
+        drift = self.population.reconcile(self.bot.guilds)
+        if seeded and drift: # The first reconcile only seeds the counters, that isn't drift
+            self.logger.info("Population counters drifted by %i users, reconciled.", drift)
+
+    @_reconcile_population.before_loop
+    async def _before_reconcile_population(self):
+        await self.bot.wait_until_ready()
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild : discord.Guild):
+        self.population.set_guild(guild.id, guild.member_count)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild : discord.Guild):
+        self.population.remove_guild(guild.id)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member : discord.Member):
+        self.population.adjust(member.guild.id, 1)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member : discord.Member):
+        self.population.adjust(member.guild.id, -1)
+
+    @commands.Cog.listener()
+    async def on_message(self, message : discord.Message):
+        record_usage(message.guild.id if message.guild else None, "on_message")
+
+    @commands.Cog.listener()
+    async def on_app_command_completion(self, interaction : discord.Interaction, command : app_commands.Command | app_commands.ContextMenu):
+        record_usage(interaction.guild_id, f"/{command.qualified_name}")
+
+    @commands.Cog.listener()
+    async def on_command_completion(self, ctx : commands.Context):
+        record_usage(ctx.guild.id if ctx.guild else None, f"${ctx.command.qualified_name}")
 
     @app_commands.command(name="performance", description="View the performance statistics for Roti.")
     async def _perf_statistics(self, interaction : discord.Interaction):
@@ -23,6 +86,38 @@ class Statistics(commands.GroupCog, group_name="statistics"):
     async def _usage_statistics(self, interaction : discord.Interaction):
         await interaction.response.send_message(embed=await self._build_usage_embed(), ephemeral=True)
 
+    @app_commands.command(name="top", description="View the servers or commands that use Roti the most.")
+    @app_commands.describe(category="Rank servers or commands", hours="How many hours back to look (1 - 168)")
+    @app_commands.choices(category=[
+        app_commands.Choice(name="Servers", value="server"),
+        app_commands.Choice(name="Commands & Events", value="source")
+    ])
+    async def _top_statistics(self, interaction : discord.Interaction, category : app_commands.Choice[str], hours : app_commands.Range[int, 1, 168] = 24):
+        await interaction.response.defer(ephemeral=True)
+        entries = await self.telemetry.top(self.db, category.value, hours)
+        await interaction.followup.send(embed=self._build_top_embed(category, hours, entries), ephemeral=True)
+
+    def _build_top_embed(self, category : app_commands.Choice[str], hours : int, entries : List[UsageEntry]) -> discord.Embed:
+        embed = discord.Embed(
+            title=f"Top {category.name} (Last {hours}h)",
+            colour=0xecc98e
+        )
+
+        if not entries:
+            embed.description = "No usage has been recorded for this period yet."
+            return embed
+
+        lines = []
+        for rank, entry in enumerate(entries, start=1):
+            name = entry.key
+            if category.value == "server":
+                guild = self.bot.get_guild(int(entry.key))
+                name = guild.name if guild else f"Unknown Server ({entry.key})"
+            lines.append(f"**{rank}.** {name} - {entry.total} events")
+
+        embed.description = "\n".join(lines)
+        return embed
+
     def _build_statistic_embed(self) -> discord.Embed:
         """
         Builds the displayed embed for the statistics, groups by categories.
@@ -37,6 +132,7 @@ class Statistics(commands.GroupCog, group_name="statistics"):
 
         for category, group in itertools.groupby(iterable=stats, key=lambda item : item[1].function_info.category):
             for func, stat in group:
+                cache_line = f"Cache Hit Rate: {100 * stat.cache_hits / stat.cache_lookups:.1f}%" if stat.cache_lookups else ""
                 embed.add_field(
                     name=stat.function_info.display_name,
                     value= \
@@ -45,6 +141,7 @@ class Statistics(commands.GroupCog, group_name="statistics"):
                     Longest Execution Time: {stat.longest_exec_time:.6f}s
                     Average Execution Time: {stat.average_exec_time:.6f}s
                     Times Invoked: {stat.times_invoked}
+                    {cache_line}
                     """,
                     inline=False
                 )
@@ -53,7 +150,7 @@ class Statistics(commands.GroupCog, group_name="statistics"):
 
     async def _build_usage_embed(self) -> discord.Embed:
         usage_stats : RotiUsage = await get_usage_statistics(self.db)
-        population : RotiPopulation = get_population(self.bot, [guild.id for guild in self.bot.guilds])
+        population : RotiPopulation = get_population()
         embed = discord.Embed(
             title="Roti Usage Statistics",
             description=f"Roti is registered in {population.servers} servers with {population.users} users!",
@@ -1,11 +1,10 @@
 import time
 import functools
 import asyncio
-from discord.ext import commands
 from collections import defaultdict, namedtuple
-from typing import Callable, Optional, List, NamedTuple
+from typing import Callable, Optional, NamedTuple, Dict, Iterable
 from dataclasses import dataclass, field
-from database.data import RotiDatabase, TalkbackTriggersTable, QuotesTable
+from database.data import RotiDatabase, UsageCountersTable
 
 @dataclass(slots=True, kw_only=True, frozen=True)
 class FunctionInfo:
@@ -54,8 +53,82 @@ class FunctionStatistics:
     longest_exec_time : float = field(default=float("-inf"))
     average_exec_time : float = field(default=0.0)
     times_invoked : int = field(default=0)
+    cache_lookups : int = field(default=0)
+    cache_hits : int = field(default=0)
+
+class PopulationCounter:
+    """
+    Incrementally maintained server and member totals for Roti.
+    Updated from guild/member gateway events so reads are O(1); `reconcile` corrects any drift against the gateway cache.
+    """
+    __slots__ = ("_members", "_total", "seeded")
+
+    def __init__(self):
+        self._members : Dict[int, int] = {}
+        self._total : int = 0
+        self.seeded : bool = False # Whether the counters have been built from the gateway cache yet
+
+    def set_guild(self, guild_id : int, member_count : Optional[int]) -> None:
+        member_count = member_count or 0
+        self._total += member_count - self._members.get(guild_id, 0)
+        self._members[guild_id] = member_count
+
+    def remove_guild(self, guild_id : int) -> None:
+        self._total -= self._members.pop(guild_id, 0)
+
+    def adjust(self, guild_id : int, delta : int) -> None:
+        if guild_id not in self._members:
+            return
+        self._members[guild_id] += delta
+        self._total += delta
+
+    def reconcile(self, guilds : Iterable) -> int:
+        """
+        Rebuilds the counters from the given guilds and returns how far the incremental total had drifted.
+        """
+        previous = self._total
+        self._members = {guild.id: guild.member_count or 0 for guild in guilds}
+        self._total = sum(self._members.values())
+        self.seeded = True
+        return self._total - previous
+
+    def snapshot(self) -> RotiPopulation:
+        return RotiPopulation(servers=len(self._members), users=self._total)
 
 _statistics : dict[str, FunctionStatistics] = defaultdict(FunctionStatistics)
+_population = PopulationCounter()
+
+def register_statistic(name : str, display_name : Optional[str] = None, category : Optional[str] = None) -> None:
+    """
+    Registers a statistic that is recorded manually with `record_statistic` rather than through the decorator,
+    e.g. for timings that don't line up with a single function call such as time to first token of a stream.
+    """
+    _statistics[name].function_info = FunctionInfo(
+        display_name=display_name if display_name else name,
+        qualified_name=name,
+        category=category
+    )
+
+def record_statistic(name : str, exec_time : float) -> None:
+    """
+    Records a single measurement (in seconds) for the given statistic.
+    """
+    stats = _statistics[name]
+
+    stats.times_invoked += 1
+    stats.shortest_exec_time = min(stats.shortest_exec_time, exec_time)
+    stats.longest_exec_time = max(stats.longest_exec_time, exec_time)
+    stats.average_exec_time = (
+        (stats.average_exec_time * (stats.times_invoked - 1)) + exec_time
+    ) / stats.times_invoked
+
+def record_cache_lookup(name : str, hit : bool) -> None:
+    """
+    Records whether a call to the given statistic was served from a cache, shown as its hit rate.
+    """
+    stats = _statistics[name]
+    stats.cache_lookups += 1
+    stats.cache_hits += hit
 
 def statistic(display_name: Optional[str] = None, category : Optional[str] = None):
     """
@@ -63,28 +136,14 @@ def statistic(display_name: Optional[str] = None, category : Optional[str] = Non
     Works with both synchronous functions and coroutines.
     """
     def decorator(func: Callable):
-        _statistics[func.__name__].function_info = FunctionInfo(
-            display_name=display_name if display_name else func.__name__,
-            qualified_name=func.__name__,
-            category=category
-        )
+        register_statistic(func.__name__, display_name, category)
 
         if asyncio.iscoroutinefunction(func):
             @functools.wraps(func)
             async def async_wrapper(*args, **kwargs):
                 start_time = time.perf_counter()
                 result = await func(*args, **kwargs)
-                end_time = time.perf_counter()
-                
-                exec_time = end_time - start_time
-                stats = _statistics[func.__name__]
-
-                stats.times_invoked += 1
-                stats.shortest_exec_time = min(stats.shortest_exec_time, exec_time)
-                stats.longest_exec_time = max(stats.longest_exec_time, exec_time)
-                stats.average_exec_time = (
-                    (stats.average_exec_time * (stats.times_invoked - 1)) + exec_time
-                ) / stats.times_invoked
+                record_statistic(func.__name__, time.perf_counter() - start_time)
                 return result
             
             return async_wrapper
@@ -93,17 +152,7 @@ def statistic(display_name: Optional[str] = None, category : Optional[str] = Non
             def sync_wrapper(*args, **kwargs):
                 start_time = time.perf_counter()
                 result = func(*args, **kwargs)
-                end_time = time.perf_counter()
-                
-                exec_time = end_time - start_time
-                stats = _statistics[func.__name__]
-
-                stats.times_invoked += 1
-                stats.shortest_exec_time = min(stats.shortest_exec_time, exec_time)
-                stats.longest_exec_time = max(stats.longest_exec_time, exec_time)
-                stats.average_exec_time = (
-                    (stats.average_exec_time * (stats.times_invoked - 1)) + exec_time
-                ) / stats.times_invoked
+                record_statistic(func.__name__, time.perf_counter() - start_time)
                 return result
             
             return sync_wrapper
@@ -167,53 +216,20 @@ def ttl_cache(ttl: int):
 def get_perf_statistics():
     return _statistics
 
-@ttl_cache(ttl=300)
+@ttl_cache(ttl=60)
 async def get_usage_statistics(db : RotiDatabase) -> RotiUsage:
-    talkbacks = await _calculate_talkback_count(db)
-    quotes = await _calculate_quote_usage(db)
-    return RotiUsage(
-        talkback_usage=talkbacks,
-        quote_usage=quotes
-    )
-
-def get_population(bot : commands.Bot, guild_ids : List[int]) -> RotiPopulation:
-    return _calculate_population(bot, guild_ids)
-
-async def _calculate_talkback_count(db: RotiDatabase) -> TalkbackUsage:
     """
-    This is a cached function to calculate the number of talkbacks present across all servers.
+    Reads every usage figure from the materialized `usage_counters` row in a single round trip.
+    The counters are maintained incrementally by database triggers, so this stays O(1) as the tables grow.
     """
-    trigger_count = await db.count(TalkbackTriggersTable)
-    response_count = await db.raw_query(
-        """
-        SELECT SUM(array_length(responses, 1)) as total_responses
-        FROM talkbacks
-        """
+    counters : UsageCountersTable = await db.select(UsageCountersTable, id=1)
+    return RotiUsage(
+        talkback_usage=TalkbackUsage(triggers=counters.talkback_triggers, responses=counters.talkback_responses),
+        quote_usage=QuoteUsage(nonreplaceable=counters.quotes_nonreplaceable, replaceable=counters.quotes_replaceable)
     )
 
-    response_count = response_count.unwrap()[0]["total_responses"]
-    
-    return TalkbackUsage(triggers=trigger_count, responses=response_count)
-
-async def _calculate_quote_usage(db : RotiDatabase) -> QuoteUsage:
-    """
-    This is a cached function to calculate the number of quotes present across all servers, organized by type of quote.
-    """
-    nonreplaceable = await db.count(QuotesTable, replaceable=False)
-    replaceable = await db.count(QuotesTable, replaceable=True)
-
-    return QuoteUsage(nonreplaceable=nonreplaceable, replaceable=replaceable)
-
-@ttl_cache(ttl=300)
-def _calculate_population(bot : commands.Bot, guild_ids : List[int]) -> RotiPopulation:
-    """
-    This is a cached function to calculate the total population of servers that use Roti
-    """
-    total = 0
-
-    for guild in guild_ids:
-        total += bot.get_guild(guild).member_count
-    
-    return RotiPopulation(servers=len(guild_ids), users=total)
-
+def get_population() -> RotiPopulation:
+    return _population.snapshot()
 
+def get_population_counter() -> PopulationCounter:
+    return _population
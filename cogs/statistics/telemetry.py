@@ -0,0 +1,113 @@
+import time
+import logging
+
+from collections import Counter
+from datetime import datetime, timezone, timedelta
+from dataclasses import dataclass
+from typing import Dict, List, Tuple, Literal, Optional
+from returns.result import Success
+from database.data import RotiDatabase
+from database.bot_state import RotiState
+
+_HOUR = 3600
+
+@dataclass(slots=True, frozen=True, kw_only=True)
+class UsageEntry:
+    """
+    A single aggregated row of the top-N usage view.
+    """
+    key : str
+    total : int
+
+class UsageTelemetry:
+    """
+    Counts events per (server, source) in memory and rolls them into hour buckets.
+
+    Recording is a single dictionary increment, so it's cheap enough to call from `on_message`.
+    Buckets are drained in batches by `flush`, which writes them through `RotiDatabase.rpc`
+    into the `usage_rollups` table. Counts that fail to flush are merged back and retried next time.
+    """
+    FLUSH_BATCH_SIZE = 500
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        # (bucket_start, server_id, source) -> count, waiting to be flushed.
+        self._pending : Counter[Tuple[int, int, str]] = Counter()
+
+    def record(self, server_id : int, source : str, amount : int = 1) -> None:
+        now = int(time.time())
+        self._pending[(now - (now % _HOUR), server_id, source)] += amount
+
+    def _drain(self) -> List[Dict]:
+        rows = [
+            {
+                "bucket_start": datetime.fromtimestamp(bucket, tz=timezone.utc).isoformat(),
+                "server_id": server_id,
+                "source": source,
+                "count": count
+            }
+            for (bucket, server_id, source), count in self._pending.items()
+        ]
+        self._pending.clear()
+        return rows
+
+    def _restore(self, rows : List[Dict]) -> None:
+        for row in rows:
+            bucket = int(datetime.fromisoformat(row["bucket_start"]).timestamp())
+            self._pending[(bucket, row["server_id"], row["source"])] += row["count"]
+
+    async def flush(self, db : RotiDatabase) -> int:
+        """
+        Writes every pending bucket to the database in batches, returns the number of rows written.
+        """
+        if not self._pending:
+            return 0
+
+        rows = self._drain()
+        if RotiState().args.test:
+            self.logger.info("Test mode: Dropping %i telemetry rows", len(rows))
+            return 0
+
+        written = 0
+        for i in range(0, len(rows), self.FLUSH_BATCH_SIZE):
+            batch = rows[i:i + self.FLUSH_BATCH_SIZE]
+            result = await db.rpc("record_usage_rollups", p_rows=batch)
+            if not isinstance(result, Success):
+                # Keep the rest for the next flush instead of dropping them.
+                self._restore(rows[i:])
+                self.logger.warning("Telemetry flush failed, %i rows kept for retry.", len(rows) - i)
+                break
+            written += len(batch)
+
+        return written
+
+    async def top(self, db : RotiDatabase, kind : Literal["server", "source"], hours : int, n : int = 10) -> List[UsageEntry]:
+        """
+        Top-N servers or sources over the persisted hour buckets, plus any counts not yet flushed.
+        """
+        since = datetime.now(tz=timezone.utc) - timedelta(hours=hours)
+        totals : Counter[str] = Counter()
+
+        result = await db.rpc("get_top_usage", p_since=since.isoformat(), p_kind=kind, p_limit=n * 2)
+        if isinstance(result, Success):
+            for row in result.unwrap() or []:
+                totals[str(row["key"])] += row["total"]
+
+        cutoff = int(since.timestamp()) - (int(since.timestamp()) % _HOUR)
+        for (bucket, server_id, source), count in self._pending.items():
+            if bucket >= cutoff:
+                totals[str(server_id) if kind == "server" else source] += count
+
+        return [UsageEntry(key=key, total=total) for key, total in totals.most_common(n)]
+
+_telemetry = UsageTelemetry()
+
+def get_telemetry() -> UsageTelemetry:
+    return _telemetry
+
+def record_usage(server_id : Optional[int], source : str) -> None:
+    """
+    Records a single event for telemetry. Events outside of a server (DMs) are ignored.
+    """
+    if server_id is not None:
+        _telemetry.record(server_id, source)
@@ -0,0 +1,124 @@
+import time
+import asyncio
+import discord
+
+from collections import OrderedDict, deque
+from typing import Deque, List, NamedTuple, Optional
+from utils.Tracing import span
+from cogs.generate.ContextBuilder import ATTACHMENT_PLACEHOLDER
+
+"""
+In-memory ring buffers of recent messages for channels Roti has AI talkbacks in.
+A channel is only tracked after its first AI talkback fetches its history, after which the buffer is
+kept up to date from gateway events, so building context for later talkbacks makes no API calls.
+"""
+
+class HistoryEntry(NamedTuple):
+    message_id : int
+    author : str
+    role : str # "assistant" for Roti, "user" for everyone else
+    content : str
+
+class _ChannelBuffer:
+    __slots__ = ("entries", "last_active", "loading")
+
+    def __init__(self, limit : int):
+        self.entries : Deque[HistoryEntry] = deque(maxlen=limit)
+        self.last_active : float = time.monotonic()
+        self.loading : Optional[asyncio.Task] = None
+
+class ChannelHistory:
+    def __init__(self, limit : int = 30, max_channels : int = 1000, idle_ttl : float = 30 * 60):
+        self.limit = limit
+        self.max_channels = max_channels
+        self.idle_ttl = idle_ttl
+        self._channels : OrderedDict[int, _ChannelBuffer] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+    @staticmethod
+    def _to_entry(message : discord.Message, bot_id : int) -> Optional[HistoryEntry]:
+        # Skip bot messages, UNLESS it's Roti
+        if message.author.bot and message.author.id != bot_id:
+            return None
+        return HistoryEntry(
+            message_id=message.id,
+            author=message.author.name,
+            role="assistant" if message.author.id == bot_id else "user",
+            content=message.content or ATTACHMENT_PLACEHOLDER
+        )
+
+    def add(self, message : discord.Message, bot_id : int) -> None:
+        buffer = self._channels.get(message.channel.id)
+        if buffer is None:
+            return # Cold channel, the history fetch on the next talkback will pick this message up.
+        entry = self._to_entry(message, bot_id)
+        if entry is not None:
+            buffer.entries.append(entry)
+
+    def edit(self, channel_id : int, message_id : int, content : str) -> None:
+        buffer = self._channels.get(channel_id)
+        if buffer is None:
+            return
+        for index, entry in enumerate(buffer.entries):
+            if entry.message_id == message_id:
+                buffer.entries[index] = entry._replace(content=content or ATTACHMENT_PLACEHOLDER)
+                return
+
+    def delete(self, channel_id : int, message_id : int) -> None:
+        buffer = self._channels.get(channel_id)
+        if buffer is None:
+            return
+        for entry in buffer.entries:
+            if entry.message_id == message_id:
+                buffer.entries.remove(entry)
+                return
+
+    async def get(self, channel : discord.abc.Messageable, bot_id : int) -> List[HistoryEntry]:
+        """
+        Returns the channel's recent messages, oldest first. Only the first call for a channel hits the API.
+        """
+        buffer = self._channels.get(channel.id)
+        if buffer is None:
+            buffer = self._track(channel.id)
+            buffer.loading = asyncio.create_task(self._warm(channel, buffer, bot_id))
+
+        self._channels.move_to_end(channel.id)
+        buffer.last_active = time.monotonic()
+        if buffer.loading is not None:
+            await asyncio.shield(buffer.loading)
+        return list(buffer.entries)
+
+    def _track(self, channel_id : int) -> _ChannelBuffer:
+        buffer = self._channels[channel_id] = _ChannelBuffer(self.limit)
+        while len(self._channels) > self.max_channels:
+            self._channels.popitem(last=False)
+        return buffer
+
+    async def _warm(self, channel : discord.abc.Messageable, buffer : _ChannelBuffer, bot_id : int) -> None:
+        try:
+            with span("discord.channel_history", limit=self.limit):
+                fetched = [message async for message in channel.history(limit=self.limit)]
+        except discord.HTTPException:
+            # Untrack so the next talkback retries the fetch.
+            self._channels.pop(channel.id, None)
+            raise
+        finally:
+            buffer.loading = None
+
+        # Messages that arrived while fetching are already buffered, merge the two by ID (snowflakes are ordered by time).
+        merged = {entry.message_id: entry for message in fetched if (entry := self._to_entry(message, bot_id))}
+        merged.update((entry.message_id, entry) for entry in buffer.entries)
+        buffer.entries.clear()
+        buffer.entries.extend(merged[message_id] for message_id in sorted(merged)[-self.limit:])
+
+    def evict_idle(self) -> int:
+        """
+        Drops channels that haven't had a talkback in `idle_ttl` seconds, returning how many were dropped.
+        """
+        cutoff = time.monotonic() - self.idle_ttl
+        idle = [channel_id for channel_id, buffer in self._channels.items() if buffer.last_active < cutoff and buffer.loading is None]
+        for channel_id in idle:
+            del self._channels[channel_id]
+        return len(idle)
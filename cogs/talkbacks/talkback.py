@@ -4,17 +4,19 @@ import discord
 import re
 import shlex
 import random
-import time
-import asyncio
 import logging
 import itertools
 
 from cogs.statistics.statistics_helpers import statistic
 from utils.RotiUtilities import cog_command
+from utils.Tracing import traced, span
 from database.data import RotiDatabase, TalkbacksTable, TalkbackSettings, GenerateSettings
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 from cogs.generate.RotiBrain import RotiBrain
+from cogs.generate.ProgressiveMessage import ProgressiveMessage
+from cogs.generate.AIScheduler import text_scheduler, SchedulerRejected
+from cogs.talkbacks.ChannelHistory import ChannelHistory
 from returns.result import Result, Success, Failure
 from returns.maybe import Maybe, Some, Nothing
 from typing import Optional, List, Dict, Any, Tuple
@@ -78,11 +80,25 @@ class Talkback(commands.GroupCog, group_name="talkback"):
         super().__init__()
         self.bot = bot
         self.logger = logging.getLogger(__name__)
-        self.brain = RotiBrain()
-        self.cooldown = 5 
-        self.last_response = 0
+        self.brain = RotiBrain(bot.session)
         self.db = RotiDatabase()
         self.talkback_driver = TalkbackDriver(self.db, self.logger)
+        self.history = ChannelHistory(limit=30)
+
+    async def cog_load(self):
+        self._evict_idle_history.start()
+
+    async def cog_unload(self):
+        self._evict_idle_history.cancel()
+
+    @tasks.loop(minutes=5)
+    async def _evict_idle_history(self):
+        """
+        Drops message buffers for channels that haven't had an AI talkback in a while.
+        """
+        evicted = self.history.evict_idle()
+        if evicted:
+            self.logger.debug("Evicted %i idle channel histories, %i remain.", evicted, len(self.history))
         
     @statistic("Standard Talkbacks", category="Talkbacks")
     async def _generate_talkback(self, message : discord.Message) -> Maybe[str]:
@@ -93,61 +109,57 @@ class Talkback(commands.GroupCog, group_name="talkback"):
         return Nothing
 
     @statistic("AI Talkbacks", category="Talkbacks")
-    async def _generate_ai_talkback(self, message : discord.Message) -> Result[str, TalkbackError]:
+    @traced("talkback.ai", root=True)
+    async def _generate_ai_talkback(self, message : discord.Message, view : discord.ui.View) -> Result[discord.Message, TalkbackError]:
+        """
+        Streams an AI response into the channel, returning the sent message once the response is complete.
+        Responses are rate limited per server by the shared text scheduler.
+        """
+        try:
+            return await text_scheduler.run(message.guild.id, lambda: self._stream_ai_talkback(message, view))
+        except SchedulerRejected as e:
+            self.logger.info("AI Response shed for %s: %s", message.guild.name, e.reason)
+            # Only explain ourselves if someone actually asked Roti something.
+            return Failure(TalkbackError(e.reason if self.bot.user in message.mentions else None))
+
+    async def _stream_ai_talkback(self, message : discord.Message, view : discord.ui.View) -> Result[discord.Message, TalkbackError]:
         async with message.channel.typing():
             channel : discord.TextChannel = message.channel
-            time_since_last = time.time() - self.last_response
-            HISTORY_LIMIT = 30
-
-            if time_since_last < self.cooldown:
-                self.logger.info(f"AI Response requested too quickly for {message.guild.name}. Sleeping...")
-                await asyncio.sleep(self.cooldown - time_since_last) 
-
-            self.last_response = time.time()
-            
-            # Fetch history
-            history : typing.List[discord.Message] = [msg async for msg in channel.history(limit=HISTORY_LIMIT)]
-            formatted_messages = []
-
-            for msg in reversed(history):
-                # Skip bot messages, UNLESS it's Roti
-                if msg.author.bot and msg.author.id != self.bot.user.id:
-                    continue
-
-                content = msg.content or "[Attachment/Embed]" 
-                
-                if msg.author.id == self.bot.user.id:
-                    # If Roti sent the message, assign it the "assistant" role
-                    formatted_messages.append({
-                        "role": "assistant", 
-                        "content": content
-                    })
-                else:
-                    # If a user sent it, assign "user" role and prepend their real username
-                    # We use msg.author.name instead of msg.author.display_name
-                    username = msg.author.name
-                    formatted_messages.append({
-                        "role": "user", 
-                        "content": f"{username} said: {content}"
-                    })
             
+            # Buffered history, only the first talkback in a channel fetches it from Discord.
+            history = await self.history.get(channel, self.bot.user.id)
             gen_settings = await self.db.select(GenerateSettings, server_id=message.guild.id)
+            formatted_messages = self.brain.build_context(history, gen_settings.default_model)
 
-            response = await asyncio.to_thread(
-                self.brain.generate_chat,
+            stream = self.brain.stream_chat(
                 chat_messages=formatted_messages, 
                 model=gen_settings.default_model,
                 temperature=gen_settings.temperature
             )
+            response = await ProgressiveMessage(lambda text: channel.send(text, view=view)).consume(stream)
 
             if not response:
                 return Failure(TalkbackError(None))
 
             return Success(response)
 
+    # Raw events, buffered history is fetched with channel.history() and never lands in discord.py's message cache.
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload : discord.RawMessageUpdateEvent):
+        if "content" in payload.data: # Embed-only updates (e.g. link previews) leave the text alone
+            self.history.edit(payload.channel_id, payload.message_id, payload.data["content"])
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload : discord.RawMessageDeleteEvent):
+        self.history.delete(payload.channel_id, payload.message_id)
+
     @commands.Cog.listener()
     async def on_message(self, message : discord.Message):
-        if not message or message.author == self.bot.user:
+        if not message:
+            return
+
+        self.history.add(message, self.bot.user.id)
+        if message.author == self.bot.user:
             return
         
         # Check if enabled via settings
@@ -177,11 +189,12 @@ class Talkback(commands.GroupCog, group_name="talkback"):
 
         # AI Talkback
         elif was_mentioned or roll < ai_prob:
-            match await self._generate_ai_talkback(message):
+            match await self._generate_ai_talkback(message, view):
                 case Success(response) if settings.duration > 0:
-                    await message.channel.send(response, view=view, delete_after=settings.duration)
-                case Success(response):
-                    await message.channel.send(response, view=view)
+                    # Already sent while streaming, the deletion timer starts once the response is complete.
+                    await response.delete(delay=settings.duration)
+                case Success(_):
+                    pass
                 case Failure(TalkbackError() as error) if error.reason:
                     await message.channel.send(error.reason, view=view, delete_after=5)
                 case _:
@@ -381,9 +394,10 @@ class TalkbackDriver:
             if len(trigger_list) > 10 or len(response_list) > 10: return "Too many items (max 10)."
             if not trigger_list or not response_list: return "No triggers/responses provided."
             
-            result = await self.db.supabase.rpc('create_talkback_with_merge', {
-                'p_server_id': server_id, 'p_new_triggers': trigger_list, 'p_new_responses': response_list
-            }).execute()
+            with span("talkback_driver.add_talkback"):
+                result = await self.db.supabase.rpc('create_talkback_with_merge', {
+                    'p_server_id': server_id, 'p_new_triggers': trigger_list, 'p_new_responses': response_list
+                }).execute()
             
             return result.data[0]['message'] if result.data else "Failed."
         except Exception as e:
@@ -392,9 +406,10 @@ class TalkbackDriver:
 
     async def get_response(self, server_id: int, message: str) -> Optional[str]:
         try:
-            result = await self.db.supabase.rpc('get_random_talkback_response', {
-                'p_server_id': server_id, 'p_message': message
-            }).execute()
+            with span("talkback_driver.get_response"):
+                result = await self.db.supabase.rpc('get_random_talkback_response', {
+                    'p_server_id': server_id, 'p_message': message
+                }).execute()
             return result.data if result.data else None
         except Exception as e:
             self.logger.error(f"Get Response Error: {e}")
@@ -403,7 +418,8 @@ class TalkbackDriver:
     async def list_all_talkbacks(self, server_id: int, search_keyword: Optional[str] = None) -> List[Dict[str, Any]]:
         try:
             query = self.db.supabase.from_('talkbacks').select('id, responses, created_at, talkback_triggers(trigger)').eq('server_id', server_id).order('id')
-            result = await query.execute()
+            with span("talkback_driver.list_all_talkbacks"):
+                result = await query.execute()
             if not result.data: return []
             
             talkbacks = []
@@ -417,7 +433,8 @@ class TalkbackDriver:
     async def delete_talkback(self, server_id: int, talkback_id: int) -> Tuple[bool, str]:
         try:
             # Basic validation query
-            check = await self.db.supabase.from_('talkbacks').select('id').eq('id', talkback_id).eq('server_id', server_id).execute()
+            with span("talkback_driver.delete_talkback"):
+                check = await self.db.supabase.from_('talkbacks').select('id').eq('id', talkback_id).eq('server_id', server_id).execute()
             if not check.data: return False, "Talkback not found."
             
             await self.db.delete(TalkbacksTable, id=talkback_id)
@@ -9,6 +9,7 @@ from discord import app_commands
 from discord.ext import commands
 from utils.RotiUtilities import cog_command
 from curl_cffi import requests as cffi_requests
+from utils.Tracing import span
 
 @cog_command
 class Wiz(commands.GroupCog, group_name="wiz"):
@@ -85,7 +86,8 @@ class Wiz(commands.GroupCog, group_name="wiz"):
         """Asynchronous wrapper for the bypass downloader."""
         if not url or "None" in url:
             return None, None
-        data = await asyncio.to_thread(self._sync_download, url)
+        with span("wiz.fetch_image", filename=filename):
+            data = await asyncio.to_thread(self._sync_download, url)
         if data:
             return discord.File(data, filename=filename), f"attachment://{filename}"
         return None, None
@@ -206,7 +208,8 @@ class Wiz(commands.GroupCog, group_name="wiz"):
             await interaction.response.defer(ephemeral=ephemeral)
         try:
             if isinstance(name_or_obj, str):
-                c = await wizwiki.creature(name_or_obj)
+                with span("wizwiki.creature"):
+                    c = await wizwiki.creature(name_or_obj)
             else:
                 c = name_or_obj
             file = None
@@ -442,7 +445,8 @@ class Wiz(commands.GroupCog, group_name="wiz"):
             await interaction.response.defer(ephemeral=ephemeral)
         try:
             if isinstance(name_or_obj, str):
-                s = await wizwiki.spell(name_or_obj)
+                with span("wizwiki.spell"):
+                    s = await wizwiki.spell(name_or_obj)
             else:
                 s = name_or_obj
             files = []
@@ -595,7 +599,8 @@ class Wiz(commands.GroupCog, group_name="wiz"):
             await interaction.response.defer(ephemeral=ephemeral)
         try:
             if isinstance(name_or_obj, str):
-                i = await wizwiki.item(name_or_obj)
+                with span("wizwiki.item"):
+                    i = await wizwiki.item(name_or_obj)
             else:
                 i = name_or_obj
             file, thumb_url = await self._fetch_as_file(i.image_male_url or i.image_female_url, "item.png")
@@ -666,7 +671,8 @@ class Wiz(commands.GroupCog, group_name="wiz"):
             await interaction.response.defer(ephemeral=ephemeral)
         try:
             if isinstance(name_or_obj, str):
-                r = await wizwiki.recipe(name_or_obj)
+                with span("wizwiki.recipe"):
+                    r = await wizwiki.recipe(name_or_obj)
             else:
                 r = name_or_obj
             class RecipeLayout(discord.ui.LayoutView):
@@ -729,7 +735,8 @@ class Wiz(commands.GroupCog, group_name="wiz"):
             await interaction.response.defer(ephemeral=ephemeral)
         try:
             if isinstance(name_or_obj, str):
-                loc = await wizwiki.location(name_or_obj)
+                with span("wizwiki.location"):
+                    loc = await wizwiki.location(name_or_obj)
             else:
                 loc = name_or_obj
             map_file = None
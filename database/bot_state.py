@@ -51,11 +51,13 @@ class BotCredentials(metaclass=Singleton):
         self.__dict__["test_token"] = os.getenv("TEST_TOKEN")
         self.__dict__["music_pass"] = os.getenv("MUSIC_PASS")
         self.__dict__["music_ip"] = os.getenv("LAVALINK_HOST", "127.0.0.1")
+        self.__dict__["music_nodes"] = os.getenv("LAVALINK_NODES", "")
         self.__dict__["application_id"] = os.getenv("APPLICATION_ID")
         self.__dict__["test_application_id"] = os.getenv("TEST_APPLICATION_ID")
         self.__dict__["youtube_name"] = os.getenv("YOUTUBE_NAME")
         self.__dict__["youtube_pass"] = os.getenv("YOUTUBE_PASS")
         self.__dict__["pollinations_key"] = os.getenv("POLLINATIONS_KEY", "")
+        self.__dict__["pollinations_url"] = os.getenv("POLLINATIONS_URL", "https://gen.pollinations.ai").rstrip("/")
     
     def __setattr__(self, key, value):
         """ Prevents modification of attributes after initialization. """
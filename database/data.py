@@ -11,6 +11,7 @@ from returns.result import Result, Success, Failure
 from returns.maybe import Maybe, Some, Nothing
 from database.bot_state import RotiState
 from utils.RotiUtilities import TEST_GUILD
+from utils.Tracing import span
 import logging
 import asyncio
 
@@ -102,6 +103,50 @@ class TalkbackTriggersTable:
     talkback_id : int =  field(metadata={"primary": True})
     trigger : str = field(metadata={"primary": True})
 
+@dataclass
+class UsageCountersTable:
+    """
+    Single-row table of global usage counters, maintained by triggers on the talkback and quote tables.
+    Reading this replaces several full-table COUNT/SUM scans. See `database/sql/usage_counters.sql`.
+    """
+    __tablename__ = "usage_counters"
+    id : int = field(default=1, metadata={"primary": True})
+    talkback_triggers : int = 0
+    talkback_responses : int = 0
+    quotes_replaceable : int = 0
+    quotes_nonreplaceable : int = 0
+
+@dataclass
+class UsageRollupsTable:
+    """
+    Per-server, per-source event counts bucketed by hour. Written in batches by the telemetry
+    flusher through the `record_usage_rollups` RPC, which merges counts additively. See `database/sql/usage_rollups.sql`.
+    """
+    __tablename__ = "usage_rollups"
+    bucket_start : str = field(metadata={"primary": True})
+    server_id : int = field(metadata={"primary": True})
+    source : str = field(metadata={"primary": True})
+    count : int = 0
+
+@dataclass
+class MusicSessionsTable:
+    """
+    Snapshot of a server's music session, restored on startup so queues survive restarts.
+    `tracks` are encoded Lavalink tracks with the current track first. See `database/sql/music_sessions.sql`.
+    """
+    __tablename__ = "music_sessions"
+    server_id : int = field(metadata={"primary": True})
+    voice_channel_id : int = 0
+    text_channel_id : int = 0
+    tracks : List[str] = field(default_factory=list)
+    requesters : List[int] = field(default_factory=list)
+    position : int = 0
+    loop : int = 0
+    paused : bool = False
+    volume : int = 100
+    filters : Dict[str, Dict[str, float]] = field(default_factory=dict)
+    updated_at : str = None
+
 class RotiDatabase(metaclass=Singleton):
     """
     Generic Supabase database with type-safe dataclass-based operations.
@@ -137,7 +182,7 @@ class RotiDatabase(metaclass=Singleton):
     """
     This is a list of the tables in the supabase database. If you don't add a table here, it won't be registered.
     """
-    TABLES = [TalkbackSettings, MusicSettings, GenerateSettings, QuotesTable, MotdTable, TalkbacksTable, TalkbackTriggersTable]
+    TABLES = [TalkbackSettings, MusicSettings, GenerateSettings, QuotesTable, MotdTable, TalkbacksTable, TalkbackTriggersTable, UsageCountersTable, UsageRollupsTable, MusicSessionsTable]
 
     def __init__(self):
         self.state = RotiState()
@@ -289,7 +334,8 @@ class RotiDatabase(metaclass=Singleton):
                 query = query.eq(key, value)
             
             start = time.perf_counter()
-            result = await query.single().execute()
+            with span("db.select", table=table_name):
+                result = await query.single().execute()
             delta = 1000 * (time.perf_counter() - start)
 
             if not result.data:
@@ -348,7 +394,8 @@ class RotiDatabase(metaclass=Singleton):
             
             start = time.perf_counter()
             # Use .limit(1) instead of .single() to avoid errors if not found
-            result = await query.limit(1).execute()
+            with span("db.select_one", table=table_name):
+                result = await query.limit(1).execute()
             delta = 1000 * (time.perf_counter() - start)
             
             if not result.data or len(result.data) == 0:
@@ -388,7 +435,8 @@ class RotiDatabase(metaclass=Singleton):
                 query = query.eq(key, value)
             
             start = time.perf_counter()
-            result = await query.execute()
+            with span("db.select_all", table=table_name):
+                result = await query.execute()
             delta = 1000 * (time.perf_counter() - start)
             
             if not result.data:
@@ -438,7 +486,8 @@ class RotiDatabase(metaclass=Singleton):
                     raise RuntimeError("Database not initialized. Call await db.initialize()")
                 
                 start = time.perf_counter()
-                result = await self.supabase.table(table_name).insert(data).execute()
+                with span("db.insert", table=table_name):
+                    result = await self.supabase.table(table_name).insert(data).execute()
                 delta = 1000 * (time.perf_counter() - start)
                 
                 if not result.data:
@@ -518,10 +567,11 @@ class RotiDatabase(metaclass=Singleton):
                     raise RuntimeError("Database not initialized. Call await db.initialize()")
 
                 start = time.perf_counter()
-                await self.supabase.table(table_name)\
-                    .update(update_data)\
-                    .eq(primary_key, pk_value)\
-                    .execute()
+                with span("db.update", table=table_name):
+                    await self.supabase.table(table_name)\
+                        .update(update_data)\
+                        .eq(primary_key, pk_value)\
+                        .execute()
                 delta = 1000 * (time.perf_counter() - start)
                 self.logger.info(f"Single UPDATE took {delta:.2f}ms")
                 
@@ -616,9 +666,10 @@ class RotiDatabase(metaclass=Singleton):
                 
                 # Perform the Upsert
                 # Note: Supabase upsert requires the Primary Key to be present in the data payload
-                await self.supabase.table(table_name)\
-                    .upsert(upsert_data)\
-                    .execute()
+                with span("db.upsert", table=table_name):
+                    await self.supabase.table(table_name)\
+                        .upsert(upsert_data)\
+                        .execute()
                 
                 delta = 1000 * (time.perf_counter() - start)
                 self.logger.info(f"Single UPSERT took {delta:.2f}ms")
@@ -681,7 +732,8 @@ class RotiDatabase(metaclass=Singleton):
                 query = query.eq(key, value)
             
             # Limit to 0 rows since we only want the count
-            result = await query.limit(0).execute()
+            with span("db.count", table=table_name):
+                result = await query.limit(0).execute()
             
             # The count is in result.count
             return result.count if result.count is not None else 0
@@ -747,7 +799,8 @@ class RotiDatabase(metaclass=Singleton):
             # END;
             # $$;
             
-            result = await self.supabase.rpc('execute_raw_sql', {'query': query}).execute()
+            with span("db.raw_query"):
+                result = await self.supabase.rpc('execute_raw_sql', {'query': query}).execute()
             
             if result.data is None:
                 return Success([])
@@ -758,6 +811,45 @@ class RotiDatabase(metaclass=Singleton):
             self.logger.error(f"Raw query failed: {e}")
             return Failure(DatabaseError(f"Raw query failed: {e}"))
 
+    async def rpc(
+        self,
+        function: str,
+        **params
+    ) -> Result[Any, DatabaseError]:
+        """
+        Call a PostgreSQL function through Supabase RPC.
+
+        Use this for operations the type-safe methods can't express, such as batched
+        additive upserts or server-side aggregations.
+
+        Args:
+            function: Name of the database function
+            **params: Named arguments passed to the function
+
+        Returns:
+            Result containing the function's return data, or error
+
+        Example:
+            result = await db.rpc('get_top_usage', p_since=since, p_kind='server', p_limit=10)
+            if isinstance(result, Success):
+                rows = result.unwrap()
+        """
+        try:
+            if self.supabase is None:
+                raise RuntimeError("Database not initialized. Call await db.initialize()")
+
+            start = time.perf_counter()
+            with span("db.rpc", function=function):
+                result = await self.supabase.rpc(function, params).execute()
+            delta = 1000 * (time.perf_counter() - start)
+            self.logger.info(f"RPC {function} took {delta:.2f}ms")
+
+            return Success(result.data)
+
+        except Exception as e:
+            self.logger.error(f"RPC {function} failed: {e}")
+            return Failure(DatabaseError(f"RPC {function} failed: {e}"))
+
     async def delete(
         self,
         dataclass_type: Type[T],
@@ -784,7 +876,8 @@ class RotiDatabase(metaclass=Singleton):
             for key, value in primary_key_kwargs.items():
                 query = query.eq(key, value)
             
-            await query.execute()
+            with span("db.delete", table=table_name):
+                await query.execute()
             
             return Success(None)
             
@@ -0,0 +1,23 @@
+-- Snapshots of active music sessions, so queues survive bot restarts and deploys.
+--
+-- One row per server with a player, written every minute while something is playing and on
+-- shutdown, then read back on startup to rejoin the voice channel and resume playback.
+-- Tracks are stored as Lavalink's encoded track strings (current track first) with their
+-- requesters alongside, and are decoded by the node on restore.
+-- See `cogs/music/MusicSessions.py` and `MusicSessionsTable` in `database/data.py`.
+--
+-- Run this once in the Supabase SQL editor. It is safe to re-run.
+
+CREATE TABLE IF NOT EXISTS music_sessions (
+    server_id           bigint      PRIMARY KEY,
+    voice_channel_id    bigint      NOT NULL,
+    text_channel_id     bigint      NOT NULL DEFAULT 0,
+    tracks              text[]      NOT NULL DEFAULT '{}',
+    requesters          bigint[]    NOT NULL DEFAULT '{}',
+    position            bigint      NOT NULL DEFAULT 0,
+    loop                smallint    NOT NULL DEFAULT 0,
+    paused              boolean     NOT NULL DEFAULT false,
+    volume              int         NOT NULL DEFAULT 100,
+    filters             jsonb       NOT NULL DEFAULT '{}',
+    updated_at          timestamptz NOT NULL DEFAULT now()
+);
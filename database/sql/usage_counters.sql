@@ -0,0 +1,99 @@
+-- Materialized usage counters for /statistics usage.
+--
+-- A single row (id = 1) holds every global usage figure. The counters are kept up to date
+-- by triggers on the source tables, so reading them is one O(1) primary key lookup
+-- instead of several full table scans. See `UsageCountersTable` in `database/data.py`.
+--
+-- Run this once in the Supabase SQL editor. It is safe to re-run; the final statement
+-- rebuilds the counters from scratch if they ever drift.
+
+CREATE TABLE IF NOT EXISTS usage_counters (
+    id                      smallint PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    talkback_triggers       bigint NOT NULL DEFAULT 0,
+    talkback_responses      bigint NOT NULL DEFAULT 0,
+    quotes_replaceable      bigint NOT NULL DEFAULT 0,
+    quotes_nonreplaceable   bigint NOT NULL DEFAULT 0
+);
+
+INSERT INTO usage_counters (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+
+-- talkback_triggers: one row per trigger phrase.
+CREATE OR REPLACE FUNCTION usage_counters_talkback_triggers()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE usage_counters SET talkback_triggers = talkback_triggers + 1 WHERE id = 1;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE usage_counters SET talkback_triggers = talkback_triggers - 1 WHERE id = 1;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS usage_counters_talkback_triggers ON talkback_triggers;
+CREATE TRIGGER usage_counters_talkback_triggers
+AFTER INSERT OR DELETE ON talkback_triggers
+FOR EACH ROW EXECUTE FUNCTION usage_counters_talkback_triggers();
+
+-- talkbacks: responses is an array, merges append to it, so UPDATE applies the length delta.
+CREATE OR REPLACE FUNCTION usage_counters_talkbacks()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    delta bigint := 0;
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        delta := delta + COALESCE(array_length(NEW.responses, 1), 0);
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        delta := delta - COALESCE(array_length(OLD.responses, 1), 0);
+    END IF;
+    IF delta <> 0 THEN
+        UPDATE usage_counters SET talkback_responses = talkback_responses + delta WHERE id = 1;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS usage_counters_talkbacks ON talkbacks;
+CREATE TRIGGER usage_counters_talkbacks
+AFTER INSERT OR UPDATE OF responses OR DELETE ON talkbacks
+FOR EACH ROW EXECUTE FUNCTION usage_counters_talkbacks();
+
+-- Quotes: split by the replaceable flag, which can change on UPDATE.
+CREATE OR REPLACE FUNCTION usage_counters_quotes()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE usage_counters SET
+            quotes_replaceable = quotes_replaceable - (CASE WHEN OLD.replaceable THEN 1 ELSE 0 END),
+            quotes_nonreplaceable = quotes_nonreplaceable - (CASE WHEN OLD.replaceable THEN 0 ELSE 1 END)
+        WHERE id = 1;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE usage_counters SET
+            quotes_replaceable = quotes_replaceable + (CASE WHEN NEW.replaceable THEN 1 ELSE 0 END),
+            quotes_nonreplaceable = quotes_nonreplaceable + (CASE WHEN NEW.replaceable THEN 0 ELSE 1 END)
+        WHERE id = 1;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS usage_counters_quotes ON "Quotes";
+CREATE TRIGGER usage_counters_quotes
+AFTER INSERT OR UPDATE OF replaceable OR DELETE ON "Quotes"
+FOR EACH ROW EXECUTE FUNCTION usage_counters_quotes();
+
+-- Backfill / reconcile from the source tables.
+UPDATE usage_counters SET
+    talkback_triggers     = (SELECT COUNT(*) FROM talkback_triggers),
+    talkback_responses    = (SELECT COALESCE(SUM(array_length(responses, 1)), 0) FROM talkbacks),
+    quotes_replaceable    = (SELECT COUNT(*) FROM "Quotes" WHERE replaceable),
+    quotes_nonreplaceable = (SELECT COUNT(*) FROM "Quotes" WHERE NOT replaceable)
+WHERE id = 1;
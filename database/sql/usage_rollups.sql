@@ -0,0 +1,46 @@
+-- Persistent usage telemetry rollups for /statistics top.
+--
+-- Roti counts events per (server, source) in memory and periodically flushes them here in batches.
+-- Sources are event names such as "on_message" or command names such as "/music play".
+-- Rows are hour buckets, keyed by the start of their hour.
+-- See `cogs/statistics/telemetry.py` and `UsageRollupsTable` in `database/data.py`.
+--
+-- Run this once in the Supabase SQL editor. It is safe to re-run.
+
+CREATE TABLE IF NOT EXISTS usage_rollups (
+    bucket_start    timestamptz NOT NULL,
+    server_id       bigint      NOT NULL,
+    source          text        NOT NULL,
+    count           bigint      NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket_start, server_id, source)
+);
+
+-- Adds a batch of counts to their buckets. Rows are merged additively, so flushing the same
+-- bucket more than once (e.g. across restarts) never loses counts.
+CREATE OR REPLACE FUNCTION record_usage_rollups(p_rows jsonb)
+RETURNS void
+LANGUAGE sql
+AS $$
+    INSERT INTO usage_rollups (bucket_start, server_id, source, count)
+    SELECT r.bucket_start, r.server_id, r.source, SUM(r.count)
+    FROM jsonb_to_recordset(p_rows) AS r(bucket_start timestamptz, server_id bigint, source text, count bigint)
+    GROUP BY r.bucket_start, r.server_id, r.source
+    ON CONFLICT (bucket_start, server_id, source)
+    DO UPDATE SET count = usage_rollups.count + EXCLUDED.count;
+$$;
+
+-- Top-N servers ('server') or sources ('source') by event count since the given time.
+CREATE OR REPLACE FUNCTION get_top_usage(p_since timestamptz, p_kind text, p_limit int)
+RETURNS TABLE (key text, total bigint)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        CASE WHEN p_kind = 'server' THEN server_id::text ELSE source END AS key,
+        SUM(count)::bigint AS total
+    FROM usage_rollups
+    WHERE bucket_start >= date_trunc('hour', p_since)
+    GROUP BY 1
+    ORDER BY total DESC
+    LIMIT p_limit;
+$$;
@@ -8,13 +8,22 @@ import logging
 import inspect
 import importlib
 
+from discord import app_commands
 from discord.ext import commands
 from discord.utils import find
 from database.data import RotiDatabase
 from database.bot_state import RotiState
 from utils.RotiUtilities import setup_logging
+from utils.Tracing import trace
 from returns.maybe import Some, Nothing, Maybe
 
+class RotiCommandTree(app_commands.CommandTree):
+    async def _call(self, interaction : discord.Interaction):
+        # Every interaction gets its own trace, spans opened by cogs, the database, etc. attach to it.
+        command = interaction.command.qualified_name if interaction.command else (interaction.data or {}).get("name")
+        with trace("interaction", command=command, guild_id=interaction.guild_id, user_id=interaction.user.id):
+            await super()._call(interaction)
+
 class Roti(commands.Bot):
     def __init__(self):
         setup_logging(config_file="utils/logging_config.json")
@@ -24,7 +33,8 @@ class Roti(commands.Bot):
         
         super().__init__(
             command_prefix = "$",
-            intents = discord.Intents.all()
+            intents = discord.Intents.all(),
+            tree_cls = RotiCommandTree
         )
 
     async def on_ready(self):
@@ -32,7 +42,11 @@ class Roti(commands.Bot):
         self.logger.info("Roti Bot Online, logged in as %s", self.user)
 
     async def setup_hook(self):
-        self.session = aiohttp.ClientSession()
+        # Shared HTTP session for cogs, pooled with keep-alive so repeated API calls skip the TLS handshake.
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, limit_per_host=20, keepalive_timeout=60, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=60, sock_connect=10)
+        )
         await self.db.initialize()
         await self._load_cogs()
 
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Compare the size of AI talkback payloads with and without the token-budgeted context builder.
+
+Generates synthetic channel histories (regular chatter, long pastes, spam and attachments) and reports the
+JSON payload size and estimated tokens of the old verbatim formatting against build_chat_context.
+Run from the repository root:
+
+Usage:
+    python3 scripts/benchmark_context.py
+    python3 scripts/benchmark_context.py --budget 2000 --samples 500
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cogs.generate.ContextBuilder import ATTACHMENT_PLACEHOLDER, DEFAULT_CONTEXT_BUDGET, build_chat_context, estimate_tokens
+from cogs.generate.RotiBrain import _ROTI_BEHAVIOR_PROMPT
+
+
+class Entry(NamedTuple):
+    author: str
+    role: str
+    content: str
+
+
+CHATTER = [
+    "lol", "anyone up for a game tonight?", "roti what's the capital of australia",
+    "that's actually crazy", "I think the patch broke something again.", "gg",
+    "Can someone explain how the new ranked system works? I'm lost.",
+]
+PASTE = ("Traceback (most recent call last): File \"main.py\", line 42, in <module> run() "
+         "ValueError: something went wrong while parsing the configuration file. ") * 40
+
+
+def make_history(rng: random.Random, length: int = 30) -> List[Entry]:
+    history = []
+    for _ in range(length):
+        roll = rng.random()
+        if roll < 0.1:
+            history.append(Entry("paster", "user", PASTE[:rng.randint(1000, len(PASTE))]))
+        elif roll < 0.2:
+            history.append(Entry("spammer", "user", "lol"))
+        elif roll < 0.28:
+            history.append(Entry("artist", "user", ATTACHMENT_PLACEHOLDER))
+        elif roll < 0.45:
+            history.append(Entry("Roti", "assistant", " ".join(rng.choices(CHATTER, k=rng.randint(2, 12)))))
+        else:
+            history.append(Entry(f"user{rng.randint(1, 8)}", "user", rng.choice(CHATTER)))
+    return history
+
+
+def legacy_context(history: List[Entry]) -> List[Dict[str, str]]:
+    return [
+        {"role": "assistant", "content": e.content} if e.role == "assistant"
+        else {"role": "user", "content": f"{e.author} said: {e.content}"}
+        for e in history
+    ]
+
+
+def payload_stats(messages: List[Dict[str, str]]) -> tuple:
+    payload = [{"role": "system", "content": _ROTI_BEHAVIOR_PROMPT}, *messages]
+    size = len(json.dumps({"messages": payload}).encode())
+    tokens = sum(estimate_tokens(m["content"]) for m in payload)
+    return size, tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=int, default=DEFAULT_CONTEXT_BUDGET, help="Context budget in tokens")
+    parser.add_argument("--samples", type=int, default=200, help="Number of synthetic histories")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    histories = [make_history(rng) for _ in range(args.samples)]
+    reserved = estimate_tokens(_ROTI_BEHAVIOR_PROMPT)
+
+    before = [payload_stats(legacy_context(h)) for h in histories]
+    start = time.perf_counter()
+    built = [build_chat_context(h, args.budget, reserved=reserved) for h in histories]
+    elapsed = time.perf_counter() - start
+    after = [payload_stats(m) for m in built]
+
+    def summary(label: str, stats: List[tuple]):
+        sizes = sorted(s for s, _ in stats)
+        tokens = sorted(t for _, t in stats)
+        print(f"{label:<8} bytes avg {sum(sizes) / len(sizes):>9.0f}  p95 {sizes[int(len(sizes) * 0.95)]:>7}  max {sizes[-1]:>7}"
+              f" | tokens avg {sum(tokens) / len(tokens):>7.0f}  max {tokens[-1]:>6}")
+
+    print(f"{args.samples} histories of 30 messages, budget {args.budget} tokens\n")
+    summary("Before", before)
+    summary("After", after)
+    saved = 1 - sum(s for s, _ in after) / sum(s for s, _ in before)
+    print(f"\nPayload reduced by {100 * saved:.1f}%, build time {1e6 * elapsed / args.samples:.1f}us per history")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Drive concurrent AI talkback, /generate text and /generate image work through RotiBrain and the AI schedulers,
+against the mock Pollinations server (or any POLLINATIONS_URL), and report throughput and tail latency.
+
+Talkbacks go through the same path as the cog minus Discord: synthetic channel history, the context builder,
+the text scheduler and a streamed completion. Time to first token is reported for streamed operations.
+Run from the repository root:
+
+Usage:
+    python3 scripts/load_test_ai.py --spawn-mock --profile fast           # in-process mock server
+    python3 scripts/load_test_ai.py --spawn-mock --concurrency 50 --duration 60
+    python3 scripts/load_test_ai.py --url http://127.0.0.1:8089 --mix talkback=1 --no-rate-limit
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import aiohttp
+from aiohttp import web
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.first_tokens: Dict[str, List[float]] = defaultdict(list)
+        self.outcomes: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def report(self, elapsed: float) -> None:
+        def pct(values: List[float], p: float) -> float:
+            return 1000 * values[min(len(values) - 1, int(len(values) * p))] if values else float("nan")
+
+        print(f"\n{'Operation':<10} {'ok':>6} {'error':>6} {'shed':>6} {'ops/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'ttft p50':>9} {'ttft p95':>9}")
+        for op in sorted(self.outcomes):
+            lat = sorted(self.latencies[op])
+            ttft = sorted(self.first_tokens[op])
+            outcome = self.outcomes[op]
+            print(f"{op:<10} {outcome['ok']:>6} {outcome['error']:>6} {outcome['shed']:>6} {outcome['ok'] / elapsed:>7.2f} "
+                  f"{pct(lat, 0.5):>8.0f} {pct(lat, 0.95):>8.0f} {pct(lat, 0.99):>8.0f} {pct(lat, 1.0):>8.0f} "
+                  f"{pct(ttft, 0.5):>9.0f} {pct(ttft, 0.95):>9.0f}")
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for pair in value.split(","):
+        name, _, weight = pair.partition("=")
+        if name not in ("talkback", "text", "image"):
+            raise argparse.ArgumentTypeError(f"Unknown operation {name!r}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def synthetic_history(rng: random.Random, length: int = 30):
+    from cogs.talkbacks.ChannelHistory import HistoryEntry
+    lines = ["lol", "roti what do you think?", "anyone playing tonight", "that patch was rough", "gg"]
+    return [
+        HistoryEntry(i, f"user{rng.randint(1, 6)}", "user" if rng.random() < 0.8 else "assistant", rng.choice(lines) * rng.randint(1, 4))
+        for i in range(length)
+    ]
+
+
+async def consume(stream, recorder: Recorder, op: str, start: float):
+    first = True
+    text = None
+    async for text in stream:
+        if text is not None and first:
+            first = False
+            recorder.first_tokens[op].append(time.perf_counter() - start)
+    return text
+
+
+async def worker(worker_id: int, args, brain, recorder: Recorder, deadline: float):
+    from cogs.generate.AIScheduler import text_scheduler, image_scheduler, SchedulerRejected
+
+    rng = random.Random(args.seed + worker_id)
+    ops, weights = zip(*args.mix.items())
+    while time.perf_counter() < deadline:
+        op = rng.choices(ops, weights)[0]
+        guild_id = rng.randrange(args.guilds)
+        start = time.perf_counter()
+        try:
+            if op == "talkback":
+                messages = brain.build_context(synthetic_history(rng), "gemini-fast")
+                result = await text_scheduler.run(guild_id, lambda: consume(brain.stream_chat(messages, temperature=args.temperature), recorder, op, start))
+            elif op == "text":
+                prompt = f"tell me a joke about {rng.choice(['bread', 'cats', 'servers', 'lag'])}"
+                result = await text_scheduler.run(guild_id, lambda: consume(brain.stream_text(prompt, temperature=args.temperature), recorder, op, start))
+            else:
+                result = await image_scheduler.run(guild_id, lambda: brain.generate_image("a loaf of roti", None), user_id=worker_id)
+        except SchedulerRejected:
+            recorder.outcomes[op]["shed"] += 1
+            await asyncio.sleep(args.think_time)
+            continue
+
+        recorder.outcomes[op]["ok" if result else "error"] += 1
+        if result:
+            recorder.latencies[op].append(time.perf_counter() - start)
+        await asyncio.sleep(rng.uniform(0, args.think_time))
+
+
+async def run(args) -> int:
+    runner = None
+    if args.spawn_mock:
+        import mock_pollinations
+        profile = mock_pollinations.profile_from_args(args)
+        runner = web.AppRunner(mock_pollinations.create_app(profile, args.seed))
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", args.mock_port).start()
+        args.url = f"http://127.0.0.1:{args.mock_port}"
+        print(f"Spawned mock Pollinations on {args.url} with {profile}")
+
+    from cogs.generate.RotiBrain import RotiBrain
+    from cogs.generate.AIScheduler import text_scheduler, image_scheduler
+
+    if args.no_rate_limit:
+        for scheduler in (text_scheduler, image_scheduler):
+            scheduler.rate, scheduler.burst = 1e9, 1e9
+            scheduler.max_queue_per_guild = scheduler.max_queue = 10 ** 6
+
+    connector = aiohttp.TCPConnector(limit=100, limit_per_host=20, keepalive_timeout=60)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        brain = RotiBrain(session)
+        brain.base_url = brain.catalog.base_url = args.url
+        await brain.catalog.ready()
+
+        recorder = Recorder()
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(worker(i, args, brain, recorder, deadline) for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    print(f"{args.concurrency} workers over {args.guilds} guilds for {elapsed:.1f}s against {args.url}")
+    recorder.report(elapsed)
+    for scheduler in (text_scheduler, image_scheduler):
+        print(f"{scheduler.name} scheduler: {scheduler.snapshot()}")
+
+    if runner:
+        await runner.cleanup()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=os.getenv("POLLINATIONS_URL", "http://127.0.0.1:8089"))
+    parser.add_argument("--spawn-mock", action="store_true", help="Run the mock server in-process (see --profile) instead of using --url")
+    parser.add_argument("--mock-port", type=int, default=8090)
+    parser.add_argument("--concurrency", type=int, default=20, help="Number of simulated users")
+    parser.add_argument("--guilds", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=20, help="Seconds to run for")
+    parser.add_argument("--think-time", type=float, default=0.5, help="Max seconds a user waits between requests")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("talkback=6,text=3,image=1"))
+    parser.add_argument("--temperature", type=float, default=0.9, help="0 exercises the response cache")
+    parser.add_argument("--no-rate-limit", action="store_true", help="Disable the per-guild token buckets and queue limits")
+    parser.add_argument("--seed", type=int, default=0)
+    import mock_pollinations
+    mock_pollinations.add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    # RotiBrain reads Roti's CLI arguments and writes the model catalog cache, keep both away from ours.
+    sys.argv = sys.argv[:1]
+    os.environ.setdefault("MODEL_CATALOG_PATH", os.path.join(tempfile.gettempdir(), "roti_load_test_models.json"))
+    return asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Drive hundreds of simulated guilds through the Music cog against the mock Lavalink node (or any node), and report the
+bot's CPU time per guild, how long Lavalink events take to handle, and Discord API calls per minute.
+
+Discord itself is simulated: each guild has a voice channel with one listener and a text channel, and the interactions,
+messages, channel edits and voice state changes the cog makes are counted (and delayed by --discord-latency-ms)
+instead of sent. Commands run through the real /play, /skip and /queue callbacks, so track loading and caching,
+the queue embed and its refresher, voice statuses, preloading and the player's event handling all run as in production.
+With --spawn-node the node runs in its own process, so the CPU time reported is the bot's alone.
+Run from the repository root:
+
+Usage:
+    python3 scripts/load_test_music.py --spawn-node                                  # "fast" profile, 200 guilds
+    python3 scripts/load_test_music.py --spawn-node --guilds 500 --duration 120 --speed 120
+    python3 scripts/load_test_music.py --host 127.0.0.1 --port 2333 --mix play=1,queue=1
+"""
+
+import argparse
+import asyncio
+import functools
+import logging
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import aiohttp
+
+BOT_ID = 1000
+OPERATIONS = ("play", "playlist", "skip", "queue")
+
+
+class DiscordApi:
+    """Counts, and optionally delays, every call made to the simulated Discord objects."""
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+        self.calls: Counter = Counter()
+        self._ids = iter(range(10 ** 9, 10 ** 10))
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    async def call(self, kind: str) -> None:
+        self.calls[kind] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+
+class FakeMessage:
+    def __init__(self, api: DiscordApi):
+        self.api = api
+        self.id = api.next_id()
+
+    async def edit(self, **kwargs):
+        await self.api.call("message.edit")
+        return self
+
+    async def delete(self, **kwargs):
+        await self.api.call("message.delete")
+
+
+class FakeTextChannel:
+    def __init__(self, api: DiscordApi, guild: "FakeGuild"):
+        self.api = api
+        self.guild = guild
+        self.id = api.next_id()
+
+    async def send(self, content=None, **kwargs):
+        await self.api.call("channel.send")
+        return FakeMessage(self.api)
+
+
+class FakeVoiceChannel:
+    def __init__(self, api: DiscordApi, guild: "FakeGuild", listener: SimpleNamespace):
+        self.api = api
+        self.guild = guild
+        self.id = api.next_id()
+        self.name = f"voice-{guild.id}"
+        self.members = [listener]
+
+    async def edit(self, **kwargs):
+        await self.api.call("channel.edit")
+
+    async def connect(self, *, cls, timeout: float = 60.0, reconnect: bool = True, self_deaf: bool = False, self_mute: bool = False):
+        client = self.guild.voice_client = cls(self.guild.bot, self)
+        await client.connect(timeout=timeout, reconnect=reconnect, self_deaf=self_deaf, self_mute=self_mute)
+        return client
+
+
+class FakeGuild:
+    def __init__(self, api: DiscordApi, bot: "FakeBot"):
+        self.api = api
+        self.bot = bot
+        self.id = api.next_id()
+        self.me = SimpleNamespace(id=BOT_ID, bot=True, guild_permissions=SimpleNamespace(manage_channels=True))
+        self.listener = SimpleNamespace(id=api.next_id(), bot=False, voice=None)
+        self.text = FakeTextChannel(api, self)
+        self.voice = FakeVoiceChannel(api, self, self.listener)
+        self.listener.voice = SimpleNamespace(channel=self.voice)
+        self.voice_client = None
+
+    def get_channel(self, channel_id: int):
+        return {self.text.id: self.text, self.voice.id: self.voice}.get(channel_id)
+
+    async def change_voice_state(self, *, channel, self_mute: bool = False, self_deaf: bool = False):
+        """Sends the voice state change over the "gateway" and plays back the updates Discord would answer with."""
+        await self.api.call("gateway.voice_state")
+        state = {"guild_id": str(self.id), "user_id": str(BOT_ID), "session_id": f"mock-{self.id}", "channel_id": str(channel.id) if channel else None}
+        if channel is None:
+            # Straight to Lavalink, a real VoiceProtocol would also unregister itself from discord.py's connection state.
+            self.voice_client = None
+            return await self.bot.lavalink.voice_update_handler({"t": "VOICE_STATE_UPDATE", "d": state})
+        await self.voice_client.on_voice_state_update(state)
+        await self.voice_client.on_voice_server_update({"guild_id": str(self.id), "token": "mock", "endpoint": "mock.discord.media"})
+
+
+class FakeInteraction:
+    def __init__(self, api: DiscordApi, guild: FakeGuild):
+        self.guild = guild
+        self.guild_id = guild.id
+        self.channel = guild.text
+        self.user = guild.listener
+        self.response = SimpleNamespace(defer=functools.partial(_defer, api), send_message=functools.partial(_send, api, "interaction.respond"))
+        self.followup = SimpleNamespace(send=functools.partial(_send, api, "followup.send"))
+
+
+async def _defer(api: DiscordApi, **kwargs):
+    await api.call("interaction.defer")
+
+
+async def _send(api: DiscordApi, kind: str, content=None, **kwargs):
+    await api.call(kind)
+    return FakeMessage(api)
+
+
+class FakeBot:
+    def __init__(self, session: aiohttp.ClientSession):
+        self.user = SimpleNamespace(id=BOT_ID)
+        self.session = session
+        self.guilds: Dict[int, FakeGuild] = {}
+
+    def get_guild(self, guild_id: int) -> Optional[FakeGuild]:
+        return self.guilds.get(guild_id)
+
+    def get_channel(self, channel_id: int):
+        for guild in self.guilds.values():
+            if (channel := guild.get_channel(channel_id)) is not None:
+                return channel
+        return None
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.outcomes: Dict[str, Counter] = defaultdict(Counter)
+        self.events: Dict[str, List[float]] = defaultdict(list)
+        self.hooks: Dict[str, List[float]] = defaultdict(list)
+        self.renders: List[float] = []
+        self.loop_lag: List[float] = []
+
+    @staticmethod
+    def pct(values: List[float], p: float, scale: float = 1000) -> float:
+        values = sorted(values)
+        return scale * values[min(len(values) - 1, int(len(values) * p))] if values else float("nan")
+
+    def report(self, elapsed: float, guilds: int, cpu: float, api: DiscordApi) -> None:
+        minutes = elapsed / 60
+        print(f"\nBot CPU: {cpu:.2f}s over {elapsed:.1f}s ({100 * cpu / elapsed:.1f}% of a core), {1000 * cpu / guilds / minutes:.2f} ms per guild per minute")
+        print(f"Event loop lag: p50 {self.pct(self.loop_lag, 0.5):.1f} ms, p99 {self.pct(self.loop_lag, 0.99):.1f} ms, max {self.pct(self.loop_lag, 1.0):.1f} ms")
+
+        print(f"\n{'Command':<10} {'ok':>6} {'error':>6} {'ops/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        for op in sorted(self.outcomes):
+            lat = self.latencies[op]
+            outcome = self.outcomes[op]
+            print(f"{op:<10} {outcome['ok']:>6} {outcome['error']:>6} {outcome['ok'] / elapsed:>7.2f} "
+                  f"{self.pct(lat, 0.5):>8.1f} {self.pct(lat, 0.95):>8.1f} {self.pct(lat, 0.99):>8.1f} {self.pct(lat, 1.0):>8.1f}")
+
+        print(f"\n{'Lavalink event (sent -> handled)':<34} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        for name, values in sorted(self.events.items()) + sorted((f"hook {name}", values) for name, values in self.hooks.items()):
+            print(f"{name:<34} {len(values):>7} {self.pct(values, 0.5):>8.2f} {self.pct(values, 0.95):>8.2f} {self.pct(values, 0.99):>8.2f} {self.pct(values, 1.0):>8.2f}")
+
+        print(f"\nQueue embed render: {len(self.renders)} renders, p50 {self.pct(self.renders, 0.5, 1e6):.0f} µs, p99 {self.pct(self.renders, 0.99, 1e6):.0f} µs")
+
+        total = sum(api.calls.values())
+        print(f"\nDiscord API calls: {total / minutes:.0f}/min ({total / minutes / guilds:.2f}/min per guild)")
+        for kind, count in api.calls.most_common():
+            print(f"    {kind:<22} {count / minutes:>9.1f}/min")
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for pair in value.split(","):
+        name, _, weight = pair.partition("=")
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Unknown operation {name!r}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def instrument(client, recorder: Recorder) -> None:
+    """Times every Lavalink event from the node sending it to the player having handled it, and every event hook."""
+    for node in client.node_manager.nodes:
+        transport = node._transport
+
+        # Lavalink's classes use __slots__, so swap in a subclass with the same layout rather than patching the instance.
+        class TimedTransport(type(transport)):
+            __slots__ = ()
+
+            async def _handle_message(self, data):
+                await super()._handle_message(data)
+                if isinstance(data, dict) and data.get("op") == "event" and "sentAt" in data:
+                    recorder.events[data["type"]].append(time.time() - data["sentAt"])
+
+        transport.__class__ = TimedTransport
+
+    def timed_hook(hook):
+        @functools.wraps(hook)
+        async def wrapper(event):
+            start = time.perf_counter()
+            await hook(event)
+            recorder.hooks[hook.__name__].append(time.perf_counter() - start)
+        return wrapper
+
+    for name, hooks in client._event_hooks.items():
+        client._event_hooks[name] = [timed_hook(hook) for hook in hooks]
+
+
+async def measure_loop_lag(recorder: Recorder, interval: float = 0.1) -> None:
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        recorder.loop_lag.append(time.perf_counter() - start - interval)
+
+
+async def guild_worker(guild: FakeGuild, music, args, api: DiscordApi, recorder: Recorder, queries: List[str], weights: List[float], deadline: float):
+    from cogs.music.music import _generate_queue_embed
+
+    rng = random.Random(args.seed + guild.id)
+    ops, op_weights = zip(*args.mix.items())
+    await asyncio.sleep(rng.uniform(0, args.think_time)) # Don't start every guild in the same instant
+    while time.perf_counter() < deadline:
+        op = rng.choices(ops, op_weights)[0] if music.lavalink.player_manager.get(guild.id) else "play"
+        interaction = FakeInteraction(api, guild)
+        start = time.perf_counter()
+        try:
+            if op == "play":
+                await music._play.callback(music, interaction, query=rng.choices(queries, weights)[0])
+            elif op == "playlist":
+                await music._play.callback(music, interaction, query=f"https://www.youtube.com/playlist?list=PLmock{rng.randrange(args.playlists)}")
+            elif op == "skip":
+                await music._skip.callback(music, interaction)
+            else:
+                await music._queue.callback(music, interaction)
+        except Exception as e:
+            recorder.outcomes[op]["error"] += 1
+            logging.getLogger(__name__).warning(f"{op} failed in {guild.id}: {e!r}")
+        else:
+            recorder.outcomes[op]["ok"] += 1
+            recorder.latencies[op].append(time.perf_counter() - start)
+
+        player = music.lavalink.player_manager.get(guild.id)
+        if op == "queue" and player is not None and player.current is not None:
+            start = time.perf_counter()
+            _generate_queue_embed(player)
+            recorder.renders.append(time.perf_counter() - start)
+        await asyncio.sleep(min(rng.expovariate(1 / args.think_time), max(0.0, deadline - time.perf_counter())))
+
+
+async def wait_for_node(url: str, password: str, timeout: float = 15) -> None:
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while True:
+            try:
+                async with session.get(f"{url}/version", headers={"Authorization": password}) as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Lavalink node at {url} didn't come up")
+            await asyncio.sleep(0.2)
+
+
+async def run(args) -> int:
+    node_process = None
+    url = f"http://{args.host}:{args.port}"
+    if args.spawn_node:
+        import mock_lavalink
+        profile = mock_lavalink.profile_from_args(args)
+        node_process = subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve().parent / "mock_lavalink.py"), "--host", args.host, "--port", str(args.port),
+             "--password", args.password, "--seed", str(args.seed), *mock_lavalink.profile_argv(profile)],
+            stdout=subprocess.DEVNULL
+        )
+        print(f"Spawned mock Lavalink on {url} with {profile}")
+
+    try:
+        await wait_for_node(url, args.password)
+        return await drive(args)
+    finally:
+        if node_process is not None:
+            node_process.terminate()
+            node_process.wait()
+
+
+async def drive(args) -> int:
+    from cogs.music.music import Music
+    from cogs.music.NodePool import NodeConfig
+    from cogs.music.TrackCache import track_cache
+
+    api = DiscordApi(args.discord_latency_ms)
+    recorder = Recorder()
+    async with aiohttp.ClientSession() as session:
+        bot = FakeBot(session)
+        music = Music(bot)
+        music.node_pool.install()
+        music.node_pool.add(NodeConfig("mock", args.host, args.port), args.password)
+        instrument(music.lavalink, recorder)
+        for _ in range(100):
+            if music.lavalink.node_manager.available_nodes:
+                break
+            await asyncio.sleep(0.1)
+        else:
+            print("The Lavalink node never became available")
+            return 1
+
+        for _ in range(args.guilds):
+            guild = FakeGuild(api, bot)
+            bot.guilds[guild.id] = guild
+
+        # A few songs are far more popular than the rest, like real requests (and the search cache).
+        queries = [f"mock song {i}" for i in range(args.catalog)]
+        weights = [1 / (i + 1) for i in range(args.catalog)]
+
+        lag = asyncio.create_task(measure_loop_lag(recorder))
+        cpu = time.process_time()
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(guild_worker(guild, music, args, api, recorder, queries, weights, deadline) for guild in bot.guilds.values()))
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu
+        lag.cancel()
+
+        print(f"{args.guilds} guilds for {elapsed:.1f}s against {args.host}:{args.port}, {args.discord_latency_ms:.0f}ms simulated Discord latency")
+        recorder.report(elapsed, args.guilds, cpu, api)
+        print(f"\nTrack cache: {track_cache.hits} hits, {track_cache.misses} misses, {track_cache.coalesced} coalesced")
+        print(f"Preloader: {music.preloader.preloaded} preloaded, {music.preloader.failed} failed")
+        print(f"Voice status: {music.voice_status.writes} writes, {music.voice_status.skipped} skipped, {music.voice_status.rate_limited} rate limited")
+        for metrics in music.node_pool.metrics():
+            print(f"Node: {metrics}")
+
+        for task in music._playlist_tasks:
+            task.cancel()
+        music.queue_refresher.stop()
+        music.voice_status.stop()
+        music.preloader.stop()
+        await music.lavalink.close()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2333)
+    parser.add_argument("--password", default=os.getenv("MUSIC_PASS", "youshallnotpass"))
+    parser.add_argument("--spawn-node", action="store_true", help="Run the mock node (see --profile) in a subprocess instead of using --host/--port")
+    parser.add_argument("--guilds", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to run for")
+    parser.add_argument("--think-time", type=float, default=10, help="Mean seconds between a guild's commands")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("play=5,playlist=1,skip=2,queue=3"))
+    parser.add_argument("--catalog", type=int, default=500, help="Distinct search queries to pick from")
+    parser.add_argument("--playlists", type=int, default=20, help="Distinct playlists to pick from")
+    parser.add_argument("--discord-latency-ms", type=float, default=50, help="Simulated latency of every Discord API call")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="Show the bot's own warnings")
+    import mock_lavalink
+    mock_lavalink.add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING if args.verbose else logging.ERROR, format="%(levelname)s %(name)s: %(message)s")
+    logging.getLogger("database").setLevel(logging.ERROR) # There's no database here, music settings fall back to their defaults
+    # RotiState parses Roti's own CLI arguments, keep ours away from it.
+    sys.argv = sys.argv[:1]
+    return asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
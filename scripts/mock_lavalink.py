@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for a Lavalink v4 node, for load testing the Music cog without Lavalink, YouTube or voice connections.
+
+Speaks enough of the v4 protocol for lavalink.py: the /v4/websocket (ready, stats, playerUpdate and Track* events),
+track loading and decoding, player updates and node info. "Playback" runs on a simulated clock, --speed 60 plays a
+three minute track in three seconds, while playerUpdate and stats frames keep their real-time intervals so the
+per-guild message load stays what a real node would send. Event frames carry an extra "sentAt" (epoch seconds)
+so a client on the same machine can measure how long it took to handle them.
+
+Identifiers: "ytsearch:<query>" returns a few search results, URLs containing "list=" a playlist, any other URL a
+single track and anything else nothing. Tracks are generated deterministically from the identifier.
+
+Usage:
+    python3 scripts/mock_lavalink.py                                  # "fast" profile on port 2333
+    python3 scripts/mock_lavalink.py --profile realistic --port 2334
+    python3 scripts/mock_lavalink.py --speed 120 --error-rate 0.05 --playlist-size 200
+    LAVALINK_HOST=127.0.0.1 MUSIC_PASS=youshallnotpass python3 main.py --test
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field, fields, replace
+from io import BytesIO
+from typing import Dict, List, Optional
+
+from aiohttp import web, WSMsgType
+from PIL import Image
+
+
+@dataclass(frozen=True)
+class Profile:
+    speed: float                # Simulated milliseconds of playback per real millisecond
+    rest_latency_ms: float      # Median REST response time
+    jitter: float               # Lognormal sigma applied to latency, 0 for a constant latency
+    track_min_s: float          # Shortest generated track
+    track_max_s: float          # Longest generated track
+    playlist_size: int          # Tracks in every playlist
+    search_results: int         # Tracks per search
+    error_rate: float           # Fraction of tracks that fail shortly after starting (TrackExceptionEvent)
+    update_interval_s: float    # Real seconds between playerUpdate frames
+    stats_interval_s: float     # Real seconds between stats frames
+
+
+PROFILES = {
+    "fast": Profile(speed=60, rest_latency_ms=2, jitter=0.0, track_min_s=120, track_max_s=360, playlist_size=100, search_results=5, error_rate=0.0, update_interval_s=5, stats_interval_s=60),
+    "realistic": Profile(speed=1, rest_latency_ms=40, jitter=0.5, track_min_s=120, track_max_s=360, playlist_size=100, search_results=5, error_rate=0.01, update_interval_s=5, stats_interval_s=60),
+    "degraded": Profile(speed=1, rest_latency_ms=400, jitter=0.8, track_min_s=120, track_max_s=360, playlist_size=300, search_results=5, error_rate=0.1, update_interval_s=5, stats_interval_s=60),
+}
+
+WORDS = "roti bread lofi beats remix live acoustic night drive summer rain city lights heart song dance slow".split()
+VERSION = "4.0.8"
+_UNSET = object()
+
+
+def _render_artwork() -> bytes:
+    """A small thumbnail, served as every track's artwork."""
+    buffer = BytesIO()
+    Image.new("RGB", (320, 180), (236, 201, 142)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+class Clock:
+    """Simulated playback time in milliseconds, running `speed` times faster than real time."""
+    def __init__(self, speed: float):
+        self.speed = speed
+        self._start = time.monotonic()
+
+    def now(self) -> float:
+        return (time.monotonic() - self._start) * self.speed * 1000
+
+    async def sleep(self, sim_ms: float) -> None:
+        await asyncio.sleep(max(0.0, sim_ms) / self.speed / 1000)
+
+
+@dataclass
+class Player:
+    guild_id: str
+    track: Optional[dict] = None
+    position: float = 0             # Simulated ms at `anchor`
+    anchor: float = 0
+    paused: bool = False
+    volume: int = 100
+    filters: dict = field(default_factory=dict)
+    voice: dict = field(default_factory=dict)
+    end_time: Optional[int] = None
+    timer: Optional[asyncio.Task] = None
+
+    @property
+    def rate(self) -> float:
+        return float((self.filters.get("timescale") or {}).get("speed", 1.0)) or 1.0
+
+    def current_position(self, now: float) -> float:
+        if self.track is None:
+            return 0
+        if self.paused:
+            return self.position
+        return min(self.position + (now - self.anchor) * self.rate, self.track["info"]["length"])
+
+    def to_dict(self, now: float) -> dict:
+        return {
+            "guildId": self.guild_id, "track": self.track, "volume": self.volume, "paused": self.paused,
+            "state": {"time": int(time.time() * 1000), "position": int(self.current_position(now)), "connected": bool(self.voice), "ping": 0},
+            "voice": self.voice, "filters": self.filters,
+        }
+
+
+class Session:
+    def __init__(self, ws: web.WebSocketResponse):
+        self.id = uuid.uuid4().hex[:16]
+        self.ws = ws
+        self.players: Dict[str, Player] = {}
+
+
+class MockLavalink:
+    def __init__(self, profile: Profile, password: str, seed: int = 0):
+        self.profile = profile
+        self.password = password
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.clock = Clock(profile.speed)
+        self.sessions: Dict[str, Session] = {}
+        self.requests: Counter = Counter()
+        self.events: Counter = Counter()
+        self.started = time.time()
+        self.artwork_base = ""
+        self.artwork_bytes = _render_artwork()
+
+    # --- Tracks ---
+
+    def _track(self, key: str) -> dict:
+        rng = random.Random(f"{self.seed}:{key}")
+        identifier = "".join(rng.choice("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_") for _ in range(11))
+        info = {
+            "identifier": identifier,
+            "isSeekable": True,
+            "author": f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}",
+            "length": int(rng.uniform(self.profile.track_min_s, self.profile.track_max_s) * 1000),
+            "isStream": False,
+            "position": 0,
+            "title": " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))).title(),
+            "uri": f"https://www.youtube.com/watch?v={identifier}",
+            "artworkUrl": f"{self.artwork_base}/artwork/{identifier}.jpg",
+            "isrc": None,
+            "sourceName": "youtube",
+        }
+        encoded = base64.b64encode(json.dumps(info, separators=(",", ":")).encode()).decode()
+        return {"encoded": encoded, "info": info, "pluginInfo": {}, "userData": {}}
+
+    @staticmethod
+    def _decode(encoded: str) -> dict:
+        info = json.loads(base64.b64decode(encoded))
+        return {"encoded": encoded, "info": info, "pluginInfo": {}, "userData": {}}
+
+    # --- Plumbing ---
+
+    def _authorize(self, request: web.Request) -> None:
+        self.requests[f"{request.method} {request.match_info.route.resource.canonical}"] += 1
+        if request.headers.get("Authorization") != self.password:
+            raise web.HTTPUnauthorized(text='{"error": "Unauthorized"}', content_type="application/json")
+
+    async def _latency(self):
+        delay = self.profile.rest_latency_ms / 1000
+        if self.profile.jitter:
+            delay *= self.rng.lognormvariate(0, self.profile.jitter)
+        await asyncio.sleep(delay)
+
+    def _session(self, request: web.Request) -> Session:
+        session = self.sessions.get(request.match_info["session_id"])
+        if session is None:
+            raise web.HTTPNotFound(text='{"error": "Session not found"}', content_type="application/json")
+        return session
+
+    async def _send(self, session: Session, payload: dict) -> None:
+        if not session.ws.closed:
+            await session.ws.send_json(payload)
+
+    async def _event(self, session: Session, player: Player, event_type: str, track: Optional[dict], **extra) -> None:
+        self.events[event_type] += 1
+        payload = {"op": "event", "type": event_type, "guildId": player.guild_id, **extra, "sentAt": time.time()}
+        if track is not None:
+            payload["track"] = track
+        await self._send(session, payload)
+
+    def stats(self) -> dict:
+        players = [player for session in self.sessions.values() for player in session.players.values()]
+        playing = sum(1 for player in players if player.track is not None and not player.paused)
+        return {
+            "players": len(players), "playingPlayers": playing, "uptime": int((time.time() - self.started) * 1000),
+            "memory": {"free": 256 << 20, "used": 128 << 20, "allocated": 384 << 20, "reservable": 1 << 30},
+            "cpu": {"cores": os.cpu_count() or 1, "systemLoad": 0.05, "lavalinkLoad": min(1.0, playing / 2000)},
+            "frameStats": {"sent": 3000, "nulled": 0, "deficit": 0},
+        }
+
+    # --- Playback ---
+
+    async def _start(self, session: Session, player: Player, track: dict, position: int) -> None:
+        if player.track is not None:
+            await self._end(session, player, "replaced")
+        player.track, player.position, player.anchor = track, position, self.clock.now()
+        await self._event(session, player, "TrackStartEvent", track)
+        self._schedule_end(session, player)
+
+    async def _end(self, session: Session, player: Player, reason: str) -> None:
+        if player.timer is not None and player.timer is not asyncio.current_task():
+            player.timer.cancel()
+        track, player.track, player.timer = player.track, None, None
+        await self._event(session, player, "TrackEndEvent", track, reason=reason)
+
+    def _schedule_end(self, session: Session, player: Player) -> None:
+        if player.timer is not None:
+            player.timer.cancel()
+            player.timer = None
+        if player.track is None or player.paused:
+            return
+
+        now = self.clock.now()
+        length = min(player.track["info"]["length"], player.end_time or float("inf"))
+        fails = self.rng.random() < self.profile.error_rate
+        remaining = (min(length, player.current_position(now) + 1000) if fails else length) - player.current_position(now)
+        player.timer = asyncio.create_task(self._finish(session, player, player.track, remaining / player.rate, fails))
+
+    async def _finish(self, session: Session, player: Player, track: dict, sim_ms: float, fails: bool) -> None:
+        await self.clock.sleep(sim_ms)
+        if player.track is not track:
+            return
+        if fails:
+            exception = {"message": "Mock playback failure", "severity": "common", "cause": "MockException"}
+            await self._event(session, player, "TrackExceptionEvent", track, exception=exception)
+        await self._end(session, player, "loadFailed" if fails else "finished")
+
+    # --- WebSocket ---
+
+    async def websocket(self, request: web.Request) -> web.WebSocketResponse:
+        self._authorize(request)
+        ws = web.WebSocketResponse(heartbeat=60)
+        await ws.prepare(request)
+        session = Session(ws)
+        self.sessions[session.id] = session
+
+        await ws.send_json({"op": "ready", "resumed": False, "sessionId": session.id})
+        await ws.send_json({"op": "stats", **self.stats()})
+        updates = asyncio.create_task(self._player_updates(session))
+        stats = asyncio.create_task(self._stats(session))
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.ERROR:
+                    break
+        finally:
+            updates.cancel()
+            stats.cancel()
+            for player in session.players.values():
+                if player.timer is not None:
+                    player.timer.cancel()
+            self.sessions.pop(session.id, None)
+        return ws
+
+    async def _player_updates(self, session: Session) -> None:
+        while True:
+            await asyncio.sleep(self.profile.update_interval_s)
+            now = self.clock.now()
+            for player in list(session.players.values()):
+                if player.track is not None:
+                    await self._send(session, {"op": "playerUpdate", "guildId": player.guild_id, "state": player.to_dict(now)["state"]})
+
+    async def _stats(self, session: Session) -> None:
+        while True:
+            await asyncio.sleep(self.profile.stats_interval_s)
+            await self._send(session, {"op": "stats", **self.stats()})
+
+    # --- REST ---
+
+    async def load_tracks(self, request: web.Request) -> web.Response:
+        self._authorize(request)
+        await self._latency()
+        identifier = request.query.get("identifier", "")
+
+        if identifier.startswith("ytsearch:"):
+            query = identifier[len("ytsearch:"):]
+            tracks = [self._track(f"{query}:{i}") for i in range(self.profile.search_results)]
+            return web.json_response({"loadType": "search", "data": tracks})
+        if identifier.startswith("http") and "list=" in identifier:
+            tracks = [self._track(f"{identifier}:{i}") for i in range(self.profile.playlist_size)]
+            name = f"Mock Playlist {identifier.rsplit('list=', 1)[1][:12]}"
+            return web.json_response({"loadType": "playlist", "data": {"info": {"name": name, "selectedTrack": -1}, "pluginInfo": {}, "tracks": tracks}})
+        if identifier.startswith("http"):
+            return web.json_response({"loadType": "track", "data": self._track(identifier)})
+        return web.json_response({"loadType": "empty", "data": {}})
+
+    async def decode_track(self, request: web.Request) -> web.Response:
+        self._authorize(request)
+        return web.json_response(self._decode(request.query["encodedTrack"]))
+
+    async def decode_tracks(self, request: web.Request) -> web.Response:
+        self._authorize(request)
+        return web.json_response([self._decode(encoded) for encoded in await request.json()])
+
+    async def get_players(self, request: web.Request) -> web.Response:
+        self._authorize(request)
+        now = self.clock.now()
+        return web.json_response([player.to_dict(now) for player in self._session(request).players.values()])
+
+    async def get_player(self, request: web.Request) -> web.Response:
+        self._authorize(request)
+        player = self._session(request).players.get(request.match_info["guild_id"])
+        if player is None:
+            raise web.HTTPNotFound(text='{"error": "Player not found"}', content_type="application/json")
+        return web.json_response(player.to_dict(self.clock.now()))
+
+    async def update_player(self, request: web.Request) -> web.Response:
+        self._authorize(request)
+        await self._latency()
+        session = self._session(request)
+        guild_id = request.match_info["guild_id"]
+        player = session.players.setdefault(guild_id, Player(guild_id))
+        body = await request.json()
+        no_replace = request.query.get("noReplace") == "true"
+        now = self.clock.now()
+
+        # Pin the position before anything that changes how it advances.
+        player.position, player.anchor = player.current_position(now), now
+        for key in ("volume", "filters", "voice"):
+            if key in body:
+                setattr(player, key, body[key])
+        if "paused" in body:
+            player.paused = body["paused"]
+
+        encoded = body["track"].get("encoded", _UNSET) if "track" in body else _UNSET
+        if encoded is None:
+            if player.track is not None:
+                await self._end(session, player, "stopped")
+        elif encoded is not _UNSET and not (no_replace and player.track is not None):
+            player.end_time = body.get("endTime")
+            await self._start(session, player, self._decode(encoded), int(body.get("position", 0)))
+            return web.json_response(player.to_dict(self.clock.now()))
+        elif "position" in body:
+            player.position = body["position"]
+
+        self._schedule_end(session, player)
+        return web.json_response(player.to_dict(now))
+
+    async def destroy_player(self, request: web.Request) -> web.Response:
+        self._authorize(request)
+        player = self._session(request).players.pop(request.match_info["guild_id"], None)
+        if player is not None and player.timer is not None:
+            player.timer.cancel()
+        return web.Response(status=204)
+
+    async def update_session(self, request: web.Request) -> web.Response:
+        self._authorize(request)
+        self._session(request)
+        body = await request.json()
+        return web.json_response({"resuming": body.get("resuming", False), "timeout": body.get("timeout", 60)})
+
+    async def info(self, request: web.Request) -> web.Response:
+        self._authorize(request)
+        major, minor, patch = (int(part) for part in VERSION.split("."))
+        return web.json_response({
+            "version": {"semver": VERSION, "major": major, "minor": minor, "patch": patch, "preRelease": None, "build": None},
+            "buildTime": 0, "git": {"branch": "mock", "commit": "mock", "commitTime": 0},
+            "jvm": "mock", "lavaplayer": "mock", "sourceManagers": ["youtube"], "filters": ["volume", "timescale"], "plugins": [],
+        })
+
+    async def version(self, request: web.Request) -> web.Response:
+        self._authorize(request)
+        await self._latency()
+        return web.Response(text=VERSION)
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        self._authorize(request)
+        return web.json_response(self.stats())
+
+    async def artwork(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.artwork_bytes, content_type="image/jpeg")
+
+
+def create_app(profile: Profile, password: str, seed: int = 0, public_url: str = "") -> web.Application:
+    mock = MockLavalink(profile, password, seed)
+    mock.artwork_base = public_url
+    app = web.Application()
+    app["mock"] = mock
+    app.router.add_get("/v4/websocket", mock.websocket)
+    app.router.add_get("/v4/loadtracks", mock.load_tracks)
+    app.router.add_get("/v4/decodetrack", mock.decode_track)
+    app.router.add_post("/v4/decodetracks", mock.decode_tracks)
+    app.router.add_get("/v4/sessions/{session_id}/players", mock.get_players)
+    app.router.add_get("/v4/sessions/{session_id}/players/{guild_id}", mock.get_player)
+    app.router.add_patch("/v4/sessions/{session_id}/players/{guild_id}", mock.update_player)
+    app.router.add_delete("/v4/sessions/{session_id}/players/{guild_id}", mock.destroy_player)
+    app.router.add_patch("/v4/sessions/{session_id}", mock.update_session)
+    app.router.add_get("/v4/info", mock.info)
+    app.router.add_get("/v4/stats", mock.get_stats)
+    app.router.add_get("/version", mock.version)
+    app.router.add_get("/artwork/{name}", mock.artwork)
+    return app
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--profile", choices=PROFILES, default="fast")
+    parser.add_argument("--speed", type=float, help="Override how much faster than real time tracks play")
+    parser.add_argument("--rest-latency-ms", type=float, help="Override the median REST latency")
+    parser.add_argument("--jitter", type=float, help="Override the latency jitter (lognormal sigma)")
+    parser.add_argument("--track-min-s", type=float, help="Override the shortest generated track")
+    parser.add_argument("--track-max-s", type=float, help="Override the longest generated track")
+    parser.add_argument("--playlist-size", type=int, help="Override the tracks per playlist")
+    parser.add_argument("--search-results", type=int, help="Override the tracks per search")
+    parser.add_argument("--error-rate", type=float, help="Override the fraction of tracks that fail")
+    parser.add_argument("--update-interval-s", type=float, help="Override the real seconds between playerUpdate frames")
+    parser.add_argument("--stats-interval-s", type=float, help="Override the real seconds between stats frames")
+
+
+def profile_from_args(args: argparse.Namespace) -> Profile:
+    overrides = {f.name: getattr(args, f.name) for f in fields(Profile) if getattr(args, f.name, None) is not None}
+    return replace(PROFILES[args.profile], **overrides)
+
+
+def profile_argv(profile: Profile) -> List[str]:
+    """The command line arguments that recreate `profile`, for running the node in a subprocess."""
+    argv = ["--profile", "fast"]
+    for f in fields(Profile):
+        argv += [f"--{f.name.replace('_', '-')}", str(getattr(profile, f.name))]
+    return argv
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2333)
+    parser.add_argument("--password", default=os.getenv("MUSIC_PASS", "youshallnotpass"))
+    parser.add_argument("--seed", type=int, default=0)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    profile = profile_from_args(args)
+    print(f"Mock Lavalink on ws://{args.host}:{args.port}/v4/websocket with {profile}", flush=True)
+    web.run_app(create_app(profile, args.password, args.seed, f"http://{args.host}:{args.port}"), host=args.host, port=args.port, print=None)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
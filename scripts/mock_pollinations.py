@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for gen.pollinations.ai, for benchmarking RotiBrain without touching the real API.
+
+Implements /v1/chat/completions (including SSE streaming), /image/{prompt}, /text/models and /image/models
+with configurable latency, error rate and payload size. Point Roti at it with POLLINATIONS_URL.
+
+Usage:
+    python3 scripts/mock_pollinations.py                              # "realistic" profile on port 8089
+    python3 scripts/mock_pollinations.py --profile degraded
+    python3 scripts/mock_pollinations.py --profile fast --error-rate 0.05 --image-kb 2048
+    POLLINATIONS_URL=http://127.0.0.1:8089 python3 main.py --test
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from dataclasses import dataclass, replace
+from io import BytesIO
+
+from aiohttp import web
+from PIL import Image
+
+
+@dataclass(frozen=True)
+class Profile:
+    latency_ms: float       # Median time before the first byte (image) or first token (text)
+    jitter: float           # Lognormal sigma applied to latency, 0 for a constant latency
+    token_delay_ms: float   # Delay between streamed tokens
+    response_tokens: int    # Tokens per completion
+    error_rate: float       # Fraction of requests that fail with a 500 or 429
+    image_kb: int           # Approximate size of generated images
+    image_format: str       # PNG, JPEG or WEBP
+
+
+PROFILES = {
+    "fast": Profile(latency_ms=20, jitter=0.0, token_delay_ms=1, response_tokens=60, error_rate=0.0, image_kb=256, image_format="JPEG"),
+    "realistic": Profile(latency_ms=800, jitter=0.5, token_delay_ms=25, response_tokens=120, error_rate=0.02, image_kb=1024, image_format="JPEG"),
+    "degraded": Profile(latency_ms=3000, jitter=0.8, token_delay_ms=60, response_tokens=200, error_rate=0.15, image_kb=4096, image_format="PNG"),
+}
+
+WORDS = "sure thing here's what I think about that honestly it depends but roti says the answer is probably yes".split()
+
+
+def _render_image(profile: Profile) -> bytes:
+    """Renders one noise image of roughly the requested size, served for every image request."""
+    side = 64
+    while True:
+        buffer = BytesIO()
+        Image.effect_noise((side, side), 64).convert("RGB").save(buffer, format=profile.image_format)
+        if buffer.tell() >= profile.image_kb * 1024 or side >= 4096:
+            return buffer.getvalue()
+        side = int(side * 1.25)
+
+
+class MockPollinations:
+    def __init__(self, profile: Profile, seed: int = 0):
+        self.profile = profile
+        self.rng = random.Random(seed)
+        self.image_bytes = _render_image(profile)
+        self.content_type = f"image/{profile.image_format.lower()}"
+        self.requests = 0
+
+    async def _latency(self):
+        delay = self.profile.latency_ms / 1000
+        if self.profile.jitter:
+            delay *= self.rng.lognormvariate(0, self.profile.jitter)
+        await asyncio.sleep(delay)
+
+    def _maybe_fail(self):
+        self.requests += 1
+        if self.rng.random() < self.profile.error_rate:
+            if self.rng.random() < 0.5:
+                raise web.HTTPTooManyRequests(text='{"error": "rate limited"}', content_type="application/json")
+            raise web.HTTPInternalServerError(text='{"error": "mock failure"}', content_type="application/json")
+
+    def _tokens(self):
+        return [self.rng.choice(WORDS) + " " for _ in range(self.profile.response_tokens)]
+
+    async def completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self._maybe_fail()
+        await self._latency()
+        tokens = self._tokens()
+        model = body.get("model", "mock")
+
+        if not body.get("stream"):
+            await asyncio.sleep(self.profile.token_delay_ms * len(tokens) / 1000)
+            return web.json_response({
+                "id": f"mock-{time.time_ns()}", "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}]
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        for token in tokens:
+            chunk = {"model": model, "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await asyncio.sleep(self.profile.token_delay_ms / 1000)
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    async def image(self, request: web.Request) -> web.Response:
+        self._maybe_fail()
+        await self._latency()
+        return web.Response(body=self.image_bytes, content_type=self.content_type)
+
+    async def text_models(self, request: web.Request) -> web.Response:
+        return web.json_response([
+            {"name": "gemini-fast", "description": "Mock Gemini Fast"},
+            {"name": "openai", "description": "Mock OpenAI"},
+            {"name": "paid", "description": "Mock paid model", "paid_only": True},
+        ])
+
+    async def image_models(self, request: web.Request) -> web.Response:
+        return web.json_response([
+            {"name": "flux", "output_modalities": ["image"]},
+            {"name": "video", "output_modalities": ["video"]},
+        ])
+
+
+def create_app(profile: Profile, seed: int = 0) -> web.Application:
+    mock = MockPollinations(profile, seed)
+    app = web.Application()
+    app["mock"] = mock
+    app.router.add_post("/v1/chat/completions", mock.completions)
+    app.router.add_get("/image/{prompt}", mock.image)
+    app.router.add_get("/text/models", mock.text_models)
+    app.router.add_get("/image/models", mock.image_models)
+    return app
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--profile", choices=PROFILES, default="realistic")
+    parser.add_argument("--latency-ms", type=float, help="Override the profile's median latency")
+    parser.add_argument("--jitter", type=float, help="Override the profile's latency jitter (lognormal sigma)")
+    parser.add_argument("--token-delay-ms", type=float, help="Override the delay between streamed tokens")
+    parser.add_argument("--response-tokens", type=int, help="Override the tokens per completion")
+    parser.add_argument("--error-rate", type=float, help="Override the fraction of failing requests")
+    parser.add_argument("--image-kb", type=int, help="Override the generated image size")
+    parser.add_argument("--image-format", choices=("PNG", "JPEG", "WEBP"), help="Override the generated image format")
+
+
+def profile_from_args(args: argparse.Namespace) -> Profile:
+    overrides = {
+        field: getattr(args, field) for field in
+        ("latency_ms", "jitter", "token_delay_ms", "response_tokens", "error_rate", "image_kb", "image_format")
+        if getattr(args, field) is not None
+    }
+    return replace(PROFILES[args.profile], **overrides)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--seed", type=int, default=0)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    profile = profile_from_args(args)
+    print(f"Mock Pollinations on http://{args.host}:{args.port} with {profile}")
+    web.run_app(create_app(profile, args.seed), host=args.host, port=args.port, print=None)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
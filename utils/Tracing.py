@@ -0,0 +1,179 @@
+import os
+import time
+import json
+import uuid
+import asyncio
+import logging
+import pathlib
+import functools
+import itertools
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+"""
+Lightweight contextvar-based tracing.
+
+A trace is opened per interaction (or other entry point such as an AI talkback), and spans are opened
+around anything that might be slow: database calls, external APIs, Lavalink queries, etc.
+Spans opened outside of a trace are free no-ops, so instrumented code never has to care whether tracing is active.
+
+Traces that take longer than TRACE_SLOW_MS (default 2000ms) are exported as one JSON line each to
+TRACE_EXPORT_PATH (default logs/traces.jsonl) with per-span timings relative to the start of the trace.
+
+Usage:
+    with trace("interaction", command="wiz creature"):
+        with span("wizwiki.creature"):
+            ...
+
+    @traced("brain.completion")
+    async def _execute_completion(...): ...
+"""
+
+_SLOW_TRACE_MS : float = float(os.getenv("TRACE_SLOW_MS", "2000"))
+_EXPORT_PATH = pathlib.Path(os.getenv("TRACE_EXPORT_PATH", "logs/traces.jsonl"))
+
+_logger = logging.getLogger(__name__)
+
+@dataclass(slots=True)
+class Span:
+    span_id : int
+    parent_id : Optional[int]
+    name : str
+    start : float
+    end : Optional[float] = None
+    attributes : Dict[str, Any] = field(default_factory=dict)
+
+@dataclass(slots=True)
+class Trace:
+    name : str
+    trace_id : str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    start : float = field(default_factory=time.perf_counter)
+    end : Optional[float] = None
+    attributes : Dict[str, Any] = field(default_factory=dict)
+    spans : List[Span] = field(default_factory=list)
+    _ids : Iterator[int] = field(default_factory=lambda: itertools.count(1))
+
+    @property
+    def duration_ms(self) -> float:
+        return 1000 * ((self.end or time.perf_counter()) - self.start)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "duration_ms": round(self.duration_ms, 2),
+            "attributes": self.attributes,
+            "spans": [
+                {
+                    "id": s.span_id,
+                    "parent": s.parent_id,
+                    "name": s.name,
+                    "offset_ms": round(1000 * (s.start - self.start), 2),
+                    # Spans still running when the trace ended (e.g. fire-and-forget writes) have no duration.
+                    "duration_ms": round(1000 * (s.end - s.start), 2) if s.end is not None else None,
+                    **({"attributes": s.attributes} if s.attributes else {})
+                }
+                for s in self.spans
+            ]
+        }
+
+_current_trace : ContextVar[Optional[Trace]] = ContextVar("roti_trace", default=None)
+_current_span : ContextVar[Optional[int]] = ContextVar("roti_span", default=None)
+
+def current_trace_id() -> Optional[str]:
+    """Returns the ID of the active trace, if any. Useful for correlating logs."""
+    active = _current_trace.get()
+    return active.trace_id if active else None
+
+@contextmanager
+def span(name : str, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Times the enclosed block as a child of the current span. Does nothing if there is no active trace.
+    """
+    active = _current_trace.get()
+    if active is None:
+        yield None
+        return
+
+    current = Span(
+        span_id=next(active._ids),
+        parent_id=_current_span.get(),
+        name=name,
+        start=time.perf_counter(),
+        attributes=attributes
+    )
+    active.spans.append(current)
+    token = _current_span.set(current.span_id)
+    try:
+        yield current
+    except BaseException as e:
+        current.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current_span.reset(token)
+
+@contextmanager
+def trace(name : str, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Opens a new trace for the enclosed block, exporting it if it was slow.
+    If a trace is already active this behaves like `span`, so entry points can nest safely.
+    """
+    if _current_trace.get() is not None:
+        with span(name, **attributes) as nested:
+            yield nested
+        return
+
+    active = Trace(name=name, attributes=attributes)
+    trace_token = _current_trace.set(active)
+    span_token = _current_span.set(None)
+    try:
+        yield None
+    except BaseException as e:
+        active.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        active.end = time.perf_counter()
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        if active.duration_ms >= _SLOW_TRACE_MS:
+            _export(active)
+
+def traced(name : Optional[str] = None, *, root : bool = False):
+    """
+    Decorator form of `span` for both synchronous functions and coroutines.
+    With `root=True` it uses `trace` instead, for entry points that aren't interactions (e.g. `on_message` handlers).
+    """
+    def decorator(func : Callable):
+        span_name = name or func.__qualname__
+        opener = trace if root else span
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with opener(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def sync_wrapper(*args, **kwargs):
+            with opener(span_name):
+                return func(*args, **kwargs)
+        return sync_wrapper
+
+    return decorator
+
+def _export(finished : Trace) -> None:
+    """
+    Appends a slow trace to the export file. Slow traces are rare by definition, so a direct append is fine.
+    """
+    _logger.warning("Slow trace %s (%s) took %.2fms", finished.name, finished.trace_id, finished.duration_ms)
+    try:
+        _EXPORT_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(_EXPORT_PATH, "a") as f:
+            f.write(json.dumps(finished.to_dict(), default=str) + "\n")
+    except OSError as e:
+        _logger.error("Failed to export trace %s: %s", finished.trace_id, e)